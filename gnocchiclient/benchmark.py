@@ -12,16 +12,24 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 import argparse
-import copyreg
+import asyncio
+import concurrent.futures
+import csv
 import datetime
 import functools
 import itertools
+import json
 import logging
 import math
+import multiprocessing
+import operator
 import random
+import tempfile
+import threading
 import time
-import types
+import uuid
 
+from cliff import lister
 from cliff import show
 
 import futurist
@@ -29,29 +37,34 @@ import futurist
 import iso8601
 
 from gnocchiclient import utils
+from gnocchiclient.v1 import aggregates_cli
 from gnocchiclient.v1 import metric_cli
+from gnocchiclient.v1 import resource_cli
 
 
 LOG = logging.getLogger(__name__)
 
 
-def _pickle_method(m):
-    if m.im_self is None:
-        return getattr, (m.im_class, m.im_func.func_name)
-    else:
-        return getattr, (m.im_self, m.im_func.func_name)
-
-
-copyreg.pickle(types.MethodType, _pickle_method)
+def _rate(argument_value):
+    value = argument_value
+    if value.endswith("/s"):
+        value = value[:-2]
+    try:
+        value = float(value)
+    except ValueError:
+        msg = "%s must be a number of requests per second" % argument_value
+        raise argparse.ArgumentTypeError(msg)
+    if value <= 0:
+        msg = "%s must be greater than 0" % argument_value
+        raise argparse.ArgumentTypeError(msg)
+    return value
 
 
-def _positive_non_zero_int(argument_value):
-    if argument_value is None:
-        return None
+def _positive_non_zero_float(argument_value):
     try:
-        value = int(argument_value)
+        value = float(argument_value)
     except ValueError:
-        msg = "%s must be an integer" % argument_value
+        msg = "%s must be a number" % argument_value
         raise argparse.ArgumentTypeError(msg)
     if value <= 0:
         msg = "%s must be greater than 0" % argument_value
@@ -67,31 +80,596 @@ class StopWatch:
         return max(0.0, time.monotonic() - self.started_at)
 
 
-def measure_job(fn, *args, **kwargs):
+class LatencyHistogram:
+    """Histogram of latencies with logarithmic buckets.
+
+    Latencies are counted in buckets whose width grows with their value, so
+    that percentiles are computed with a bounded relative error while the
+    memory used does not depend on the number of latencies recorded.
+    Histograms can be merged, and serialized to be sent between processes.
+
+    :param relative_error: maximum relative error of the percentiles
+    :type relative_error: float
+    """
+
+    def __init__(self, relative_error=0.001):
+        self.relative_error = relative_error
+        self._log_base = math.log1p(2 * relative_error)
+        # bucket index -> number of latencies
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def __len__(self):
+        return self.count
+
+    def record(self, latency):
+        """Record a latency.
+
+        :param latency: latency in seconds
+        :type latency: float
+        """
+        # Latencies are bucketed in microseconds
+        index = int(math.log(max(1.0, latency * 1000000)) / self._log_base)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += latency
+        if self.min is None or latency < self.min:
+            self.min = latency
+        if self.max is None or latency > self.max:
+            self.max = latency
+
+    def merge(self, other):
+        """Add the latencies recorded by another histogram.
+
+        :param other: histogram to merge
+        :type other: LatencyHistogram
+        """
+        if other.relative_error != self.relative_error:
+            raise ValueError("Histograms with different relative errors "
+                             "cannot be merged")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or
+                                      other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or
+                                      other.max > self.max):
+            self.max = other.max
+
+    @property
+    def mean(self):
+        if not self.count:
+            return None
+        return self.total / self.count
+
+    def percentile(self, percent):
+        """Return a percentile of the latencies.
+
+        :param percent: the percentile, between 0 and 1
+        :type percent: float
+        """
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(percent * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                # Middle of the bucket, in seconds
+                value = math.exp((index + 0.5) * self._log_base) / 1000000
+                return min(max(value, self.min), self.max)
+
+    def to_dict(self):
+        return {
+            "relative_error": self.relative_error,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+            "buckets": {str(index): count
+                        for index, count in self.buckets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data["relative_error"])
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        histogram.buckets = {int(index): count
+                             for index, count in data["buckets"].items()}
+        return histogram
+
+
+class IntervalStats:
+    """Throughput and latency of the jobs finished in each interval of a run.
+
+    :param interval: duration of the intervals in seconds
+    :type interval: float
+    """
+
+    FIELDS = ('operation', 'time', 'executed', 'failures', 'rate',
+              'latency median', 'latency 95%\'ile', 'latency 99%\'ile',
+              'latency max')
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.sw = StopWatch()
+        self._lock = threading.Lock()
+        # interval index -> (executed, failures, latencies)
+        self.buckets = {}
+
+    def record(self, latency=None):
+        """Record a finished job.
+
+        :param latency: latency of the job, None if it failed
+        :type latency: float
+        """
+        index = int(self.sw.elapsed() // self.interval)
+        with self._lock:
+            bucket = self.buckets.setdefault(
+                index, [0, 0, LatencyHistogram()])
+            bucket[0] += 1
+            if latency is None:
+                bucket[1] += 1
+            else:
+                bucket[2].record(latency)
+
+    def rows(self, operation):
+        """Return the statistics of each interval since the start.
+
+        :param operation: name of the operation benchmarked
+        :type operation: str
+        :rtype: list of dict
+        """
+        with self._lock:
+            buckets = dict(self.buckets)
+        rows = []
+        for index in range(max(buckets, default=-1) + 1):
+            executed, failures, latencies = buckets.get(
+                index, (0, 0, LatencyHistogram()))
+            rows.append({
+                'operation': operation,
+                'time': index * self.interval,
+                'executed': executed,
+                'failures': failures,
+                'rate': executed / self.interval,
+                'latency median': latencies.percentile(0.5),
+                'latency 95%\'ile': latencies.percentile(0.95),
+                'latency 99%\'ile': latencies.percentile(0.99),
+                'latency max': latencies.max,
+            })
+        return rows
+
+
+def write_interval_stats(path, rows):
+    """Write interval statistics to a JSON file, or a CSV file otherwise.
+
+    :param path: path of the file
+    :type path: str
+    :param rows: the statistics of each interval
+    :type rows: list of dict
+    """
+    with open(path, "w", newline="") as f:
+        if path.endswith(".json"):
+            json.dump(rows, f, indent=2)
+        else:
+            writer = csv.DictWriter(f, IntervalStats.FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+def _stat_unit(name):
+    """Return the unit of a benchmark statistic and if lower is better.
+
+    Statistics that are parameters of the run rather than measurements, like
+    the number of workers or the target rate, are not compared between runs.
+    """
+    words = name.split()
+    if name.endswith("failures rate"):
+        return "%", True
+    if name.endswith(" reuse rate"):
+        return "%", False
+    if name.endswith(" failures"):
+        return "failures", True
+    if " latency " in name or "runtime" in words or name.startswith("extra "):
+        return "seconds", True
+    if name.endswith(" speed") or name.endswith(" achieved rate"):
+        return "%s/s" % words[0], False
+    if name.endswith(" target rate"):
+        return "%s/s" % words[0], None
+    if name.endswith(" bytes"):
+        return "bytes", None
+    return None, None
+
+
+def format_stats(stats):
+    """Format benchmark statistics for display.
+
+    :param stats: statistics as returned by BenchmarkPool.wait_job()
+    :type stats: dict
+    """
+    formatted = {}
+    for name, value in stats.items():
+        unit, __ = _stat_unit(name)
+        if isinstance(value, float) and unit is not None and (
+                " latency " not in name):
+            value = "%.2f %s" % (value, unit)
+        formatted[name] = value
+    return formatted
+
+
+def _latencies(sw, scheduled_at):
+    latency = sw.elapsed()
+    # Wall clock time is used to compare with the schedule of the parent
+    # process
+    if scheduled_at is None:
+        corrected_latency = None
+    else:
+        corrected_latency = max(latency, time.time() - scheduled_at)
+    return latency, corrected_latency
+
+
+def measure_job(scheduled_at, fn, *args, **kwargs):
     # because we cannot pickle BenchmarkPool class
     sw = StopWatch()
-    return fn(*args, **kwargs), sw.elapsed()
+    result = fn(*args, **kwargs)
+    return (result, ) + _latencies(sw, scheduled_at)
+
+
+async def measure_coroutine(scheduled_at, fn, *args, **kwargs):
+    sw = StopWatch()
+    result = await fn(*args, **kwargs)
+    return (result, ) + _latencies(sw, scheduled_at)
+
+
+def summarize_result(result, result_id=None):
+    """Return the size of a result as JSON, and its ID if it is needed.
+
+    :param result: result of a job
+    :param result_id: function returning the ID of a result
+    :type result_id: callable
+    """
+    size = len(json.dumps(result, default=str))
+    return size, None if result_id is None else result_id(result)
+
+
+def summarize_job(result_id, scheduled_at, fn, *args, **kwargs):
+    # The result is summarized in the worker, so that it is not sent back
+    result, latency, corrected_latency = measure_job(
+        scheduled_at, fn, *args, **kwargs)
+    return summarize_result(result, result_id), latency, corrected_latency
+
+
+async def summarize_coroutine(result_id, scheduled_at, fn, *args, **kwargs):
+    result, latency, corrected_latency = await measure_coroutine(
+        scheduled_at, fn, *args, **kwargs)
+    return summarize_result(result, result_id), latency, corrected_latency
+
+
+class IDSpool:
+    """IDs stored in a temporary file, in 16 bytes each.
+
+    The IDs must be UUIDs. They are returned in the order they were added.
+    """
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile()
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, id):
+        record = uuid.UUID(id).bytes
+        with self._lock:
+            self._file.write(record)
+            self.count += 1
+
+    def __iter__(self):
+        with self._lock:
+            self._file.flush()
+            self._file.seek(0)
+            count = self.count
+        try:
+            for _ in range(count):
+                yield str(uuid.UUID(bytes=self._file.read(16)))
+        finally:
+            self._file.seek(0, 2)
+
+    def close(self):
+        self._file.close()
+
+
+class AsyncioExecutor:
+    """Run coroutine functions in an event loop running in its own thread.
+
+    At most max_workers coroutines are awaited at the same time, the others
+    wait for their turn.
+
+    :param max_workers: maximum number of coroutines awaited at once
+    :type max_workers: int
+    """
+
+    DEFAULT_MAX_WORKERS = 100
+
+    def __init__(self, max_workers=None):
+        if max_workers is None:
+            max_workers = self.DEFAULT_MAX_WORKERS
+        self._max_workers = max_workers
+        self._semaphore = asyncio.Semaphore(max_workers)
+        self._cleanups = []
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        name="benchmark-loop", daemon=True)
+        self._thread.start()
+
+    async def _run(self, fn, args, kwargs):
+        async with self._semaphore:
+            return await fn(*args, **kwargs)
+
+    def submit(self, fn, *args, **kwargs):
+        return asyncio.run_coroutine_threadsafe(self._run(fn, args, kwargs),
+                                                self._loop)
+
+    def add_cleanup(self, fn):
+        """Await a coroutine function in the loop before it is stopped."""
+        self._cleanups.append(fn)
+
+    async def _cleanup(self):
+        for fn in self._cleanups:
+            await fn()
+
+    def shutdown(self, wait=True):
+        asyncio.run_coroutine_threadsafe(self._cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        if wait:
+            self._thread.join()
+            self._loop.close()
+
+
+# Client of the jobs run by a worker process of the process executor
+_worker_client = None
+
+
+def _init_worker(client):
+    global _worker_client
+    # The connections opened before the fork belong to the parent process
+    client.api.session.session.close()
+    _worker_client = client
+
+
+class _WorkerMethod:
+    """Method of the client of the worker processes, referenced by name.
+
+    Bound methods of the client cannot be sent to the worker processes, so
+    the jobs of the process executor call this instead.
+    """
+
+    def __init__(self, manager, method):
+        self.manager = manager
+        self.method = method
+
+    def __call__(self, *args, **kwargs):
+        manager = getattr(_worker_client, self.manager)
+        return getattr(manager, self.method)(*args, **kwargs)
+
+
+class _WorkerManager:
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, method):
+        if method.startswith("__"):
+            raise AttributeError(method)
+        return _WorkerMethod(self._name, method)
+
+
+class _WorkerClient:
+    """Client whose methods run with the client of the worker processes."""
+
+    def __getattr__(self, manager):
+        if manager.startswith("__"):
+            raise AttributeError(manager)
+        return _WorkerManager(manager)
+
 
+def _process_executor(max_workers=None, client=None):
+    # The workers are forked so that they inherit the client, its session
+    # and its authentication, which cannot be pickled
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers, mp_context=multiprocessing.get_context("fork"),
+        initializer=None if client is None else _init_worker,
+        initargs=(client, ))
+
+
+EXECUTORS = {
+    "process": _process_executor,
+    "thread": futurist.ThreadPoolExecutor,
+    "async": AsyncioExecutor,
+}
+
+
+class BenchmarkPool:
+    """Run benchmark jobs and compute their statistics.
+
+    By default, jobs are submitted as fast as the workers take them (closed
+    loop). With a rate, they are submitted on a fixed schedule instead
+    (open loop), and the latency is also measured from the time a job was
+    scheduled, so that the time spent waiting for a worker under overload is
+    not omitted. With a duration, the jobs are repeated until the schedule
+    reaches it.
+
+    Jobs run in worker processes by default. They are forked, and each
+    uses its own connections with the client given, whose methods are
+    called through py:class:`_WorkerClient`. The thread executor shares the
+    client and its connections between the workers; with the async executor
+    the jobs must be coroutine functions, awaited by a single event loop.
+
+    In streaming mode, the results of the jobs are not kept: only their size
+    is recorded, and, if result_id is set, their ID is spooled to disk. The
+    memory used does not grow with the number of jobs.
+    """
+
+    def __init__(self, max_workers=None, rate=None, duration=None,
+                 interval=1.0, executor="process", streaming=False,
+                 result_id=None, client=None):
+        if duration is not None and rate is None:
+            raise ValueError("A rate is required to run for a duration")
+        if executor not in EXECUTORS:
+            raise ValueError("Unknown executor: %s" % executor)
+        self.executor = executor
+        if executor == "process":
+            self._executor = EXECUTORS[executor](max_workers, client)
+        else:
+            self._executor = EXECUTORS[executor](max_workers)
+        self._max_workers = self._executor._max_workers
+        self.rate = rate
+        self.duration = duration
+        self.interval = interval
+        self.streaming = streaming
+        self.result_id = result_id
+        self.intervals = None
+        self.ids = None
+        self.verb = None
+        self.executed = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._scheduler = None
+        # Bounds the jobs queued in streaming mode
+        self._pending = threading.Semaphore(2 * self._max_workers)
+
+    def add_cleanup(self, fn):
+        """Await a coroutine function when the async executor shuts down."""
+        self._executor.add_cleanup(fn)
+
+    def close(self):
+        """Remove the IDSpool of the jobs, once their IDs have been used."""
+        if self.ids is not None:
+            self.ids.close()
 
-class BenchmarkPool(futurist.ProcessPoolExecutor):
     def submit_job(self, times, fn, *args, **kwargs):
-        self.sw = StopWatch()
-        self.times = times
-        return [self.submit(measure_job, fn, *args, **kwargs)
-                for i in range(times)]
+        return self._submit_jobs(fn, itertools.repeat(args, times), kwargs)
 
     def map_job(self, fn, iterable, **kwargs):
-        r = []
-        self.times = 0
+        return self._submit_jobs(fn, ((item, ) for item in iterable), kwargs)
+
+    def _submit_jobs(self, fn, args_list, kwargs):
         self.sw = StopWatch()
-        for item in iterable:
-            r.append(self.submit(measure_job, fn, item, **kwargs))
-            self.times += 1
-        return r
+        self.intervals = IntervalStats(self.interval)
+        self.latencies = LatencyHistogram()
+        self.corrected_latencies = LatencyHistogram()
+        self.result_bytes = 0
+        self.ids = IDSpool() if self.streaming and self.result_id else None
+        if self.rate is None:
+            futures = []
+            self.times = 0
+            for args in args_list:
+                if self.streaming:
+                    self._pending.acquire()
+                future = self._submit_job(None, fn, args, kwargs)
+                if not self.streaming:
+                    futures.append(future)
+                self.times += 1
+            return futures
+        if self.duration is not None:
+            self.times = int(self.rate * self.duration)
+            args_list = itertools.islice(itertools.cycle(args_list),
+                                         self.times)
+        else:
+            args_list = list(args_list)
+            self.times = len(args_list)
+        futures = []
+        self._scheduler = threading.Thread(
+            target=self._schedule_jobs, args=(futures, fn, args_list, kwargs),
+            name="benchmark-scheduler", daemon=True)
+        self._scheduler.start()
+        return futures
+
+    def _schedule_jobs(self, futures, fn, args_list, kwargs):
+        interval = 1.0 / self.rate
+        started_at = time.time()
+        for i, args in enumerate(args_list):
+            scheduled_at = started_at + i * interval
+            delay = scheduled_at - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            future = self._submit_job(scheduled_at, fn, args, kwargs)
+            if not self.streaming:
+                futures.append(future)
+
+    def _submit_job(self, scheduled_at, fn, args, kwargs):
+        if self.streaming:
+            if self.executor == "async":
+                measure = summarize_coroutine
+            else:
+                measure = summarize_job
+            measure = functools.partial(measure, self.result_id)
+        elif self.executor == "async":
+            measure = measure_coroutine
+        else:
+            measure = measure_job
+        future = self._executor.submit(measure, scheduled_at, fn, *args,
+                                       **kwargs)
+        future.add_done_callback(self._record_job)
+        return future
+
+    def _job_result(self, future):
+        """Return the latencies and the result size of a job.
+
+        :return: None if the job failed
+        """
+        if future.cancelled():
+            error = "cancelled"
+        else:
+            error = future.exception()
+        if error is not None:
+            LOG.error("Error with %s job: %s", self.verb or "benchmark",
+                      error)
+            return None
+        result, latency, corrected_latency = future.result()
+        size = None
+        if self.streaming:
+            size, key = result
+            if key is not None:
+                self.ids.append(key)
+        return latency, corrected_latency, size
+
+    def _record_job(self, future):
+        try:
+            try:
+                job = self._job_result(future)
+            except Exception:  # noqa
+                LOG.warning("Unable to record the result of a %s job",
+                            self.verb or "benchmark", exc_info=True)
+                job = None
+            with self._lock:
+                self.executed += 1
+                if job is None:
+                    self.failures += 1
+                else:
+                    latency, corrected_latency, size = job
+                    self.latencies.record(latency)
+                    if corrected_latency is not None:
+                        self.corrected_latencies.record(corrected_latency)
+                    if self.streaming:
+                        self.result_bytes += size
+            self.intervals.record(None if job is None else job[0])
+        finally:
+            # A lost slot would block the submission of the next jobs
+            if self.streaming and self.rate is None:
+                self._pending.release()
 
     def _log_progress(self, verb):
         runtime = self.sw.elapsed()
-        done = self.statistics.executed
+        done = self.executed
         rate = done / runtime if runtime != 0 else 0
         LOG.info(
             "%d/%d, "
@@ -100,62 +678,74 @@ class BenchmarkPool(futurist.ProcessPoolExecutor):
             done, self.times, runtime, rate, verb)
 
     def wait_job(self, verb, futures):
-        while self.statistics.executed != self.times:
+        """Wait for the jobs to finish and return their statistics.
+
+        :return: the results of the jobs that succeeded, or, in streaming
+                 mode, the IDSpool of their IDs if result_id is set and an
+                 empty list otherwise; the runtime; the statistics
+        """
+        self.verb = verb
+        while self.executed != self.times:
             self._log_progress(verb)
             time.sleep(0.2)
         runtime = self.sw.elapsed()
         self._log_progress(verb)
-        self.shutdown(wait=True)
-        results = []
-        latencies = []
-        for f in futures:
-            try:
-                result, latency = f.result()
-                results.append(result)
-                latencies.append(latency)
-            except Exception as e:  # noqa
-                LOG.error("Error with %s metric: %s", (verb, e))
-        latencies = sorted(latencies)
-        return results, runtime, {
+        if self._scheduler is not None:
+            self._scheduler.join()
+        self._executor.shutdown(wait=True)
+        if not self.streaming:
+            results = [f.result()[0] for f in futures
+                       if not f.cancelled() and f.exception() is None]
+        elif self.ids is not None:
+            results = self.ids
+        else:
+            results = []
+        latencies = self.latencies
+        executed = self.executed
+        stats = {
+            'client executor': self.executor,
             'client workers': self._max_workers,
-            verb + ' runtime': "%.2f seconds" % runtime,
-            verb + ' runtime (cumulated)': "%.2f seconds" % sum(latencies),
-            verb + ' executed': self.statistics.executed,
+            verb + ' runtime': runtime,
+            verb + ' runtime (cumulated)': latencies.total,
+            verb + ' executed': executed,
             verb + ' speed': (
-                "%.2f %s/s" % ((self.statistics.executed * self._max_workers /
-                                sum(latencies))
-                               if runtime != 0 else 0, verb)
+                executed * self._max_workers / latencies.total
+                if latencies.total != 0 else 0
             ),
-            verb + ' failures': self.statistics.failures,
+            verb + ' failures': self.failures,
             verb + ' failures rate': (
-                "%.2f %%" % (
-                    100 * self.statistics.failures /
-                    float(self.statistics.executed)
-                )
+                100 * self.failures / float(executed)
+                if executed != 0 else 0
             ),
-            verb + ' latency min': min(latencies),
-            verb + ' latency max': max(latencies),
-            verb + ' latency mean': sum(latencies) / len(latencies),
-            verb + ' latency median': self._percentile(latencies, 0.5),
-            verb + ' latency 95%\'ile': self._percentile(latencies, 0.95),
-            verb + ' latency 99%\'ile': self._percentile(latencies, 0.99),
-            verb + ' latency 99.9%\'ile': self._percentile(latencies, 0.999),
-
         }
+        stats.update(self._latency_stats(verb + ' latency', latencies))
+        if self.rate is not None:
+            stats[verb + ' target rate'] = self.rate
+            stats[verb + ' achieved rate'] = (
+                executed / runtime if runtime != 0 else 0)
+            stats.update(self._latency_stats(verb + ' corrected latency',
+                                             self.corrected_latencies))
+        if self.streaming:
+            succeeded = executed - self.failures
+            stats[verb + ' result bytes'] = self.result_bytes
+            stats[verb + ' mean result bytes'] = (
+                self.result_bytes / float(succeeded) if succeeded else 0)
+        return results, runtime, stats
 
     @staticmethod
-    def _percentile(sorted_list, percent):
-        # NOTE(sileht): we don't to want depends on numpy
-        if not sorted_list:
-            return None
-        k = (len(sorted_list) - 1) * percent
-        f = math.floor(k)
-        c = math.ceil(k)
-        if f == c:
-            return sorted_list[int(k)]
-        d0 = sorted_list[int(f)] * (c - k)
-        d1 = sorted_list[int(c)] * (k - f)
-        return d0 + d1
+    def _latency_stats(prefix, histogram):
+        if not histogram:
+            return {}
+        return {
+            prefix + ' min': histogram.min,
+            prefix + ' max': histogram.max,
+            prefix + ' mean': histogram.mean,
+            prefix + ' median': histogram.percentile(0.5),
+            prefix + ' 95%\'ile': histogram.percentile(0.95),
+            prefix + ' 99%\'ile': histogram.percentile(0.99),
+            prefix + ' 99.9%\'ile': histogram.percentile(0.999),
+            prefix + ' 99.99%\'ile': histogram.percentile(0.9999),
+        }
 
 
 class CliBenchmarkBase(show.ShowOne):
@@ -163,10 +753,180 @@ class CliBenchmarkBase(show.ShowOne):
         parser = super(CliBenchmarkBase, self).get_parser(prog_name)
         parser.add_argument("--workers", "-w",
                             default=None,
-                            type=_positive_non_zero_int,
+                            type=utils.positive_non_zero_int,
                             help="Number of workers to use")
+        parser.add_argument("--executor",
+                            default="process",
+                            choices=sorted(EXECUTORS),
+                            help=("How to run the workers: in forked "
+                                  "processes with their own connections, "
+                                  "in threads sharing the client and its "
+                                  "connection pool, which should be at "
+                                  "least as large as the number of workers "
+                                  "(see --pool-maxsize), or as "
+                                  "coroutines of a single event loop "
+                                  "sharing a connection pool, which "
+                                  "requires aiohttp (default: process)"))
+        parser.add_argument("--rate",
+                            type=_rate,
+                            help=("Send requests on a fixed schedule at "
+                                  "this rate, e.g. 100 or 100/s, rather "
+                                  "than as fast as the workers allow; "
+                                  "latencies corrected for the time spent "
+                                  "waiting for a worker are also reported"))
+        parser.add_argument("--duration",
+                            type=_positive_non_zero_float,
+                            help=("Number of seconds to run for, repeating "
+                                  "the requests if needed (requires "
+                                  "--rate)"))
+        parser.add_argument("--streaming",
+                            action="store_true",
+                            help=("Do not keep the results of the requests "
+                                  "in memory, only their count, size and "
+                                  "latency, so that long runs use a "
+                                  "constant amount of memory; the IDs of "
+                                  "the objects to delete afterwards are "
+                                  "kept in a temporary file"))
+        parser.add_argument("--save",
+                            metavar="FILE",
+                            help=("Save the raw results of the run to this "
+                                  "JSON file, to compare them later with "
+                                  "'benchmark compare'"))
+        parser.add_argument("--timeseries-file",
+                            help=("Write the throughput and latencies of "
+                                  "each interval of the run to this file, "
+                                  "as JSON if its name ends with .json, "
+                                  "as CSV otherwise"))
+        parser.add_argument("--timeseries-interval",
+                            default=1.0,
+                            type=_positive_non_zero_float,
+                            help=("Duration of the intervals of "
+                                  "--timeseries-file in seconds "
+                                  "(default: 1)"))
         return parser
 
+    def run(self, parsed_args):
+        self._pools = []
+        try:
+            result = super(CliBenchmarkBase, self).run(parsed_args)
+        finally:
+            for pool in self._pools:
+                pool.close()
+        if parsed_args.timeseries_file:
+            write_interval_stats(parsed_args.timeseries_file,
+                                 self._interval_rows())
+        return result
+
+    def _interval_rows(self):
+        return [row for pool in self._pools if pool.verb is not None
+                for row in pool.intervals.rows(pool.verb)]
+
+    def _output(self, parsed_args, stats):
+        stats.update(self._client_stats())
+        if parsed_args.save:
+            with open(parsed_args.save, "w") as f:
+                json.dump({
+                    "command": self.cmd_name,
+                    "date": datetime.datetime.now(
+                        tz=datetime.timezone.utc).isoformat(),
+                    "stats": stats,
+                    "intervals": self._interval_rows(),
+                }, f, indent=2)
+        return self.dict2columns(format_stats(stats))
+
+    def _get_pool(self, parsed_args, open_loop=True, result_id=None):
+        if open_loop:
+            pool = BenchmarkPool(parsed_args.workers, rate=parsed_args.rate,
+                                 duration=parsed_args.duration,
+                                 interval=parsed_args.timeseries_interval,
+                                 executor=parsed_args.executor,
+                                 streaming=parsed_args.streaming,
+                                 result_id=result_id,
+                                 client=utils.get_client(self))
+        else:
+            pool = BenchmarkPool(parsed_args.workers,
+                                 interval=parsed_args.timeseries_interval,
+                                 executor=parsed_args.executor,
+                                 streaming=parsed_args.streaming,
+                                 result_id=result_id,
+                                 client=utils.get_client(self))
+        self._pools.append(pool)
+        return pool
+
+    def _client_stats(self):
+        """Return the connection and compression counters of the client.
+
+        They are only reported for the thread executor, whose workers share
+        the command client.
+        """
+        if not any(pool.executor == "thread" for pool in self._pools):
+            return {}
+        client = utils.get_client(self)
+        stats = {}
+        counters = getattr(client, "connection_stats", lambda: None)()
+        if counters is not None:
+            stats.update({
+                "client connections opened": counters["connections"],
+                "client connections reused": counters["reused"],
+                "client connections reuse rate": (
+                    100 * counters["reused"] / float(counters["requests"])
+                    if counters["requests"] != 0 else 0
+                ),
+            })
+        counters = getattr(client, "compression_stats", lambda: {})()
+        if counters.get("requests compressed"):
+            stats.update({
+                "client requests compressed": counters["requests compressed"],
+                "client request bytes": counters["request bytes"],
+                "client request compressed bytes": (
+                    counters["request compressed bytes"]),
+                "client compression runtime": counters["compression seconds"],
+            })
+        if counters.get("responses decompressed"):
+            stats.update({
+                "client responses decompressed": (
+                    counters["responses decompressed"]),
+                "client response compressed bytes": (
+                    counters["response compressed bytes"]),
+                "client response bytes": counters["response bytes"],
+            })
+        return stats
+
+    @staticmethod
+    def _get_ids(pool, results):
+        """Return the IDs of the objects created by the jobs of a pool."""
+        if pool.streaming:
+            # Already spooled by the pool
+            return results
+        return [r['id'] for r in results]
+
+    def _get_client(self, pool):
+        """Return the client whose methods are run by the pool.
+
+        With the process executor, its methods run with the command client
+        inherited by the worker processes. With the async executor, this is
+        an asyncio client sharing the session of the command client, closed
+        when the pool shuts down.
+        """
+        if pool.executor == "process":
+            return _WorkerClient()
+        client = utils.get_client(self)
+        if pool.executor != "async":
+            return client
+        from gnocchiclient.v1 import aio
+
+        api = client.api
+        aio_client = aio.Client(
+            session=api.session,
+            adapter_options=dict(service_type=api.service_type,
+                                 service_name=api.service_name,
+                                 interface=api.interface,
+                                 region_name=api.region_name,
+                                 endpoint_override=api.endpoint_override),
+            connection_limit=pool._max_workers)
+        pool.add_cleanup(aio_client.close)
+        return aio_client
+
 
 class CliBenchmarkMetricShow(CliBenchmarkBase,
                              metric_cli.CliMetricWithResourceID):
@@ -178,18 +938,18 @@ class CliBenchmarkMetricShow(CliBenchmarkBase,
                             help="ID or name of the metrics")
         parser.add_argument("--count", "-n",
                             required=True,
-                            type=_positive_non_zero_int,
+                            type=utils.positive_non_zero_int,
                             help="Number of metrics to get")
         return parser
 
     def take_action(self, parsed_args):
-        pool = BenchmarkPool(parsed_args.workers)
+        pool = self._get_pool(parsed_args)
         LOG.info("Getting metrics")
-        futures = pool.map_job(utils.get_client(self).metric.get,
+        futures = pool.map_job(self._get_client(pool).metric.get,
                                parsed_args.metric * parsed_args.count,
                                resource_id=parsed_args.resource_id)
         result, runtime, stats = pool.wait_job("show", futures)
-        return self.dict2columns(stats)
+        return self._output(parsed_args, stats)
 
 
 class CliBenchmarkMetricCreate(CliBenchmarkBase,
@@ -200,7 +960,7 @@ class CliBenchmarkMetricCreate(CliBenchmarkBase,
         parser = super(CliBenchmarkMetricCreate, self).get_parser(prog_name)
         parser.add_argument("--count", "-n",
                             required=True,
-                            type=_positive_non_zero_int,
+                            type=utils.positive_non_zero_int,
                             help="Number of metrics to create")
         parser.add_argument("--keep", "-k",
                             action='store_true',
@@ -208,41 +968,64 @@ class CliBenchmarkMetricCreate(CliBenchmarkBase,
         return parser
 
     def take_action(self, parsed_args):
-        pool = BenchmarkPool(parsed_args.workers)
+        pool = self._get_pool(
+            parsed_args,
+            result_id=None if parsed_args.keep else operator.itemgetter("id"))
 
         LOG.info("Creating metrics")
+        metric = self._get_client(pool).metric
+        # The create() of the asyncio client is not deprecated, unlike the
+        # one of the synchronous client which cannot be pickled
         futures = pool.submit_job(
             parsed_args.count,
-            utils.get_client(self).metric._create_new,
+            metric.create if pool.executor == "async" else metric._create_new,
             archive_policy_name=parsed_args.archive_policy_name,
             resource_id=parsed_args.resource_id)
         created_metrics, runtime, stats = pool.wait_job("create", futures)
 
         if not parsed_args.keep:
             LOG.info("Deleting metrics")
-            pool = BenchmarkPool(parsed_args.workers)
-            futures = pool.map_job(utils.get_client(self).metric.delete,
-                                   [m['id'] for m in created_metrics])
+            pool = self._get_pool(parsed_args, open_loop=False)
+            futures = pool.map_job(self._get_client(pool).metric.delete,
+                                   self._get_ids(pool, created_metrics))
             _, runtime, dstats = pool.wait_job("delete", futures)
             stats.update(dstats)
 
-        return self.dict2columns(stats)
+        return self._output(parsed_args, stats)
 
 
-class CliBenchmarkMeasuresAdd(CliBenchmarkBase,
-                              metric_cli.CliMeasuresAddBase):
-    """Do benchmark testing of adding measurements."""
+def _random_measures(start, end, count):
+    """Return measures with random values evenly spread in a time range.
+
+    :param start: first timestamp to use
+    :type start: datetime.datetime
+    :param end: last timestamp to use
+    :type end: datetime.datetime
+    :param count: number of measures
+    :type count: int
+    """
+    start = int(start.strftime("%s"))
+    end = int(end.strftime("%s"))
+
+    if (end - start) < count:
+        raise ValueError(
+            "The specified time range is not large enough "
+            "for the number of points")
 
+    random_values = (random.randint(- 2 ** 32, 2 ** 32)
+                     for _ in range(count))
+    return [{"timestamp": ts, "value": v}
+            for ts, v
+            in zip(
+                range(start,
+                      end,
+                      (end - start) // count),
+                random_values)]
+
+
+class CliBenchmarkMeasuresBase(CliBenchmarkBase):
     def get_parser(self, prog_name):
-        parser = super(CliBenchmarkMeasuresAdd, self).get_parser(prog_name)
-        parser.add_argument("--count", "-n",
-                            required=True,
-                            type=_positive_non_zero_int,
-                            help="Number of total measures to send")
-        parser.add_argument("--batch", "-b",
-                            default=1,
-                            type=_positive_non_zero_int,
-                            help="Number of measures to send in each batch")
+        parser = super(CliBenchmarkMeasuresBase, self).get_parser(prog_name)
         parser.add_argument("--timestamp-start", "-s",
                             default=(
                                 datetime.datetime.now(tz=iso8601.iso8601.UTC) -
@@ -260,50 +1043,18 @@ class CliBenchmarkMeasuresAdd(CliBenchmarkBase,
                             help="Wait for all measures to be processed")
         return parser
 
-    def take_action(self, parsed_args):
-        pool = BenchmarkPool(parsed_args.workers)
-        LOG.info("Sending measures")
-
+    def _get_measures(self, parsed_args, count):
         if parsed_args.timestamp_end <= parsed_args.timestamp_start:
             raise ValueError("End timestamp must be after start timestamp")
+        return _random_measures(parsed_args.timestamp_start,
+                                parsed_args.timestamp_end, count)
 
-        # If batch size is bigger than the number of measures to send, we
-        # reduce it to make sure we send something.
-        if parsed_args.batch > parsed_args.count:
-            parsed_args.batch = parsed_args.count
-
-        start = int(parsed_args.timestamp_start.strftime("%s"))
-        end = int(parsed_args.timestamp_end.strftime("%s"))
-        count = parsed_args.batch
-
-        if (end - start) < count:
-            raise ValueError(
-                "The specified time range is not large enough "
-                "for the number of points")
-
-        random_values = (random.randint(- 2 ** 32, 2 ** 32)
-                         for _ in range(count))
-        measures = [{"timestamp": ts, "value": v}
-                    for ts, v
-                    in zip(
-                        range(start,
-                              end,
-                              (end - start) // count),
-                        random_values)]
-
-        times = parsed_args.count // parsed_args.batch
-        futures = pool.map_job(functools.partial(
-            utils.get_client(self).metric.add_measures,
-            parsed_args.metric), itertools.repeat(measures, times),
-            resource_id=parsed_args.resource_id)
+    def _push(self, parsed_args, pool, fn, payload, times, measures):
+        futures = pool.map_job(fn, itertools.repeat(payload, times))
         _, runtime, stats = pool.wait_job("push", futures)
 
-        stats['measures per request'] = parsed_args.batch
-        stats['measures push speed'] = (
-            "%.2f push/s" % (
-                parsed_args.batch * float(stats['push speed'][:-7])
-            )
-        )
+        stats['measures per request'] = measures
+        stats['measures push speed'] = measures * stats['push speed']
 
         if parsed_args.wait:
             sw = StopWatch()
@@ -311,9 +1062,7 @@ class CliBenchmarkMeasuresAdd(CliBenchmarkBase,
                 status = utils.get_client(self).status.get()
                 remaining = int(status['storage']['summary']['measures'])
                 if remaining == 0:
-                    stats['extra wait to process measures'] = (
-                        "%s seconds" % sw.elapsed()
-                    )
+                    stats['extra wait to process measures'] = sw.elapsed()
                     break
                 else:
                     LOG.info(
@@ -321,31 +1070,355 @@ class CliBenchmarkMeasuresAdd(CliBenchmarkBase,
                         remaining)
                 time.sleep(1)
 
-        return self.dict2columns(stats)
+        return stats
+
+
+class CliBenchmarkMeasuresAdd(CliBenchmarkMeasuresBase,
+                              metric_cli.CliMeasuresAddBase):
+    """Do benchmark testing of adding measurements."""
+
+    def get_parser(self, prog_name):
+        parser = super(CliBenchmarkMeasuresAdd, self).get_parser(prog_name)
+        parser.add_argument("--count", "-n",
+                            required=True,
+                            type=utils.positive_non_zero_int,
+                            help="Number of total measures to send")
+        parser.add_argument("--batch", "-b",
+                            default=1,
+                            type=utils.positive_non_zero_int,
+                            help="Number of measures to send in each batch")
+        return parser
+
+    def take_action(self, parsed_args):
+        pool = self._get_pool(parsed_args)
+        LOG.info("Sending measures")
+
+        # If batch size is bigger than the number of measures to send, we
+        # reduce it to make sure we send something.
+        if parsed_args.batch > parsed_args.count:
+            parsed_args.batch = parsed_args.count
+
+        measures = self._get_measures(parsed_args, parsed_args.batch)
+
+        stats = self._push(
+            parsed_args, pool,
+            functools.partial(self._get_client(pool).metric.add_measures,
+                              parsed_args.metric,
+                              resource_id=parsed_args.resource_id),
+            measures, parsed_args.count // parsed_args.batch,
+            parsed_args.batch)
+
+        return self._output(parsed_args, stats)
+
+
+class CliBenchmarkMeasuresBatch(CliBenchmarkMeasuresBase):
+    """Do benchmark testing of sending measurements in batches.
+
+    Resources with metrics are created first, then each request sends
+    measures to all their metrics at once. They are deleted afterwards
+    unless --keep is used.
+    """
+
+    def get_parser(self, prog_name):
+        parser = super(CliBenchmarkMeasuresBatch, self).get_parser(prog_name)
+        parser.add_argument("--count", "-n",
+                            required=True,
+                            type=utils.positive_non_zero_int,
+                            help="Number of batches to send")
+        parser.add_argument("--resources",
+                            default=1,
+                            type=utils.positive_non_zero_int,
+                            help="Number of resources in each batch")
+        parser.add_argument("--metrics", "-m",
+                            default=1,
+                            type=utils.positive_non_zero_int,
+                            help="Number of metrics of each resource")
+        parser.add_argument("--points", "-p",
+                            default=1,
+                            type=utils.positive_non_zero_int,
+                            help="Number of measures of each metric")
+        parser.add_argument("--by-metric-id",
+                            action='store_true',
+                            help=("Address the metrics by ID rather than by "
+                                  "resource and metric name"))
+        parser.add_argument("--archive-policy-name", "-a",
+                            dest="archive_policy_name",
+                            help="name of the archive policy of the metrics")
+        parser.add_argument("--keep", "-k",
+                            action='store_true',
+                            help="Keep created resources")
+        return parser
+
+    def take_action(self, parsed_args):
+        measures = self._get_measures(parsed_args, parsed_args.points)
+
+        LOG.info("Creating resources")
+        client = utils.get_client(self)
+        metric = {}
+        if parsed_args.archive_policy_name is not None:
+            metric["archive_policy_name"] = parsed_args.archive_policy_name
+        resources = [
+            client.resource.create("generic", {
+                "id": str(uuid.uuid4()),
+                "metrics": {"metric-%d" % i: metric
+                            for i in range(parsed_args.metrics)},
+            })
+            for _ in range(parsed_args.resources)
+        ]
+
+        try:
+            pool = self._get_pool(parsed_args)
+            LOG.info("Sending measures")
+            if parsed_args.by_metric_id:
+                fn = self._get_client(pool).metric.batch_metrics_measures
+                payload = {metric_id: measures for r in resources
+                           for metric_id in r["metrics"].values()}
+            else:
+                fn = self._get_client(
+                    pool).metric.batch_resources_metrics_measures
+                payload = {r["id"]: {name: measures for name in r["metrics"]}
+                           for r in resources}
+            stats = self._push(
+                parsed_args, pool, fn, payload, parsed_args.count,
+                parsed_args.resources * parsed_args.metrics *
+                parsed_args.points)
+        finally:
+            if not parsed_args.keep:
+                LOG.info("Deleting resources")
+                client.resource.bulk_delete([r["id"] for r in resources])
+
+        return self._output(parsed_args, stats)
 
 
 class CliBenchmarkMeasuresShow(CliBenchmarkBase,
                                metric_cli.CliMeasuresShow):
     """Do benchmark testing of measurements show."""
 
+    @staticmethod
+    def _add_split_arguments(parser):
+        # Each request fetches one metric, the concurrency is set by the
+        # workers
+        pass
+
     def get_parser(self, prog_name):
         parser = super(CliBenchmarkMeasuresShow, self).get_parser(prog_name)
         parser.add_argument("--count", "-n",
                             required=True,
-                            type=_positive_non_zero_int,
+                            type=utils.positive_non_zero_int,
                             help="Number of total measures to send")
         return parser
 
     def take_action(self, parsed_args):
-        pool = BenchmarkPool(parsed_args.workers)
+        pool = self._get_pool(parsed_args)
         LOG.info("Getting measures")
+        futures = pool.map_job(self._get_client(pool).metric.get_measures,
+                               itertools.islice(
+                                   itertools.cycle(parsed_args.metric),
+                                   parsed_args.count),
+                               resource_id=parsed_args.resource_id,
+                               aggregation=parsed_args.aggregation,
+                               start=parsed_args.start,
+                               stop=parsed_args.stop)
+        result, runtime, stats = pool.wait_job("show", futures)
+        if result:
+            stats['measures per request'] = len(result[0])
+        return self._output(parsed_args, stats)
+
+
+class CliBenchmarkResourceCreate(CliBenchmarkBase):
+    """Do benchmark testing of resource creation."""
+
+    def get_parser(self, prog_name):
+        parser = super(CliBenchmarkResourceCreate, self).get_parser(prog_name)
+        parser.add_argument("--count", "-n",
+                            required=True,
+                            type=utils.positive_non_zero_int,
+                            help="Number of resources to create")
+        parser.add_argument("--type", "-t", dest="resource_type",
+                            default="generic", help="Type of resource")
+        parser.add_argument("--metrics", "-m",
+                            default=0,
+                            type=int,
+                            help="Number of metrics to create with each "
+                            "resource")
+        parser.add_argument("--archive-policy-name", "-a",
+                            dest="archive_policy_name",
+                            help="name of the archive policy of the metrics")
+        parser.add_argument("--keep", "-k",
+                            action='store_true',
+                            help="Keep created resources")
+        return parser
+
+    def take_action(self, parsed_args):
+        pool = self._get_pool(
+            parsed_args,
+            result_id=None if parsed_args.keep else operator.itemgetter("id"))
+
+        count = parsed_args.count
+        if parsed_args.duration is not None:
+            # Resource IDs must not be reused when the requests are repeated
+            count = max(count, int(parsed_args.rate * parsed_args.duration))
+        metric = {}
+        if parsed_args.archive_policy_name is not None:
+            metric["archive_policy_name"] = parsed_args.archive_policy_name
+        resources = ({"id": str(uuid.uuid4()),
+                      "metrics": {"metric-%d" % i: metric
+                                  for i in range(parsed_args.metrics)}}
+                     for _ in range(count))
+
+        LOG.info("Creating resources")
+        futures = pool.map_job(functools.partial(
+            self._get_client(pool).resource.create,
+            parsed_args.resource_type), resources)
+        created_resources, runtime, stats = pool.wait_job("create", futures)
+        stats['metrics per resource'] = parsed_args.metrics
+
+        if not parsed_args.keep:
+            LOG.info("Deleting resources")
+            pool = self._get_pool(parsed_args, open_loop=False)
+            futures = pool.map_job(self._get_client(pool).resource.delete,
+                                   self._get_ids(pool, created_resources))
+            _, runtime, dstats = pool.wait_job("delete", futures)
+            stats.update(dstats)
+
+        return self._output(parsed_args, stats)
+
+
+class CliBenchmarkResourceSearch(CliBenchmarkBase,
+                                 resource_cli.CliResourceSearch):
+    """Do benchmark testing of resource search."""
+
+    def get_parser(self, prog_name):
+        parser = super(CliBenchmarkResourceSearch, self).get_parser(prog_name)
+        parser.add_argument("--count", "-n",
+                            required=True,
+                            type=utils.positive_non_zero_int,
+                            help="Number of searches to do")
+        return parser
+
+    def take_action(self, parsed_args):
+        pool = self._get_pool(parsed_args)
+        LOG.info("Searching resources")
+        futures = pool.submit_job(parsed_args.count,
+                                  self._get_client(pool).resource.search,
+                                  resource_type=parsed_args.resource_type,
+                                  query=parsed_args.query,
+                                  **utils.get_pagination_options(parsed_args))
+        result, runtime, stats = pool.wait_job("search", futures)
+        if result:
+            stats['resources per request'] = len(result[0])
+        return self._output(parsed_args, stats)
+
+
+class CliBenchmarkAggregates(CliBenchmarkBase, aggregates_cli.CliAggregates):
+    """Do benchmark testing of aggregates."""
+
+    def get_parser(self, prog_name):
+        parser = super(CliBenchmarkAggregates, self).get_parser(prog_name)
+        parser.add_argument("--count", "-n",
+                            required=True,
+                            type=utils.positive_non_zero_int,
+                            help="Number of aggregates to get")
+        return parser
+
+    def take_action(self, parsed_args):
+        pool = self._get_pool(parsed_args)
+        LOG.info("Getting aggregates")
         futures = pool.submit_job(parsed_args.count,
-                                  utils.get_client(self).metric.get_measures,
-                                  metric=parsed_args.metric,
-                                  resource_id=parsed_args.resource_id,
-                                  aggregation=parsed_args.aggregation,
+                                  self._get_client(pool).aggregates.fetch,
+                                  operations=parsed_args.operations,
+                                  resource_type=parsed_args.resource_type,
+                                  search=parsed_args.search,
                                   start=parsed_args.start,
-                                  stop=parsed_args.stop)
-        result, runtime, stats = pool.wait_job("show", futures)
-        stats['measures per request'] = len(result[0])
-        return self.dict2columns(stats)
+                                  stop=parsed_args.stop,
+                                  granularity=parsed_args.granularity,
+                                  needed_overlap=parsed_args.needed_overlap,
+                                  groupby=parsed_args.groupby,
+                                  fill=parsed_args.fill,
+                                  use_history=parsed_args.use_history)
+        result, runtime, stats = pool.wait_job("fetch", futures)
+        if result and parsed_args.search and parsed_args.groupby:
+            stats['groups per request'] = len(result[0])
+        return self._output(parsed_args, stats)
+
+
+class CliBenchmarkCompare(lister.Lister):
+    """Compare the results of two benchmark runs.
+
+    The command exits with status 1 if a statistic regressed by more than
+    its threshold.
+    """
+
+    COLS = ('stat', 'baseline', 'current', 'change', 'status')
+
+    def get_parser(self, prog_name):
+        parser = super(CliBenchmarkCompare, self).get_parser(prog_name)
+        parser.add_argument("baseline",
+                            help="Results of the reference run, as saved "
+                            "by --save")
+        parser.add_argument("current",
+                            help="Results of the run to check, as saved "
+                            "by --save")
+        parser.add_argument("--threshold",
+                            default=10.0,
+                            type=float,
+                            help=("Maximum degradation allowed, in percent "
+                                  "of the baseline (default: 10)"))
+        parser.add_argument("--stat-threshold",
+                            action="append",
+                            default=[],
+                            type=self._stat_threshold,
+                            metavar="STAT=PERCENT",
+                            help=("Maximum degradation allowed for a "
+                                  "statistic, overrides --threshold; "
+                                  "can be repeated"))
+        return parser
+
+    @staticmethod
+    def _stat_threshold(value):
+        name, sep, threshold = value.rpartition("=")
+        try:
+            return name, float(threshold)
+        except ValueError:
+            raise argparse.ArgumentTypeError(
+                "%s must be formatted as STAT=PERCENT" % value)
+
+    @staticmethod
+    def _load(path):
+        with open(path) as f:
+            return json.load(f)["stats"]
+
+    def run(self, parsed_args):
+        super(CliBenchmarkCompare, self).run(parsed_args)
+        if self.regressions:
+            LOG.error("Regressions: %s", ", ".join(self.regressions))
+            return 1
+        return 0
+
+    def take_action(self, parsed_args):
+        baseline = self._load(parsed_args.baseline)
+        current = self._load(parsed_args.current)
+        thresholds = dict(parsed_args.stat_threshold)
+        self.regressions = []
+        rows = []
+        for name in sorted(set(baseline) & set(current)):
+            old, new = baseline[name], current[name]
+            unit, lower_is_better = _stat_unit(name)
+            if (lower_is_better is None or
+                    not isinstance(old, (int, float)) or
+                    not isinstance(new, (int, float))):
+                continue
+            if old == 0:
+                change = 0.0 if new == 0 else math.inf
+            else:
+                change = 100.0 * (new - old) / old
+            degradation = change if lower_is_better else -change
+            if degradation > thresholds.get(name, parsed_args.threshold):
+                status = "regression"
+                self.regressions.append(name)
+            elif degradation < 0:
+                status = "improvement"
+            else:
+                status = "ok"
+            rows.append((name, old, new, "%+.2f %%" % change, status))
+        return self.COLS, rows
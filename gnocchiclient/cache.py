@@ -0,0 +1,321 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import collections
+import datetime
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import ujson
+
+
+LOG = logging.getLogger(__name__)
+
+
+def user_cache_dir():
+    """Return the directory where gnocchiclient caches data for the user."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "gnocchiclient")
+
+
+class TTLCache:
+    """Thread-safe cache whose entries expire after some time.
+
+    Entries are kept in memory and, if a path is given, in one JSON file per
+    entry in this directory so that they are shared between processes. The
+    values must then be serializable to JSON.
+
+    :param ttl: number of seconds an entry is valid for
+    :type ttl: float
+    :param maxsize: maximum number of entries kept in memory, the least
+                    recently used are evicted first
+    :type maxsize: int
+    :param path: directory where to store the entries on disk
+    :type path: str
+    """
+
+    def __init__(self, ttl=300, maxsize=1024, path=None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def _filename(self, key):
+        digest = hashlib.sha256(ujson.dumps(key).encode("utf-8"))
+        return os.path.join(self.path, digest.hexdigest() + ".json")
+
+    def get(self, key, default=None):
+        """Return the value of a key if it has not expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self._entries.pop(key, None)
+        entry = self._load(key, now)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._store(key, entry)
+        return entry[1]
+
+    def set(self, key, value, ttl=None):
+        """Store the value of a key.
+
+        :param ttl: number of seconds the entry is valid for, defaults to the
+                    ttl of the cache
+        :type ttl: float
+        """
+        entry = (time.time() + (self.ttl if ttl is None else ttl), value)
+        with self._lock:
+            self._store(key, entry)
+        if self.path is not None:
+            self._dump(key, entry)
+
+    def invalidate(self, key):
+        """Remove a key from the cache."""
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.path is not None:
+            try:
+                os.unlink(self._filename(key))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        """Remove all the entries from memory."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return the number of hits, misses and entries in memory.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "entries": len(self._entries)}
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while self.maxsize is not None and len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _load(self, key, now):
+        if self.path is None:
+            return None
+        try:
+            with open(self._filename(key)) as f:
+                data = ujson.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            LOG.debug("Ignoring unreadable cache entry", exc_info=True)
+            return None
+        if data.get("key") != ujson.loads(ujson.dumps(key)) or (
+                data.get("expires", 0) <= now):
+            return None
+        return data["expires"], data["value"]
+
+    def _dump(self, key, entry):
+        try:
+            os.makedirs(self.path, mode=0o700, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    ujson.dump({"key": key, "expires": entry[0],
+                                "value": entry[1]}, f)
+                os.replace(tmp, self._filename(key))
+            finally:
+                # Only left behind when the entry could not be written
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+        except OSError:
+            LOG.debug("Unable to write cache entry", exc_info=True)
+
+
+class HTTPCache:
+    """Cache of GET responses revalidated with conditional requests.
+
+    Responses with an ETag or a Last-Modified header are kept, and the
+    following requests of the same URL send If-None-Match or
+    If-Modified-Since: when the server answers 304 Not Modified, the cached
+    response is returned.
+
+    :param maxsize: maximum number of responses kept, the least recently
+                    used are evicted first
+    :type maxsize: int
+    :param ttl: number of seconds a response is kept for
+    :type ttl: float
+    :param ttls: number of seconds the responses are kept for by URL prefix,
+                 e.g. {"v1/resource/": 60}, the longest matching prefix is
+                 used
+    :type ttls: dict
+    """
+
+    def __init__(self, maxsize=256, ttl=300, ttls=None):
+        self._responses = TTLCache(ttl=ttl, maxsize=maxsize)
+        self.ttls = sorted((ttls or {}).items(), key=lambda i: -len(i[0]))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _ttl(self, url):
+        for prefix, ttl in self.ttls:
+            if url.startswith(prefix):
+                return ttl
+        return self._responses.ttl
+
+    @staticmethod
+    def _key(url, params, headers):
+        if isinstance(params, dict):
+            params = sorted((k, str(v)) for k, v in params.items()
+                            if v is not None)
+        return (url, ujson.dumps(params), headers.get("Accept"))
+
+    def get(self, fetch, url, headers=None, params=None, **kwargs):
+        """Get a URL, from the cache if it has not been modified.
+
+        :param fetch: function doing the GET request, like
+                      py:meth:`keystoneauth1.adapter.Adapter.get`
+        :type fetch: callable
+        :param url: URL to get
+        :type url: str
+        """
+        headers = dict(headers or {})
+        key = self._key(url, params, headers)
+        cached = self._responses.get(key)
+        if cached is not None:
+            etag = cached.headers.get("ETag")
+            last_modified = cached.headers.get("Last-Modified")
+            if etag is not None:
+                headers["If-None-Match"] = etag
+            if last_modified is not None:
+                headers["If-Modified-Since"] = last_modified
+        resp = fetch(url, headers=headers, params=params, **kwargs)
+        if cached is not None and resp.status_code == 304:
+            with self._lock:
+                self.hits += 1
+            # Keep the entry for another TTL, it is still valid
+            self._responses.set(key, cached, self._ttl(url))
+            return cached
+        with self._lock:
+            self.misses += 1
+        if resp.status_code == 200 and (
+                "ETag" in resp.headers or "Last-Modified" in resp.headers):
+            self._responses.set(key, resp, self._ttl(url))
+        elif cached is not None:
+            self._responses.invalidate(key)
+        return resp
+
+    def clear(self):
+        """Remove all the responses from the cache."""
+        self._responses.clear()
+
+    def stats(self):
+        """Return the number of hits, misses and responses kept.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "entries": self._responses.stats()["entries"]}
+
+
+class AuthCache:
+    """Cache of the tokens of keystone identity plugins between processes.
+
+    The authentication state of a plugin, i.e. its token and service
+    catalog, is stored on disk, readable by the user only, until the token
+    expires. The entries are keyed by the identity of the plugin, which
+    covers its auth URL, user, project and credentials, and by region.
+
+    :param path: directory where to store the tokens, defaults to the auth
+                 directory of the user cache directory
+    :type path: str
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.path.join(user_cache_dir(), "auth")
+        self._states = TTLCache(ttl=0, maxsize=None, path=path)
+
+    @staticmethod
+    def _key(plugin, region_name):
+        # Only identity plugins have a state to save, the others like the
+        # Gnocchi ones have no cache id
+        cache_id = plugin.get_cache_id()
+        if cache_id is None:
+            return None
+        return ("auth", cache_id, region_name)
+
+    def load(self, plugin, region_name=None):
+        """Install the cached token of a plugin if it has not expired.
+
+        :return: whether a token has been loaded
+        :rtype: bool
+        """
+        key = self._key(plugin, region_name)
+        if key is None:
+            return False
+        state = self._states.get(key)
+        if state is None:
+            return False
+        plugin.set_auth_state(state)
+        return True
+
+    def save(self, plugin, region_name=None):
+        """Store the token of a plugin until it expires."""
+        key = self._key(plugin, region_name)
+        auth_ref = getattr(plugin, "auth_ref", None)
+        if key is None or auth_ref is None or auth_ref.expires is None:
+            return
+        ttl = (auth_ref.expires - datetime.datetime.now(
+            datetime.timezone.utc)).total_seconds()
+        if ttl <= 0:
+            return
+        state = plugin.get_auth_state()
+        if state == self._states.get(key):
+            return
+        try:
+            os.makedirs(self._states.path, mode=0o700, exist_ok=True)
+            os.chmod(self._states.path, 0o700)
+        except OSError:
+            LOG.debug("Unable to restrict the auth cache directory",
+                      exc_info=True)
+            return
+        self._states.set(key, state, ttl)
+
+    def authenticate(self, session, plugin, region_name=None):
+        """Authenticate a plugin, reusing its cached token if any.
+
+        :param session: session used to authenticate
+        :type session: py:class:`keystoneauth1.session.Session`
+        """
+        if self._key(plugin, region_name) is None:
+            return
+        self.load(plugin, region_name)
+        # This authenticates again if the token expires soon
+        plugin.get_access(session)
+        self.save(plugin, region_name)
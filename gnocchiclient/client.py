@@ -9,11 +9,18 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import socket
 import sys
+import threading
+import time
+import weakref
+import zlib
 
 from keystoneauth1 import adapter
 from keystoneauth1 import exceptions as k_exc
 
+import requests.adapters
+
 from gnocchiclient import exceptions
 
 
@@ -24,7 +31,181 @@ def Client(version, *args, **kwargs):
     return client_class(*args, **kwargs)
 
 
+class PoolAdapter(requests.adapters.HTTPAdapter):
+    """HTTP adapter with a tunable connection pool.
+
+    It also counts the requests it sends and the connections it opens, so
+    that the reuse of the connections can be checked.
+
+    :param pool_connections: number of hosts to keep a pool of connections
+                             for
+    :type pool_connections: int
+    :param pool_maxsize: maximum number of connections kept open per host
+    :type pool_maxsize: int
+    :param pool_block: wait for a connection to be free rather than opening
+                       a new one when pool_maxsize connections are in use
+    :type pool_block: bool
+    :param tcp_keepalive: send TCP keep-alive probes on idle connections
+    :type tcp_keepalive: bool
+    :param tcp_nodelay: disable Nagle's algorithm
+    :type tcp_nodelay: bool
+    """
+
+    __attrs__ = requests.adapters.HTTPAdapter.__attrs__ + [
+        "tcp_keepalive", "tcp_nodelay"]
+
+    def __init__(self, pool_connections=requests.adapters.DEFAULT_POOLSIZE,
+                 pool_maxsize=requests.adapters.DEFAULT_POOLSIZE,
+                 pool_block=requests.adapters.DEFAULT_POOLBLOCK,
+                 tcp_keepalive=True, tcp_nodelay=True):
+        self.tcp_keepalive = tcp_keepalive
+        self.tcp_nodelay = tcp_nodelay
+        self._lock = threading.Lock()
+        self._sockets = weakref.WeakSet()
+        self.requests = 0
+        self.connections = 0
+        super(PoolAdapter, self).__init__(pool_connections=pool_connections,
+                                          pool_maxsize=pool_maxsize,
+                                          pool_block=pool_block)
+
+    def __setstate__(self, state):
+        self._lock = threading.Lock()
+        self._sockets = weakref.WeakSet()
+        self.requests = 0
+        self.connections = 0
+        super(PoolAdapter, self).__setstate__(state)
+
+    def _socket_options(self):
+        options = []
+        if self.tcp_nodelay:
+            options.append((socket.IPPROTO_TCP, socket.TCP_NODELAY, 1))
+        if self.tcp_keepalive:
+            options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+            # Probe after 60 seconds of idleness, then every 15 seconds, and
+            # give up after 4 probes, where the platform allows it
+            for name, value in (("TCP_KEEPIDLE", 60),
+                                ("TCP_KEEPINTVL", 15),
+                                ("TCP_KEEPCNT", 4)):
+                if hasattr(socket, name):
+                    options.append(
+                        (socket.IPPROTO_TCP, getattr(socket, name), value))
+        return options
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs.setdefault("socket_options", self._socket_options())
+        super(PoolAdapter, self).init_poolmanager(*args, **kwargs)
+
+    def send(self, request, *args, **kwargs):
+        resp = super(PoolAdapter, self).send(request, *args, **kwargs)
+        conn = getattr(resp.raw, "connection", None)
+        sock = getattr(conn, "sock", None)
+        with self._lock:
+            self.requests += 1
+            if sock is not None and sock not in self._sockets:
+                self._sockets.add(sock)
+                self.connections += 1
+        return resp
+
+    def stats(self):
+        """Return the number of requests sent and connections opened.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return {"requests": self.requests,
+                    "connections": self.connections,
+                    "reused": max(0, self.requests - self.connections)}
+
+
+def mount_pool_adapter(session, **kwargs):
+    """Send the HTTP(S) requests of a session through a PoolAdapter.
+
+    :param session: keystoneauth1 session
+    :type session: py:class:`keystoneauth1.session.Session`
+    :param kwargs: options of py:class:`PoolAdapter`
+    :return: the mounted adapter
+    """
+    pool_adapter = PoolAdapter(**kwargs)
+    session.session.mount("http://", pool_adapter)
+    session.session.mount("https://", pool_adapter)
+    return pool_adapter
+
+
+class BodyCompressor:
+    """Compress the bodies of requests larger than a threshold.
+
+    :param encoding: content encoding, gzip or deflate
+    :type encoding: str
+    :param threshold: minimum size in bytes of the bodies to compress
+    :type threshold: int
+    :param level: compression level, from 1 (fastest) to 9 (smallest)
+    :type level: int
+    """
+
+    # zlib window bits selecting the container of each encoding
+    ENCODINGS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+    def __init__(self, encoding="gzip", threshold=1024, level=6):
+        if encoding not in self.ENCODINGS:
+            raise ValueError("Unknown content encoding: %s" % encoding)
+        if not 1 <= level <= 9:
+            raise ValueError("Compression level must be between 1 and 9")
+        self.encoding = encoding
+        self.threshold = threshold
+        self.level = level
+        self._lock = threading.Lock()
+        self.compressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+
+    def compress(self, data, headers):
+        """Compress a request body if it is large enough.
+
+        :param data: request body
+        :type data: str or bytes
+        :param headers: request headers, updated with Content-Encoding when
+                        the body is compressed
+        :type headers: dict
+        :return: the body to send
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if len(data) < self.threshold:
+            return data
+        started_at = time.perf_counter()
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED,
+                                      self.ENCODINGS[self.encoding])
+        compressed = compressor.compress(data) + compressor.flush()
+        elapsed = time.perf_counter() - started_at
+        with self._lock:
+            self.compressed += 1
+            self.bytes_in += len(data)
+            self.bytes_out += len(compressed)
+            self.seconds += elapsed
+        headers['Content-Encoding'] = self.encoding
+        return compressed
+
+    def stats(self):
+        """Return the number of bodies compressed and their sizes.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return {"requests compressed": self.compressed,
+                    "request bytes": self.bytes_in,
+                    "request compressed bytes": self.bytes_out,
+                    "compression seconds": self.seconds}
+
+
 class SessionClient(adapter.Adapter):
+    def __init__(self, *args, **kwargs):
+        super(SessionClient, self).__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self.decompressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
     def request(self, url, method, **kwargs):
         kwargs.setdefault('headers', kwargs.get('headers', {}))
         # NOTE(sileht): The standard call raises errors from
@@ -48,6 +229,29 @@ class SessionClient(adapter.Adapter):
         except k_exc.SSLError as e:
             raise exceptions.SSLError(message=str(e), url=url, method=method)
 
+        if (not kwargs.get('stream') and
+                resp.headers.get('Content-Encoding') in
+                BodyCompressor.ENCODINGS):
+            # The body has been read and decoded, tell() is what was received
+            size = len(resp.content)
+            with self._lock:
+                self.decompressed += 1
+                self.bytes_in += resp.raw.tell()
+                self.bytes_out += size
+
         if raise_exc and resp.status_code >= 400:
             raise exceptions.from_response(resp, method)
         return resp
+
+    def decompression_stats(self):
+        """Return the number of responses decompressed and their sizes.
+
+        Streamed responses are not counted: reading their body to measure
+        it would buffer it in memory.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return {"responses decompressed": self.decompressed,
+                    "response compressed bytes": self.bytes_in,
+                    "response bytes": self.bytes_out}
@@ -0,0 +1,902 @@
+# -*- encoding: utf-8 -*-
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+r"""In-process stand-in for the Gnocchi v1 API.
+
+The server keeps everything in memory and processes measures as soon as they
+are received. It covers the endpoints used by the client managers well enough
+to run the benchmark commands and the client stack without a Gnocchi
+deployment, e.g.::
+
+    python -m gnocchiclient.fake_server --port 8041 --latency 0.01
+    gnocchi --os-auth-type gnocchi-basic --endpoint http://localhost:8041 \
+        benchmark metric create -n 1000
+
+With --points, measures and aggregates requests return that many synthetic
+points, one per second or per granularity requested, instead of the stored
+measures, to control the size of the payloads.
+"""
+
+import argparse
+import datetime
+import fnmatch
+import gzip
+import hashlib
+import http.server
+import math
+import operator
+import re
+import threading
+import time
+import urllib.parse
+import uuid
+import zlib
+
+import ujson
+
+from gnocchiclient import utils
+
+
+DEFAULT_ARCHIVE_POLICIES = {
+    "low": [{"granularity": 300.0, "points": 8640}],
+    "medium": [{"granularity": 60.0, "points": 10080},
+               {"granularity": 3600.0, "points": 8760}],
+    "high": [{"granularity": 1.0, "points": 3600},
+             {"granularity": 60.0, "points": 10080},
+             {"granularity": 3600.0, "points": 8760}],
+}
+
+AGGREGATION_METHODS = ["mean", "min", "max", "sum", "std", "count"]
+
+SYNTHETIC_START = datetime.datetime(2017, 1, 1, tzinfo=datetime.timezone.utc)
+
+_COMPARISONS = {
+    "=": operator.eq, "==": operator.eq, "eq": operator.eq,
+    "!=": operator.ne, "≠": operator.ne, "ne": operator.ne,
+    "<": operator.lt, "lt": operator.lt,
+    ">": operator.gt, "gt": operator.gt,
+    "<=": operator.le, "≤": operator.le, "le": operator.le,
+    ">=": operator.ge, "≥": operator.ge, "ge": operator.ge,
+}
+
+_FILTER_RE = re.compile(
+    r"^\s*([\w.]+)\s*(>=|<=|!=|==|=|>|<|≥|≤|≠|\beq\b|\bne\b|\blt\b|\bgt\b|"
+    r"\ble\b|\bge\b|\blike\b)\s*(.+?)\s*$")
+
+_METRIC_REFERENCE_RE = re.compile(r"\(metric\s+([^\s()]+)\s+([^\s()]+)\)")
+
+_TIMESPAN_UNITS_RE = re.compile(
+    r"^\s*(\d+(?:\.\d+)?)\s*(s|sec|seconds?|min|minutes?|h|hours?|d|days?)"
+    r"\s*$")
+
+_TIMESPAN_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+class HTTPError(Exception):
+    def __init__(self, code, description):
+        super(HTTPError, self).__init__(description)
+        self.code = code
+        self.description = description
+
+
+def _not_found(description="The resource could not be found."):
+    return HTTPError(404, description)
+
+
+def _timestamp(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return utils.parse_date(value)
+    return datetime.datetime.fromtimestamp(value, datetime.timezone.utc)
+
+
+def _timespan(value):
+    """Return the number of seconds of a timespan, e.g. 60, "1 min"."""
+    match = _TIMESPAN_UNITS_RE.match(str(value))
+    if match is not None:
+        return float(match.group(1)) * _TIMESPAN_UNITS[match.group(2)[0]]
+    try:
+        return utils.parse_timespan(value)
+    except ValueError:
+        raise HTTPError(400, "Invalid timespan: %s" % value)
+
+
+def _definition(definition):
+    """Complete an archive policy definition as Gnocchi returns it."""
+    granularity = definition.get("granularity")
+    points = definition.get("points")
+    timespan = definition.get("timespan")
+    if timespan is not None:
+        timespan = _timespan(timespan)
+    if granularity is not None:
+        granularity = _timespan(granularity)
+        if points is None:
+            if timespan is None:
+                raise HTTPError(400, "Invalid archive policy definition")
+            points = int(timespan // granularity)
+    elif points is not None and timespan is not None:
+        granularity = timespan / int(points)
+    else:
+        raise HTTPError(400, "Invalid archive policy definition")
+    points = int(points)
+    return {"granularity": str(datetime.timedelta(seconds=granularity)),
+            "points": points,
+            "timespan": str(datetime.timedelta(seconds=granularity * points))}
+
+
+def _match(resource, query):
+    """Return if a resource matches a search query in its JSON form."""
+    if not query:
+        return True
+    (op, args), = query.items()
+    op = op.lower()
+    if op in ("and", "∧"):
+        return all(_match(resource, q) for q in args)
+    if op in ("or", "∨"):
+        return any(_match(resource, q) for q in args)
+    if op in ("not", "¬"):
+        return not _match(resource, args)
+    (attribute, value), = args.items()
+    current = resource.get(attribute)
+    if op == "in":
+        return current in value
+    if op == "like":
+        return current is not None and fnmatch.fnmatchcase(
+            str(current), value.replace("%", "*"))
+    try:
+        return _COMPARISONS[op](current, value)
+    except KeyError:
+        raise HTTPError(400, "Unknown operator %s" % op)
+    except TypeError:
+        return False
+
+
+def _parse_filter_value(value):
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+        return value[1:-1]
+    if value == "null":
+        return None
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def parse_filter(text):
+    """Convert a filter string to a search query.
+
+    Only comparisons joined with "and" are supported.
+    """
+    conditions = []
+    for condition in re.split(r"\s+(?:and|∧)\s+", text.strip()):
+        match = _FILTER_RE.match(condition)
+        if match is None:
+            raise HTTPError(400, "Unsupported filter: %s" % text)
+        attribute, op, value = match.groups()
+        conditions.append({op: {attribute: _parse_filter_value(value)}})
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"and": conditions}
+
+
+class FakeGnocchi:
+    """In-memory state of the fake Gnocchi API.
+
+    :param points: number of synthetic points returned by measures and
+                   aggregates requests, None to return the stored measures
+    :type points: int
+    :param max_limit: maximum number of items in a page of a listing
+    :type max_limit: int
+    """
+
+    def __init__(self, points=None, max_limit=1000):
+        self.points = points
+        self.max_limit = max_limit
+        # Held by the requests changing the stores; the others read them
+        # without waiting, from copies where they iterate over them
+        self._lock = threading.Lock()
+        self.archive_policies = {
+            name: {"name": name, "back_window": 0,
+                   "definition": [_definition(d) for d in definition],
+                   "aggregation_methods": list(AGGREGATION_METHODS)}
+            for name, definition in DEFAULT_ARCHIVE_POLICIES.items()}
+        self.resource_types = {
+            "generic": {"name": "generic", "state": "active",
+                        "attributes": {}},
+        }
+        self.metrics = {}
+        self.measures = {}
+        self.resources = {}
+        self._synthetic = None
+        self._readers = {self.search_resources, self.aggregates}
+        self._routes = [
+            (method, re.compile("^%s$" % pattern), handler)
+            for method, pattern, handler in (
+                ("GET", "", self.get_build),
+                ("GET", "/v1/status", self.get_status),
+                ("GET", "/v1/capabilities", self.get_capabilities),
+                ("GET", "/v1/archive_policy", self.list_archive_policies),
+                ("POST", "/v1/archive_policy", self.create_archive_policy),
+                ("GET", "/v1/archive_policy/([^/]+)",
+                 self.get_archive_policy),
+                ("PATCH", "/v1/archive_policy/([^/]+)",
+                 self.update_archive_policy),
+                ("DELETE", "/v1/archive_policy/([^/]+)",
+                 self.delete_archive_policy),
+                ("GET", "/v1/resource_type", self.list_resource_types),
+                ("POST", "/v1/resource_type", self.create_resource_type),
+                ("GET", "/v1/resource_type/([^/]+)", self.get_resource_type),
+                ("PATCH", "/v1/resource_type/([^/]+)",
+                 self.update_resource_type),
+                ("DELETE", "/v1/resource_type/([^/]+)",
+                 self.delete_resource_type),
+                ("GET", "/v1/metric", self.list_metrics),
+                ("POST", "/v1/metric", self.create_metric),
+                ("GET", "/v1/metric/([^/]+)", self.get_metric),
+                ("DELETE", "/v1/metric/([^/]+)", self.delete_metric),
+                ("GET", "/v1/metric/([^/]+)/measures", self.get_measures),
+                ("POST", "/v1/metric/([^/]+)/measures", self.add_measures),
+                ("POST", "/v1/batch/metrics/measures",
+                 self.batch_metrics_measures),
+                ("POST", "/v1/batch/resources/metrics/measures",
+                 self.batch_resources_metrics_measures),
+                ("GET", "/v1/resource/([^/]+)", self.list_resources),
+                ("POST", "/v1/resource/([^/]+)", self.create_resource),
+                ("GET", "/v1/resource/([^/]+)/([^/]+)", self.get_resource),
+                ("PATCH", "/v1/resource/([^/]+)/([^/]+)",
+                 self.update_resource),
+                ("DELETE", "/v1/resource/([^/]+)/([^/]+)",
+                 self.delete_resource),
+                ("POST", "/v1/resource/([^/]+)/([^/]+)/metric",
+                 self.create_resource_metrics),
+                ("GET", "/v1/resource/([^/]+)/([^/]+)/metric/([^/]+)",
+                 self.get_resource_metric),
+                ("DELETE", "/v1/resource/([^/]+)/([^/]+)/metric/([^/]+)",
+                 self.delete_resource_metric),
+                ("GET", "/v1/resource/([^/]+)/([^/]+)/metric/([^/]+)/measures",
+                 self.get_resource_measures),
+                ("POST",
+                 "/v1/resource/([^/]+)/([^/]+)/metric/([^/]+)/measures",
+                 self.add_resource_measures),
+                ("POST", "/v1/search/resource/([^/]+)",
+                 self.search_resources),
+                ("POST", "/v1/aggregates", self.aggregates),
+            )]
+
+    def handle(self, method, path, params, body):
+        """Handle a request.
+
+        :return: the status code, the JSON body and the URL of the next page
+        """
+        path = path.rstrip("/")
+        for route_method, pattern, handler in self._routes:
+            match = pattern.match(path)
+            if match and route_method == method:
+                if method == "GET" or handler in self._readers:
+                    return handler(params, body, *match.groups())
+                with self._lock:
+                    return handler(params, body, *match.groups())
+        raise _not_found()
+
+    # Helpers
+
+    def _page(self, items, params, key="id"):
+        limit = min(int(params.get("limit", self.max_limit)), self.max_limit)
+        marker = params.get("marker")
+        if marker is not None:
+            ids = [item[key] for item in items]
+            if marker not in ids:
+                raise HTTPError(400, "Invalid marker: `%s'" % marker)
+            items = items[ids.index(marker) + 1:]
+        page = items[:limit]
+        next_params = None
+        if len(items) > limit:
+            next_params = dict(params, limit=limit, marker=page[-1][key])
+        return page, next_params
+
+    def _archive_policy(self, name):
+        try:
+            return self.archive_policies[name]
+        except KeyError:
+            raise _not_found("Archive policy %s does not exist" % name)
+
+    def _metric(self, metric_id):
+        try:
+            return self.metrics[metric_id]
+        except KeyError:
+            raise _not_found("Metric %s does not exist" % metric_id)
+
+    def _resource(self, resource_type, resource_id):
+        resource = self.resources.get(resource_id)
+        if resource is None or resource_type not in ("generic",
+                                                     resource["type"]):
+            raise _not_found("Resource %s does not exist" % resource_id)
+        return resource
+
+    def _resource_metric(self, resource_type, resource_id, name):
+        resource = self._resource(resource_type, resource_id)
+        try:
+            return self.metrics[resource["metrics"][name]]
+        except KeyError:
+            raise _not_found("Metric %s does not exist" % name)
+
+    def _new_metric(self, definition, resource_id=None, name=None):
+        archive_policy_name = definition.get("archive_policy_name", "low")
+        metric = {
+            "id": str(uuid.uuid4()),
+            "name": definition.get("name", name),
+            "unit": definition.get("unit"),
+            "archive_policy": self._archive_policy(archive_policy_name),
+            "resource_id": resource_id,
+            "creator": "fake",
+            "created_by_user_id": "fake",
+            "created_by_project_id": "",
+        }
+        self.metrics[metric["id"]] = metric
+        self.measures[metric["id"]] = {}
+        return metric
+
+    def _resource_metrics(self, resource_id, metrics):
+        ids = {}
+        for name, definition in metrics.items():
+            if isinstance(definition, str):
+                self._metric(definition)["resource_id"] = resource_id
+                self.metrics[definition]["name"] = name
+                ids[name] = definition
+            else:
+                ids[name] = self._new_metric(definition, resource_id,
+                                             name)["id"]
+        return ids
+
+    def _delete_metric(self, metric_id):
+        metric = self.metrics.pop(metric_id)
+        del self.measures[metric_id]
+        resource = self.resources.get(metric["resource_id"])
+        if resource is not None:
+            resource["metrics"].pop(metric["name"], None)
+
+    def _add_measures(self, metric_id, measures):
+        stored = self.measures[metric_id]
+        try:
+            for measure in measures:
+                stored[_timestamp(measure["timestamp"])] = measure["value"]
+        except (KeyError, TypeError, ValueError) as e:
+            raise HTTPError(400, "Invalid input: %s" % e)
+
+    def _check_granularity(self, metric, params):
+        granularity = params.get("granularity")
+        if granularity is None:
+            return
+        granularities = [_timespan(d["granularity"])
+                         for d in metric["archive_policy"]["definition"]]
+        if _timespan(granularity) not in granularities:
+            raise _not_found(
+                "Granularity '%s' for metric %s does not exist"
+                % (granularity, metric["id"]))
+
+    def _synthetic_series(self, granularity, start, stop):
+        key = (self.points, granularity)
+        if self._synthetic is None or self._synthetic[0] != key:
+            self._synthetic = key, [
+                [(SYNTHETIC_START +
+                  datetime.timedelta(seconds=i * granularity)).isoformat(),
+                 granularity, float(i)]
+                for i in range(self.points)]
+        series = self._synthetic[1]
+        # The timestamps are regular, the bounds are converted to indexes
+        first = 0
+        if start is not None:
+            first = max(0, math.ceil(
+                (start - SYNTHETIC_START).total_seconds() / granularity))
+        if stop is not None:
+            last = max(0, math.ceil(
+                (stop - SYNTHETIC_START).total_seconds() / granularity))
+            return series[first:last]
+        return series[first:]
+
+    def _series(self, metric_ids, params):
+        """Return the points of the metrics, or synthetic points.
+
+        The points are resampled to the granularity requested and kept
+        between the start, included, and the stop, excluded.
+        """
+        granularity = params.get("granularity")
+        if granularity is not None:
+            granularity = _timespan(granularity)
+        start = params.get("start")
+        if start is not None:
+            start = _timestamp(start)
+        stop = params.get("stop")
+        if stop is not None:
+            stop = _timestamp(stop)
+        if self.points is not None:
+            return self._synthetic_series(granularity or 1.0, start, stop)
+        values = {}
+        for metric_id in metric_ids:
+            for timestamp, value in list(self.measures[metric_id].items()):
+                if granularity is not None:
+                    timestamp = datetime.datetime.fromtimestamp(
+                        timestamp.timestamp() // granularity * granularity,
+                        datetime.timezone.utc)
+                if ((start is None or timestamp >= start) and
+                        (stop is None or timestamp < stop)):
+                    values.setdefault(timestamp, []).append(value)
+        return [[timestamp.isoformat(), granularity or 1.0, sum(v) / len(v)]
+                for timestamp, v in sorted(values.items())]
+
+    # Endpoints
+
+    def get_build(self, params, body):
+        return 200, {"build": "fake"}
+
+    def get_status(self, params, body):
+        return 200, {"storage": {"summary": {"metrics": 0, "measures": 0}}}
+
+    def get_capabilities(self, params, body):
+        return 200, {"aggregation_methods": AGGREGATION_METHODS,
+                     "dynamic_aggregation_methods": ["resample"]}
+
+    def list_archive_policies(self, params, body):
+        return 200, list(self.archive_policies.values())
+
+    def create_archive_policy(self, params, body):
+        name = body["name"]
+        if name in self.archive_policies:
+            raise HTTPError(409, "Archive policy %s already exists" % name)
+        policy = {"name": name,
+                  "back_window": body.get("back_window", 0),
+                  "definition": [_definition(d)
+                                 for d in body.get("definition", [])],
+                  "aggregation_methods": body.get(
+                      "aggregation_methods", list(AGGREGATION_METHODS))}
+        self.archive_policies[name] = policy
+        return 201, policy
+
+    def get_archive_policy(self, params, body, name):
+        return 200, self._archive_policy(name)
+
+    def update_archive_policy(self, params, body, name):
+        policy = self._archive_policy(name)
+        if "definition" in body:
+            policy["definition"] = [_definition(d)
+                                    for d in body["definition"]]
+        return 200, policy
+
+    def delete_archive_policy(self, params, body, name):
+        self._archive_policy(name)
+        if any(m["archive_policy"]["name"] == name
+               for m in self.metrics.values()):
+            raise HTTPError(400, "Archive policy %s is still in use" % name)
+        del self.archive_policies[name]
+        return 204, None
+
+    def list_resource_types(self, params, body):
+        return 200, list(self.resource_types.values())
+
+    def create_resource_type(self, params, body):
+        name = body["name"]
+        if name in self.resource_types:
+            raise HTTPError(409, "Resource type %s already exists" % name)
+        resource_type = {"name": name, "state": "active",
+                         "attributes": body.get("attributes", {})}
+        self.resource_types[name] = resource_type
+        return 201, resource_type
+
+    def get_resource_type(self, params, body, name):
+        try:
+            return 200, self.resource_types[name]
+        except KeyError:
+            raise _not_found("Resource type %s does not exist" % name)
+
+    def update_resource_type(self, params, body, name):
+        __, resource_type = self.get_resource_type(params, body, name)
+        attributes = resource_type["attributes"]
+        for operation in body:
+            path = operation["path"].split("/")
+            if len(path) != 3 or path[1] != "attributes":
+                raise HTTPError(400, "Invalid path %s" % operation["path"])
+            if operation["op"] == "add":
+                attributes[path[2]] = operation["value"]
+            elif operation["op"] == "remove":
+                if attributes.pop(path[2], None) is None:
+                    raise HTTPError(400, "Unknown attribute %s" % path[2])
+            else:
+                raise HTTPError(400, "Invalid operation %s" % operation["op"])
+        return 200, resource_type
+
+    def delete_resource_type(self, params, body, name):
+        self.get_resource_type(params, body, name)
+        del self.resource_types[name]
+        return 204, None
+
+    def list_metrics(self, params, body):
+        return (200, ) + self._page(list(self.metrics.values()), params)
+
+    def create_metric(self, params, body):
+        return 201, self._new_metric(body)
+
+    def get_metric(self, params, body, metric_id):
+        return 200, self._metric(metric_id)
+
+    def delete_metric(self, params, body, metric_id):
+        self._metric(metric_id)
+        self._delete_metric(metric_id)
+        return 204, None
+
+    def get_measures(self, params, body, metric_id):
+        self._check_granularity(self._metric(metric_id), params)
+        return 200, self._series([metric_id], params)
+
+    def add_measures(self, params, body, metric_id):
+        self._metric(metric_id)
+        self._add_measures(metric_id, body)
+        return 202, None
+
+    def batch_metrics_measures(self, params, body):
+        unknown = [m for m in body if m not in self.metrics]
+        if unknown:
+            raise HTTPError(400, "Unknown metrics: %s" % ", ".join(unknown))
+        for metric_id, measures in body.items():
+            self._add_measures(metric_id, measures)
+        return 202, None
+
+    def batch_resources_metrics_measures(self, params, body):
+        create_metrics = utils.str_to_bool(params.get("create_metrics",
+                                                      "false"))
+        unknown = [r for r in body if r not in self.resources]
+        if unknown:
+            raise HTTPError(400, "Unknown resources: %s" % ", ".join(unknown))
+        for resource_id, metrics in body.items():
+            resource = self.resources[resource_id]
+            for name, measures in metrics.items():
+                if isinstance(measures, dict):
+                    definition = measures
+                    measures = definition["measures"]
+                else:
+                    definition = {}
+                if name not in resource["metrics"]:
+                    if not create_metrics:
+                        raise HTTPError(400, "Unknown metric %s" % name)
+                    resource["metrics"][name] = self._new_metric(
+                        definition, resource_id, name)["id"]
+                self._add_measures(resource["metrics"][name], measures)
+        return 202, None
+
+    def list_resources(self, params, body, resource_type):
+        return self.search_resources(params, None, resource_type)
+
+    def create_resource(self, params, body, resource_type):
+        if resource_type not in self.resource_types:
+            raise _not_found("Resource type %s does not exist"
+                             % resource_type)
+        resource_id = body.get("id")
+        if resource_id is None:
+            raise HTTPError(400, "Invalid input: required key not provided "
+                            "@ data['id']")
+        if resource_id in self.resources:
+            raise HTTPError(409, "Resource %s already exists" % resource_id)
+        resource = {
+            "user_id": None,
+            "project_id": None,
+            "started_at": datetime.datetime.now(
+                datetime.timezone.utc).isoformat(),
+            "ended_at": None,
+            "creator": "fake",
+            "created_by_user_id": "fake",
+            "created_by_project_id": "",
+        }
+        resource.update(body)
+        resource.update({
+            "id": resource_id,
+            "original_resource_id": resource_id,
+            "type": resource_type,
+            "revision_start": resource["started_at"],
+            "revision_end": None,
+            "metrics": self._resource_metrics(resource_id,
+                                              body.get("metrics", {})),
+        })
+        self.resources[resource_id] = resource
+        return 201, resource
+
+    def get_resource(self, params, body, resource_type, resource_id):
+        return 200, self._resource(resource_type, resource_id)
+
+    def update_resource(self, params, body, resource_type, resource_id):
+        resource = self._resource(resource_type, resource_id)
+        body = dict(body)
+        if "metrics" in body:
+            metrics = body.pop("metrics")
+            for name, metric_id in resource["metrics"].items():
+                if name not in metrics:
+                    self.metrics[metric_id]["resource_id"] = None
+            resource["metrics"] = self._resource_metrics(resource_id, metrics)
+        resource.update(body)
+        return 200, resource
+
+    def delete_resource(self, params, body, resource_type, resource_id):
+        resource = self._resource(resource_type, resource_id)
+        for metric_id in list(resource["metrics"].values()):
+            self._delete_metric(metric_id)
+        del self.resources[resource_id]
+        return 204, None
+
+    def create_resource_metrics(self, params, body, resource_type,
+                                resource_id):
+        resource = self._resource(resource_type, resource_id)
+        for name in body:
+            if name in resource["metrics"]:
+                raise HTTPError(409, "Named metric %s already exists" % name)
+        created = []
+        for name, definition in body.items():
+            metric = self._new_metric(definition, resource_id, name)
+            resource["metrics"][name] = metric["id"]
+            created.append(metric)
+        return 200, created
+
+    def get_resource_metric(self, params, body, resource_type, resource_id,
+                            name):
+        return 200, self._resource_metric(resource_type, resource_id, name)
+
+    def delete_resource_metric(self, params, body, resource_type,
+                               resource_id, name):
+        metric = self._resource_metric(resource_type, resource_id, name)
+        del self.resources[resource_id]["metrics"][name]
+        self._delete_metric(metric["id"])
+        return 204, None
+
+    def get_resource_measures(self, params, body, resource_type,
+                              resource_id, name):
+        metric = self._resource_metric(resource_type, resource_id, name)
+        self._check_granularity(metric, params)
+        return 200, self._series([metric["id"]], params)
+
+    def add_resource_measures(self, params, body, resource_type,
+                              resource_id, name):
+        metric = self._resource_metric(resource_type, resource_id, name)
+        self._add_measures(metric["id"], body)
+        return 202, None
+
+    def _search(self, resource_type, query):
+        return [r for r in list(self.resources.values())
+                if resource_type in ("generic", r["type"]) and
+                _match(r, query)]
+
+    def search_resources(self, params, body, resource_type):
+        if "filter" in params:
+            body = parse_filter(params["filter"])
+        return (200, ) + self._page(self._search(resource_type, body),
+                                    params)
+
+    def aggregates(self, params, body):
+        operations = body["operations"]
+        if not isinstance(operations, str):
+            operations = ujson.dumps(operations)
+        references = _METRIC_REFERENCE_RE.findall(operations)
+        search = body.get("search")
+        if search is None:
+            for metric_id, __ in references:
+                self._metric(metric_id)
+            if operations.strip().startswith("(metric"):
+                # Without an aggregation operation, each metric is returned
+                measures = {}
+                for metric_id, aggregation in references:
+                    measures.setdefault(metric_id, {})[aggregation] = (
+                        self._series([metric_id], params))
+            else:
+                measures = {"aggregated": self._series(
+                    [metric_id for metric_id, __ in references], params)}
+            return 200, {"measures": measures}
+
+        if isinstance(search, str):
+            search = parse_filter(search)
+        resources = self._search(body.get("resource_type", "generic"),
+                                 search)
+        groupby = params.get("groupby")
+        if groupby is None:
+            groups = {(): resources}
+        else:
+            if isinstance(groupby, str):
+                groupby = [groupby]
+            groups = {}
+            for resource in resources:
+                key = tuple((attribute, resource.get(attribute))
+                            for attribute in groupby)
+                groups.setdefault(key, []).append(resource)
+
+        results = []
+        for key, group in groups.items():
+            metric_ids = [r["metrics"][name] for r in group
+                          for name, __ in references if name in r["metrics"]]
+            results.append({"group": dict(key), "measures": {
+                "measures": {"aggregated": self._series(metric_ids,
+                                                        params)}}})
+        if groupby is None:
+            return 200, results[0]["measures"]
+        return 200, results
+
+
+class RequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _handle(self):
+        api = self.server.api
+        url = urllib.parse.urlsplit(self.path)
+        params = {}
+        for key, values in urllib.parse.parse_qs(url.query).items():
+            params[key] = values[0] if len(values) == 1 else values
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        self.server.count_bytes(received=length)
+        time.sleep(self.server.latency)
+        next_params = None
+        try:
+            body = self._decode(body, self.headers.get("Content-Encoding"))
+            body = ujson.loads(body) if body else None
+            status, *result = api.handle(self.command, url.path, params,
+                                         body)
+            data = result[0]
+            if len(result) > 1:
+                next_params = result[1]
+        except HTTPError as e:
+            status = e.code
+            data = {"code": e.code, "description": e.description,
+                    "title": http.HTTPStatus(e.code).phrase}
+        except (KeyError, TypeError, ValueError) as e:
+            status = 400
+            data = {"code": 400, "description": "Invalid input: %s" % e,
+                    "title": "Bad Request"}
+
+        content = etag = None
+        if data is not None:
+            content = ujson.dumps(data).encode("utf-8")
+            if self.command == "GET" and status == 200:
+                etag = '"%s"' % hashlib.sha1(content).hexdigest()
+                if self.headers.get("If-None-Match") == etag:
+                    status, content = 304, None
+
+        self.send_response(status)
+        if next_params is not None:
+            self.send_header("Link", '<http://%s%s?%s>; rel="next"' % (
+                self.headers["Host"], url.path,
+                urllib.parse.urlencode(next_params, doseq=True)))
+        if etag is not None:
+            self.send_header("ETag", etag)
+        if content is None:
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_header("Content-Type", "application/json")
+        if (self.server.compress_responses and
+                "gzip" in self.headers.get("Accept-Encoding", "")):
+            content = gzip.compress(content)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+        self.server.count_bytes(sent=len(content))
+
+    @staticmethod
+    def _decode(body, encoding):
+        if encoding is None or encoding == "identity":
+            return body
+        if encoding not in ("gzip", "deflate"):
+            raise HTTPError(415, "Unsupported Content-Encoding: %s"
+                            % encoding)
+        try:
+            # gzip has a header, deflate is zlib data
+            return zlib.decompress(
+                body, 16 + zlib.MAX_WBITS if encoding == "gzip"
+                else zlib.MAX_WBITS)
+        except zlib.error as e:
+            raise HTTPError(400, "Invalid %s body: %s" % (encoding, e))
+
+    do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = _handle
+
+
+class FakeServer(http.server.ThreadingHTTPServer):
+    """Serve a fake Gnocchi API from a background thread.
+
+    :param host: address to listen on
+    :type host: str
+    :param port: port to listen on, 0 to pick a free one
+    :type port: int
+    :param latency: seconds to wait before answering each request
+    :type latency: float
+    :param points: number of synthetic points returned by measures and
+                   aggregates requests, None to return the stored measures
+    :type points: int
+    :param compress_responses: gzip the responses of the clients accepting
+                               it
+    :type compress_responses: bool
+
+    The bodies of the requests can be compressed with gzip or deflate. The
+    number of bytes of the bodies received and sent, as transferred, are
+    counted in bytes_received and bytes_sent.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, points=None,
+                 compress_responses=False):
+        super(FakeServer, self).__init__((host, port), RequestHandler)
+        self.latency = latency
+        self.compress_responses = compress_responses
+        self.api = FakeGnocchi(points)
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def count_bytes(self, received=0, sent=0):
+        with self._lock:
+            self.bytes_received += received
+            self.bytes_sent += sent
+
+    @property
+    def endpoint(self):
+        host, port = self.server_address[:2]
+        return "http://%s:%d" % (host, port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        name="fake-gnocchi", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Serve a fake Gnocchi API from memory")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="Address to listen on")
+    parser.add_argument("--port", default=8041, type=int,
+                        help="Port to listen on")
+    parser.add_argument("--latency", default=0.0, type=float,
+                        help="Seconds to wait before answering each request")
+    parser.add_argument("--points", type=int,
+                        help=("Number of synthetic points returned by "
+                              "measures and aggregates requests instead of "
+                              "the stored measures"))
+    parser.add_argument("--compress-responses", action="store_true",
+                        help="Gzip the responses of the clients accepting it")
+    args = parser.parse_args(args)
+    server = FakeServer(args.host, args.port, args.latency, args.points,
+                        args.compress_responses)
+    print("Serving a fake Gnocchi API on %s" % server.endpoint)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -28,8 +28,9 @@ class GnocchiAutoDocDirective(sphinxext.AutoprogramCliffDirective):
                         if fnmatch.fnmatch(x, command_pattern)]
         else:
             commands = full_cmd_list
-        return dict((name, shell.GnocchiCommandManager.SHELL_COMMANDS[name])
-                    for name in commands)
+        return dict((name, shell.import_command(
+            shell.GnocchiCommandManager.SHELL_COMMANDS[name]))
+            for name in commands)
 
 
 def setup(app):
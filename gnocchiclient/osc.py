@@ -12,8 +12,12 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import atexit
+
 from osc_lib import utils
 
+from gnocchiclient import cache
+
 
 DEFAULT_METRICS_API_VERSION = '1'
 API_VERSION_OPTION = 'os_metrics_api_version'
@@ -24,7 +28,12 @@ API_VERSIONS = {
 
 
 def make_client(instance):
-    """Return a metrics service client."""
+    """Return a metrics service client.
+
+    If OS_METRIC_AUTH_CACHE is set, the token and service catalog are kept in
+    the user cache directory until the token expires, so that successive
+    commands do not authenticate again.
+    """
     version = instance._api_version[API_NAME]
     try:
         version = int(version)
@@ -37,6 +46,13 @@ def make_client(instance):
         API_VERSIONS)
     # NOTE(sileht): ensure setup of the session is done
     instance.setup_auth()
+    if utils.env('OS_METRIC_AUTH_CACHE'):
+        auth_plugin = instance.session.auth
+        auth_cache = cache.AuthCache()
+        auth_cache.authenticate(instance.session, auth_plugin,
+                                instance.region_name)
+        # The token may be renewed during the command
+        atexit.register(auth_cache.save, auth_plugin, instance.region_name)
     return gnocchi_client(session=instance.session,
                           adapter_options={
                               'interface': instance.interface,
@@ -26,68 +26,120 @@ from keystoneauth1 import exceptions
 from keystoneauth1 import loading
 
 from gnocchiclient import auth
-from gnocchiclient import benchmark
-from gnocchiclient import client
-from gnocchiclient.v1 import aggregates_cli
-from gnocchiclient.v1 import archive_policy_cli
-from gnocchiclient.v1 import archive_policy_rule_cli as ap_rule_cli
-from gnocchiclient.v1 import build_cli
-from gnocchiclient.v1 import capabilities_cli
-from gnocchiclient.v1 import metric_cli
-from gnocchiclient.v1 import resource_cli
-from gnocchiclient.v1 import resource_type_cli
-from gnocchiclient.v1 import status_cli
 from gnocchiclient.version import __version__
 
 
+def import_command(value):
+    """Import a command class from its module:Class path."""
+    module, __, name = value.partition(":")
+    __import__(module)
+    return getattr(sys.modules[module], name)
+
+
+class LazyCommand:
+    """An entry point importing its command class only when it is used.
+
+    :param name: name of the command
+    :type name: str
+    :param value: path of the command class, as module:Class
+    :type value: str
+    """
+
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
+    def load(self):
+        return import_command(self.value)
+
+
 class GnocchiCommandManager(commandmanager.CommandManager):
     SHELL_COMMANDS = {
-        "status": status_cli.CliStatusShow,
-        "server version": build_cli.CliBuildShow,
-        "resource list": resource_cli.CliResourceList,
-        "resource show": resource_cli.CliResourceShow,
-        "resource history": resource_cli.CliResourceHistory,
-        "resource search": resource_cli.CliResourceSearch,
-        "resource create": resource_cli.CliResourceCreate,
-        "resource update": resource_cli.CliResourceUpdate,
-        "resource delete": resource_cli.CliResourceDelete,
-        "resource batch delete": resource_cli.CliResourceBatchDelete,
-        "resource-type list": resource_type_cli.CliResourceTypeList,
-        "resource-type create": resource_type_cli.CliResourceTypeCreate,
-        "resource-type update": resource_type_cli.CliResourceTypeUpdate,
-        "resource-type show": resource_type_cli.CliResourceTypeShow,
-        "resource-type delete": resource_type_cli.CliResourceTypeDelete,
-        "archive-policy list": archive_policy_cli.CliArchivePolicyList,
-        "archive-policy show": archive_policy_cli.CliArchivePolicyShow,
-        "archive-policy create": archive_policy_cli.CliArchivePolicyCreate,
-        "archive-policy update": archive_policy_cli.CliArchivePolicyUpdate,
-        "archive-policy delete": archive_policy_cli.CliArchivePolicyDelete,
-        "archive-policy-rule list": ap_rule_cli.CliArchivePolicyRuleList,
-        "archive-policy-rule show": ap_rule_cli.CliArchivePolicyRuleShow,
-        "archive-policy-rule create": ap_rule_cli.CliArchivePolicyRuleCreate,
-        "archive-policy-rule update": ap_rule_cli.CliArchivePolicyRuleUpdate,
-        "archive-policy-rule delete": ap_rule_cli.CliArchivePolicyRuleDelete,
-        "metric list": metric_cli.CliMetricList,
-        "metric show": metric_cli.CliMetricShow,
-        "metric create": metric_cli.CliMetricCreate,
-        "metric delete": metric_cli.CliMetricDelete,
-        "measures show": metric_cli.CliMeasuresShow,
-        "measures add": metric_cli.CliMeasuresAdd,
-        "measures batch-metrics": metric_cli.CliMetricsMeasuresBatch,
+        "status": "gnocchiclient.v1.status_cli:CliStatusShow",
+        "server version": "gnocchiclient.v1.build_cli:CliBuildShow",
+        "resource list": "gnocchiclient.v1.resource_cli:CliResourceList",
+        "resource show": "gnocchiclient.v1.resource_cli:CliResourceShow",
+        "resource history": "gnocchiclient.v1.resource_cli:CliResourceHistory",
+        "resource search": "gnocchiclient.v1.resource_cli:CliResourceSearch",
+        "resource create": "gnocchiclient.v1.resource_cli:CliResourceCreate",
+        "resource update": "gnocchiclient.v1.resource_cli:CliResourceUpdate",
+        "resource delete": "gnocchiclient.v1.resource_cli:CliResourceDelete",
+        "resource batch delete":
+            "gnocchiclient.v1.resource_cli:CliResourceBatchDelete",
+        "resource-type list":
+            "gnocchiclient.v1.resource_type_cli:CliResourceTypeList",
+        "resource-type create":
+            "gnocchiclient.v1.resource_type_cli:CliResourceTypeCreate",
+        "resource-type update":
+            "gnocchiclient.v1.resource_type_cli:CliResourceTypeUpdate",
+        "resource-type show":
+            "gnocchiclient.v1.resource_type_cli:CliResourceTypeShow",
+        "resource-type delete":
+            "gnocchiclient.v1.resource_type_cli:CliResourceTypeDelete",
+        "archive-policy list":
+            "gnocchiclient.v1.archive_policy_cli:CliArchivePolicyList",
+        "archive-policy show":
+            "gnocchiclient.v1.archive_policy_cli:CliArchivePolicyShow",
+        "archive-policy create":
+            "gnocchiclient.v1.archive_policy_cli:CliArchivePolicyCreate",
+        "archive-policy update":
+            "gnocchiclient.v1.archive_policy_cli:CliArchivePolicyUpdate",
+        "archive-policy delete":
+            "gnocchiclient.v1.archive_policy_cli:CliArchivePolicyDelete",
+        "archive-policy-rule list": (
+            "gnocchiclient.v1.archive_policy_rule_cli:"
+            "CliArchivePolicyRuleList"),
+        "archive-policy-rule show": (
+            "gnocchiclient.v1.archive_policy_rule_cli:"
+            "CliArchivePolicyRuleShow"),
+        "archive-policy-rule create": (
+            "gnocchiclient.v1.archive_policy_rule_cli:"
+            "CliArchivePolicyRuleCreate"),
+        "archive-policy-rule update": (
+            "gnocchiclient.v1.archive_policy_rule_cli:"
+            "CliArchivePolicyRuleUpdate"),
+        "archive-policy-rule delete": (
+            "gnocchiclient.v1.archive_policy_rule_cli:"
+            "CliArchivePolicyRuleDelete"),
+        "metric list": "gnocchiclient.v1.metric_cli:CliMetricList",
+        "metric show": "gnocchiclient.v1.metric_cli:CliMetricShow",
+        "metric create": "gnocchiclient.v1.metric_cli:CliMetricCreate",
+        "metric delete": "gnocchiclient.v1.metric_cli:CliMetricDelete",
+        "measures show": "gnocchiclient.v1.metric_cli:CliMeasuresShow",
+        "measures add": "gnocchiclient.v1.metric_cli:CliMeasuresAdd",
+        "measures batch-metrics":
+            "gnocchiclient.v1.metric_cli:CliMetricsMeasuresBatch",
         "measures batch-resources-metrics":
-            metric_cli.CliResourcesMetricsMeasuresBatch,
-        "measures aggregation": metric_cli.CliMeasuresAggregation,
-        "aggregates": aggregates_cli.CliAggregates,
-        "capabilities list": capabilities_cli.CliCapabilitiesList,
-        "benchmark metric create": benchmark.CliBenchmarkMetricCreate,
-        "benchmark metric show": benchmark.CliBenchmarkMetricShow,
-        "benchmark measures add": benchmark.CliBenchmarkMeasuresAdd,
-        "benchmark measures show": benchmark.CliBenchmarkMeasuresShow,
+            "gnocchiclient.v1.metric_cli:CliResourcesMetricsMeasuresBatch",
+        "measures aggregation":
+            "gnocchiclient.v1.metric_cli:CliMeasuresAggregation",
+        "aggregates": "gnocchiclient.v1.aggregates_cli:CliAggregates",
+        "capabilities list":
+            "gnocchiclient.v1.capabilities_cli:CliCapabilitiesList",
+        "benchmark metric create":
+            "gnocchiclient.benchmark:CliBenchmarkMetricCreate",
+        "benchmark metric show":
+            "gnocchiclient.benchmark:CliBenchmarkMetricShow",
+        "benchmark measures add":
+            "gnocchiclient.benchmark:CliBenchmarkMeasuresAdd",
+        "benchmark measures show":
+            "gnocchiclient.benchmark:CliBenchmarkMeasuresShow",
+        "benchmark measures batch":
+            "gnocchiclient.benchmark:CliBenchmarkMeasuresBatch",
+        "benchmark resource create":
+            "gnocchiclient.benchmark:CliBenchmarkResourceCreate",
+        "benchmark resource search":
+            "gnocchiclient.benchmark:CliBenchmarkResourceSearch",
+        "benchmark aggregates":
+            "gnocchiclient.benchmark:CliBenchmarkAggregates",
+        "benchmark compare": "gnocchiclient.benchmark:CliBenchmarkCompare",
     }
 
     def load_commands(self, namespace):
-        for name, command_class in self.SHELL_COMMANDS.items():
-            self.add_command(name, command_class)
+        # NOTE: the command modules are only imported when a command is run,
+        # so that each invocation only pays for the modules it needs
+        for name, value in self.SHELL_COMMANDS.items():
+            self.commands[name] = LazyCommand(name, value)
 
 
 class GnocchiShell(app.App):
@@ -100,6 +152,7 @@ class GnocchiShell(app.App):
         )
 
         self._client = None
+        self._auth_cache = None
 
     def build_option_parser(self, description, version):
         """Return an argparse option parser for this application.
@@ -121,6 +174,76 @@ class GnocchiShell(app.App):
             default=os.environ.get('GNOCCHI_API_VERSION', '1'),
             help='Defaults to env[GNOCCHI_API_VERSION] or 1.')
 
+        parser.add_argument(
+            '--pool-connections',
+            type=int,
+            default=os.environ.get('GNOCCHI_POOL_CONNECTIONS', 10),
+            help='Number of hosts to keep a pool of connections for. '
+            'Defaults to env[GNOCCHI_POOL_CONNECTIONS] or 10.')
+        parser.add_argument(
+            '--pool-maxsize',
+            type=int,
+            default=os.environ.get('GNOCCHI_POOL_MAXSIZE', 10),
+            help='Maximum number of connections kept open per host, '
+            'it should be at least the number of concurrent requests. '
+            'Defaults to env[GNOCCHI_POOL_MAXSIZE] or 10.')
+        parser.add_argument(
+            '--pool-block',
+            action='store_true',
+            help='Wait for a connection to be free rather than opening a '
+            'new one when --pool-maxsize connections are in use.')
+        parser.add_argument(
+            '--no-tcp-keepalive',
+            dest='tcp_keepalive',
+            action='store_false',
+            help='Do not send TCP keep-alive probes on idle connections.')
+        parser.add_argument(
+            '--no-tcp-nodelay',
+            dest='tcp_nodelay',
+            action='store_false',
+            help="Do not disable Nagle's algorithm on connections.")
+
+        parser.add_argument(
+            '--compression',
+            choices=['gzip', 'deflate'],
+            default=os.environ.get('GNOCCHI_COMPRESSION'),
+            help='Compress the bodies of measures writes with this content '
+            'encoding. Defaults to env[GNOCCHI_COMPRESSION] or no '
+            'compression.')
+        parser.add_argument(
+            '--compression-threshold',
+            type=int,
+            default=os.environ.get('GNOCCHI_COMPRESSION_THRESHOLD', 1024),
+            help='Minimum size in bytes of the bodies to compress. '
+            'Defaults to env[GNOCCHI_COMPRESSION_THRESHOLD] or 1024.')
+        parser.add_argument(
+            '--compression-level',
+            type=int,
+            choices=range(1, 10),
+            metavar='{1-9}',
+            default=os.environ.get('GNOCCHI_COMPRESSION_LEVEL', 6),
+            help='Compression level, from 1 (fastest) to 9 (smallest). '
+            'Defaults to env[GNOCCHI_COMPRESSION_LEVEL] or 6.')
+
+        parser.add_argument(
+            '--resource-type-cache-ttl',
+            type=float,
+            default=os.environ.get('GNOCCHI_RESOURCE_TYPE_CACHE_TTL', 0),
+            help='Number of seconds to cache the resource types for in the '
+            'user cache directory, so that successive commands creating or '
+            'updating resources do not fetch them again. '
+            'Defaults to env[GNOCCHI_RESOURCE_TYPE_CACHE_TTL] or 0, '
+            'which disables the cache.')
+
+        parser.add_argument(
+            '--auth-cache',
+            action='store_true',
+            default=bool(os.environ.get('GNOCCHI_AUTH_CACHE')),
+            help='Keep the Keystone token and service catalog in the user '
+            'cache directory until the token expires, so that successive '
+            'commands do not authenticate again. '
+            'Defaults to env[GNOCCHI_AUTH_CACHE] being set.')
+
         # NOTE(jd) This is a workaroun for people using Keystone auth with the
         # CLI. A lot of rc files do not export OS_AUTH_TYPE=password and
         # assumes it is the default. It's not in that case, but since we can't
@@ -154,6 +277,9 @@ class GnocchiShell(app.App):
         # NOTE(sileht): we lazy load the client to not
         # load/connect auth stuffs
         if self._client is None:
+            from gnocchiclient import cache
+            from gnocchiclient import client
+
             auth_plugin = loading.load_auth_from_argparse_arguments(
                 self.options)
             session = loading.load_session_from_argparse_arguments(
@@ -187,10 +313,37 @@ class GnocchiShell(app.App):
                             self.options.endpoint),
                     )
                 )
+                if self.options.auth_cache:
+                    self._auth_cache = cache.AuthCache()
+                    self._auth_cache.authenticate(
+                        session, auth_plugin, self.options.os_region_name)
+            kwargs['pool_options'] = dict(
+                pool_connections=self.options.pool_connections,
+                pool_maxsize=self.options.pool_maxsize,
+                pool_block=self.options.pool_block,
+                tcp_keepalive=self.options.tcp_keepalive,
+                tcp_nodelay=self.options.tcp_nodelay,
+            )
+            if self.options.compression:
+                kwargs['compression_options'] = dict(
+                    encoding=self.options.compression,
+                    threshold=self.options.compression_threshold,
+                    level=self.options.compression_level,
+                )
+            if self.options.resource_type_cache_ttl > 0:
+                kwargs['resource_type_cache_options'] = dict(
+                    ttl=self.options.resource_type_cache_ttl,
+                    path=os.path.join(cache.user_cache_dir(),
+                                      'resource_type'),
+                )
             self._client = client.Client(**kwargs)
         return self._client
 
     def clean_up(self, cmd, result, err):
+        if self._auth_cache is not None:
+            # The token may have been renewed during the command
+            self._auth_cache.save(self._client.api.session.auth,
+                                  self.options.os_region_name)
         if err and isinstance(err, exceptions.HttpError):
             try:
                 error = err.response.json()
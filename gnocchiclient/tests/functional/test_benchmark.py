@@ -10,6 +10,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 import json
+import os
+import tempfile
 import uuid
 
 from gnocchiclient.tests.functional import base
@@ -109,3 +111,99 @@ class BenchmarkMetricTest(base.ClientTestBase):
         result = json.loads(result)
         self.assertEqual(2, int(result['show executed']))
         self.assertLessEqual(int(result['show failures']), 2)
+
+    def test_benchmark_compare(self):
+        apname = str(uuid.uuid4())
+        # PREPARE AN ARCHIVE POLICY
+        self.gnocchi("archive-policy", params="create %s "
+                     "--back-window 0 -d granularity:1s,points:86400" % apname)
+
+        result = self.gnocchi(
+            u'metric', params=u"create -a %s" % apname)
+        metric = json.loads(result)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            paths = [os.path.join(tmpdir, "run%d.json" % i) for i in (1, 2)]
+            for path in paths:
+                self.gnocchi(
+                    u'benchmark',
+                    params=u"metric show -n 10 --save %s %s"
+                    % (path, metric['id']))
+            with open(paths[0]) as f:
+                saved = json.load(f)
+            self.assertEqual(10, saved['stats']['show executed'])
+
+            result = self.gnocchi(
+                u'benchmark',
+                params=u"compare --threshold 1000 %s %s" % tuple(paths))
+            stats = [r['stat'] for r in json.loads(result)]
+            self.assertIn('show speed', stats)
+
+    def test_benchmark_measures_batch(self):
+        apname = str(uuid.uuid4())
+        # PREPARE AN ARCHIVE POLICY
+        self.gnocchi("archive-policy", params="create %s "
+                     "--back-window 0 -d granularity:1s,points:86400" % apname)
+
+        result = self.gnocchi(
+            u'benchmark',
+            params=u"measures batch -n 4 --resources 3 -m 2 -p 5 -a %s"
+            % apname)
+        result = json.loads(result)
+        self.assertEqual(4, int(result['push executed']))
+        self.assertLessEqual(int(result['push failures']), 4)
+        self.assertEqual(30, int(result['measures per request']))
+
+        result = self.gnocchi(
+            u'benchmark',
+            params=u"measures batch -n 2 --by-metric-id -m 2 -a %s"
+            % apname)
+        result = json.loads(result)
+        self.assertEqual(2, int(result['push executed']))
+        self.assertEqual(2, int(result['measures per request']))
+
+
+class BenchmarkResourceTest(base.ClientTestBase):
+    def test_benchmark_resource_create(self):
+        apname = str(uuid.uuid4())
+        # PREPARE AN ARCHIVE POLICY
+        self.gnocchi("archive-policy", params="create %s "
+                     "--back-window 0 -d granularity:1s,points:86400" % apname)
+
+        result = self.gnocchi(
+            u'benchmark',
+            params=u"resource create -n 10 -m 2 -a %s" % apname)
+        result = json.loads(result)
+        self.assertEqual(10, int(result['create executed']))
+        self.assertLessEqual(int(result['create failures']), 10)
+        self.assertLessEqual(int(result['delete executed']),
+                             int(result['create executed']))
+
+    def test_benchmark_resource_search(self):
+        result = self.gnocchi(
+            u'benchmark',
+            params=u"resource search -n 10 --executor thread "
+            "\"project_id='%s'\"" % uuid.uuid4())
+        result = json.loads(result)
+        self.assertEqual(10, int(result['search executed']))
+        self.assertLessEqual(int(result['search failures']), 10)
+        self.assertEqual(0, int(result['resources per request']))
+
+
+class BenchmarkAggregatesTest(base.ClientTestBase):
+    def test_benchmark_aggregates(self):
+        apname = str(uuid.uuid4())
+        # PREPARE AN ARCHIVE POLICY
+        self.gnocchi("archive-policy", params="create %s "
+                     "--back-window 0 -d granularity:1s,points:86400" % apname)
+
+        result = self.gnocchi(
+            u'metric', params=u"create -a %s" % apname)
+        metric = json.loads(result)
+
+        result = self.gnocchi(
+            u'benchmark',
+            params=u"aggregates -n 4 '(metric %s mean)'" % metric['id'])
+        result = json.loads(result)
+        self.assertEqual(4, int(result['fetch executed']))
+        self.assertLessEqual(int(result['fetch failures']), 4)
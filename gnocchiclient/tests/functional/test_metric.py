@@ -100,6 +100,31 @@ class MetricClientTest(base.ClientTestBase):
         self.assertEqual(1, len(measures))
         self.assertEqual(42, measures[0]['value'])
 
+    def test_metric_measures_show_several_metrics(self):
+        ap_name = str(uuid.uuid4())
+        # PREPARE AN ARCHIVE POLICY
+        self.gnocchi("archive-policy", params="create " + ap_name +
+                     " --back-window 0 -d granularity:1s,points:86400")
+        # CREATE METRICS
+        metrics = []
+        for value in (42, 43):
+            result = self.gnocchi(
+                u'metric', params=u"create"
+                u" --archive-policy-name " + ap_name)
+            metric = json.loads(result)
+            metrics.append(metric["id"])
+            self.gnocchi('measures',
+                         params=("add %s "
+                                 "--measure '2015-03-06T14:33:57Z@%d' ")
+                         % (metric["id"], value), has_output=False)
+
+        # MEASURES SHOW
+        result = self.gnocchi('measures', params="show --refresh --utc "
+                              "--concurrency 2 " + " ".join(metrics))
+        measures = json.loads(result)
+        self.assertEqual([(metrics[0], 42), (metrics[1], 43)],
+                         [(m['metric'], m['value']) for m in measures])
+
     def test_metric_measures_show_tz(self):
         ap_name = str(uuid.uuid4())
         # PREPARE AN ARCHIVE POLICY
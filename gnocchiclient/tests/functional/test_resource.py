@@ -197,3 +197,27 @@ class ResourceClientTest(base.ClientTestBase):
         resource_ids = [r['id'] for r in json.loads(result)]
         self.assertNotIn(self.RESOURCE_ID, resource_ids)
         self.assertNotIn(self.RESOURCE_ID2, resource_ids)
+
+    def test_resource_delete_several(self):
+        resource_ids = [str(uuid.uuid4()) for _ in range(3)]
+        for resource_id in resource_ids:
+            self.gnocchi(u'resource', params=u"create %s --type generic" %
+                         resource_id)
+
+        self.gnocchi('resource',
+                     params="delete %s" % " ".join(resource_ids),
+                     has_output=False)
+        result = self.gnocchi('resource', params="list -t generic")
+        listed = [r['id'] for r in json.loads(result)]
+        for resource_id in resource_ids:
+            self.assertNotIn(resource_id, listed)
+
+        # DELETE FAIL
+        result = self.gnocchi('resource',
+                              params="delete %s" % " ".join(resource_ids),
+                              fail_ok=True, merge_stderr=True,
+                              has_output=False)
+        self.assertIn("Failed to delete resources: 3/3 failures\n", result)
+        for resource_id in resource_ids:
+            self.assertIn("- %s: Resource %s does not exist (HTTP 404)" %
+                          (resource_id, resource_id), result)
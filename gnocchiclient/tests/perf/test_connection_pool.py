@@ -0,0 +1,78 @@
+# -*- encoding: utf-8 -*-
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Benchmark of the connection pool of the client at high concurrency.
+
+Threads sharing a client send requests to the fake Gnocchi server. When the
+pool keeps fewer connections per host than there are threads, most requests
+open a new connection; the extra info of each benchmark records the achieved
+throughput and the rate of connection reuse.
+"""
+
+import concurrent.futures
+import logging
+import os
+
+import pytest
+
+from gnocchiclient import auth
+from gnocchiclient import fake_server
+from gnocchiclient.v1 import client
+
+pytest.importorskip("pytest_benchmark")
+
+CONCURRENCY = int(os.getenv("GNOCCHI_PERF_CONCURRENCY", "32"))
+REQUESTS = 20 * CONCURRENCY
+
+
+@pytest.fixture(scope="module")
+def server():
+    with fake_server.FakeServer() as server:
+        yield server
+
+
+@pytest.fixture(autouse=True)
+def quiet_pool():
+    # urllib3 warns about each connection discarded by a full pool
+    logger = logging.getLogger("urllib3.connectionpool")
+    level = logger.level
+    logger.setLevel(logging.ERROR)
+    yield
+    logger.setLevel(level)
+
+
+@pytest.mark.parametrize("pool_maxsize", [1, CONCURRENCY],
+                         ids="maxsize{}".format)
+def test_concurrent_requests(benchmark, server, pool_maxsize):
+    c = client.Client(
+        session_options={
+            "auth": auth.GnocchiBasicPlugin("admin", server.endpoint)},
+        pool_options={"pool_maxsize": pool_maxsize})
+    executor = concurrent.futures.ThreadPoolExecutor(CONCURRENCY)
+
+    def run():
+        list(executor.map(lambda _: c.status.get(), range(REQUESTS)))
+
+    try:
+        benchmark.pedantic(run, rounds=3, warmup_rounds=1)
+    finally:
+        executor.shutdown()
+
+    stats = c.connection_stats()
+    benchmark.extra_info["concurrency"] = CONCURRENCY
+    benchmark.extra_info["requests per second"] = (
+        REQUESTS / benchmark.stats.stats.mean)
+    benchmark.extra_info["connection reuse rate"] = (
+        stats["reused"] / stats["requests"])
+    if pool_maxsize >= CONCURRENCY:
+        assert stats["connections"] <= CONCURRENCY
@@ -0,0 +1,165 @@
+# -*- encoding: utf-8 -*-
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Micro-benchmarks of the client-side parsing and formatting code.
+
+Run them with ``tox -e perf``. The numbers of points of the synthetic
+payloads are set with GNOCCHI_PERF_POINTS, e.g.
+``GNOCCHI_PERF_POINTS=1000,1000000,10000000``. Each benchmark records the
+time per point and the peak memory allocated in its extra info; use
+``--benchmark-save`` and ``--benchmark-compare`` to catch regressions.
+"""
+
+import argparse
+import datetime
+import os
+import tracemalloc
+
+import iso8601
+
+import pytest
+
+import ujson
+
+from gnocchiclient import client
+from gnocchiclient import utils
+from gnocchiclient.v1 import aggregates
+from gnocchiclient.v1 import aggregates_cli
+from gnocchiclient.v1 import metric_cli
+from gnocchiclient.v1 import timeseries
+
+pytest.importorskip("pytest_benchmark")
+
+POINTS = [int(points) for points in os.getenv(
+    "GNOCCHI_PERF_POINTS", "1000").split(",")]
+
+START = datetime.datetime(2017, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+@pytest.fixture(scope="module", params=POINTS, ids="{}pts".format)
+def points(request):
+    return request.param
+
+
+@pytest.fixture(scope="module")
+def measures(points):
+    """Measures as decoded from the JSON of the API."""
+    return [[(START + datetime.timedelta(seconds=i)).isoformat(), 1.0,
+             float(i)]
+            for i in range(points)]
+
+
+@pytest.fixture(scope="module")
+def converted(measures):
+    """Measures as returned by the client."""
+    return timeseries.convert_measures(measures)
+
+
+def _run(benchmark, points, fn, setup=None):
+    """Benchmark a function and record its cost per point.
+
+    :param setup: function returning fresh arguments for each call, for
+                  functions which modify their arguments
+    """
+    args = setup() if setup else ()
+    # Memory is traced in a separate call as tracemalloc slows the code down
+    tracemalloc.start()
+    try:
+        fn(*args)
+        __, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    if setup is None:
+        result = benchmark(fn)
+    else:
+        result = benchmark.pedantic(
+            fn, setup=lambda: (setup(), {}),
+            rounds=max(1, min(100, 1000000 // points)))
+
+    benchmark.extra_info["points"] = points
+    benchmark.extra_info["peak memory"] = peak
+    benchmark.extra_info["bytes per point"] = peak / points
+    if benchmark.stats is not None:
+        benchmark.extra_info["ns per point"] = (
+            benchmark.stats.stats.mean * 1e9 / points)
+    return result
+
+
+def test_convert_measures(benchmark, points, measures):
+    result = _run(benchmark, points,
+                  lambda: timeseries.convert_measures(measures))
+    assert len(result) == points
+
+
+@pytest.mark.parametrize("parser", ["iso8601", "bulk"])
+def test_parse_timestamps(benchmark, points, measures, parser):
+    timestamps = [measure[0] for measure in measures]
+    if parser == "iso8601":
+        def fn():
+            return [iso8601.parse_date(ts) for ts in timestamps]
+    else:
+        def fn():
+            return utils.parse_timestamps(timestamps)
+    result = _run(benchmark, points, fn)
+    assert len(result) == points
+
+
+def test_aggregates_convert_dates(benchmark, points, measures):
+    def setup():
+        return ({"metric": {"mean": measures}}, )
+
+    _run(benchmark, points, aggregates.AggregatesManager._convert_dates,
+         setup)
+
+
+def test_flatten_measures(benchmark, points, converted):
+    data = {"metric": {"mean": converted}}
+    result = _run(
+        benchmark, points,
+        lambda: list(aggregates_cli.CliAggregates.flatten_measures(data)))
+    assert len(result) == points
+
+
+@pytest.mark.parametrize("utc", [False, True], ids=["localtz", "utc"])
+def test_format_measures_with_tz(benchmark, points, converted, utc):
+    parsed_args = argparse.Namespace(utc=utc)
+    result = _run(
+        benchmark, points,
+        lambda: metric_cli.CliMeasuresReturn.format_measures_with_tz(
+            parsed_args, converted))
+    assert len(result) == points
+
+
+def test_dict_to_querystring(benchmark, points):
+    params = {"metric": [str(i) for i in range(points)],
+              "start": START.isoformat(), "stop": None}
+    _run(benchmark, points, lambda: utils.dict_to_querystring(params))
+
+
+def test_list2cols(benchmark, points, converted):
+    cols = ("timestamp", "granularity", "value")
+    objs = [dict(zip(cols, measure)) for measure in converted]
+    __, rows = _run(benchmark, points, lambda: utils.list2cols(cols, objs))
+    assert len(rows) == points
+
+
+@pytest.mark.parametrize("level", [1, 6, 9], ids="level{}".format)
+def test_compress_measures(benchmark, points, level):
+    data = ujson.dumps([{"timestamp": (START + datetime.timedelta(
+        seconds=i)).isoformat(), "value": float(i)} for i in range(points)])
+    compressor = client.BodyCompressor(threshold=0, level=level)
+    _run(benchmark, points, lambda: compressor.compress(data, {}))
+    stats = compressor.stats()
+    benchmark.extra_info["compression ratio"] = (
+        stats["request bytes"] / stats["request compressed bytes"])
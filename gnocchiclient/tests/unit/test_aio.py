@@ -0,0 +1,170 @@
+# -*- encoding: utf-8 -*-
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import ssl
+import unittest
+import uuid
+from unittest import mock
+
+from aiohttp import web
+
+import iso8601
+
+from gnocchiclient import auth
+from gnocchiclient import exceptions
+from gnocchiclient import fake_server
+from gnocchiclient.v1 import aio
+
+
+METRIC_ID = "6a2cd3d0-3b53-4f6b-91b2-5d1e54a0d2a4"
+MEASURES = [["2017-01-01T12:00:00+00:00", 60.0, 1.0],
+            ["2017-01-01T12:01:00+00:00", 60.0, 2.0]]
+
+
+class AsyncClientTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.requests = []
+        app = web.Application()
+        app.router.add_get("/v1/metric", self.list_metrics)
+        app.router.add_get("/v1/metric/{id}/measures", self.get_measures)
+        app.router.add_get("/v1/metric/{id}", self.get_metric)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        plugin = auth.GnocchiBasicPlugin("admin",
+                                         "http://127.0.0.1:%d" % port)
+        self.client = aio.Client(session_options={"auth": plugin})
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.runner.cleanup()
+
+    async def list_metrics(self, request):
+        self.requests.append(request)
+        if "marker" in request.query:
+            return web.json_response([{"id": "2"}])
+        return web.json_response(
+            [{"id": "1"}],
+            headers={"Link": '<%s?marker=1>; rel="next"' % request.url})
+
+    async def get_metric(self, request):
+        self.requests.append(request)
+        if request.match_info["id"] != METRIC_ID:
+            return web.json_response(
+                {"description": "Metric %s does not exist" %
+                 request.match_info["id"]}, status=404)
+        return web.json_response({"id": METRIC_ID})
+
+    async def get_measures(self, request):
+        self.requests.append(request)
+        return web.json_response(MEASURES)
+
+    async def test_get(self):
+        self.assertEqual({"id": METRIC_ID},
+                         await self.client.metric.get(METRIC_ID))
+        self.assertEqual("basic YWRtaW46",
+                         self.requests[0].headers["Authorization"])
+
+    async def test_user_agent(self):
+        await self.client.metric.get(METRIC_ID)
+        self.assertEqual(aio.user_agent(self.client.api.session),
+                         self.requests[0].headers["User-Agent"])
+        self.assertIn("keystoneauth1/",
+                      self.requests[0].headers["User-Agent"])
+
+    async def test_not_found(self):
+        with self.assertRaises(exceptions.MetricNotFound):
+            await self.client.metric.get(
+                "e2d8e1f2-3a56-4c6c-8d4b-5f4e2b9b7a10")
+
+    async def test_list_pagination(self):
+        self.assertEqual([{"id": "1"}, {"id": "2"}],
+                         await self.client.metric.list())
+
+    async def test_get_measures(self):
+        measures = await self.client.metric.get_measures(
+            METRIC_ID, granularity=60)
+        self.assertEqual(
+            [(iso8601.parse_date(ts), g, v) for ts, g, v in MEASURES],
+            measures)
+        self.assertEqual("60", self.requests[0].query["granularity"])
+
+
+class FakeServerAsyncClientTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = fake_server.FakeServer().start()
+        self.addCleanup(self.server.stop)
+        plugin = auth.GnocchiBasicPlugin("admin", self.server.endpoint)
+        self.client = aio.Client(session_options={"auth": plugin})
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def test_managers(self):
+        resource_id = str(uuid.uuid4())
+        await self.client.resource.create(
+            "generic", {"id": resource_id, "metrics": {"cpu": {}}})
+        resource = await self.client.resource.get("generic", resource_id)
+        self.assertIn("cpu", resource["metrics"])
+        found = await self.client.resource.search(
+            query={"=": {"id": resource_id}})
+        self.assertEqual([resource_id], [r["id"] for r in found])
+
+        metric = await self.client.metric.create(
+            name="mem", resource_id=resource_id)
+        self.assertEqual(metric["id"], (await self.client.metric.get(
+            "mem", resource_id=resource_id))["id"])
+        await self.client.metric.add_measures(
+            "mem", [{"timestamp": "2017-01-01T12:00:00", "value": 1.0}],
+            resource_id=resource_id)
+        measures = await self.client.metric.get_measures(metric["id"])
+        self.assertEqual([1.0], [v for __, __, v in measures])
+
+        await self.client.metric.delete(metric["id"])
+        with self.assertRaises(exceptions.MetricNotFound):
+            await self.client.metric.get(metric["id"])
+        await self.client.resource.delete(resource_id)
+
+
+class SSLContextTest(unittest.TestCase):
+    def test_insecure(self):
+        context = aio.ssl_context(verify=False)
+        self.assertEqual(ssl.CERT_NONE, context.verify_mode)
+        self.assertFalse(context.check_hostname)
+
+    def test_verify(self):
+        with mock.patch("ssl.create_default_context") as create:
+            aio.ssl_context(verify="/etc/ca.pem")
+        create.assert_called_once_with(cafile="/etc/ca.pem")
+        self.assertEqual(ssl.CERT_REQUIRED,
+                         aio.ssl_context().verify_mode)
+
+    def test_cert(self):
+        with mock.patch("ssl.create_default_context") as create:
+            aio.ssl_context(cert=("client.pem", "client.key"))
+            aio.ssl_context(cert="client.pem")
+        create.return_value.load_cert_chain.assert_has_calls(
+            [mock.call("client.pem", "client.key"),
+             mock.call("client.pem")])
+
+    def test_session_settings(self):
+        client = aio.Client(session_options={"verify": False})
+        with mock.patch("gnocchiclient.v1.aio.ssl_context") as context:
+            with mock.patch("aiohttp.TCPConnector") as connector:
+                with mock.patch("aiohttp.ClientSession"):
+                    client.api._get_http()
+        context.assert_called_once_with(False, None)
+        self.assertIs(context.return_value,
+                      connector.call_args[1]["ssl"])
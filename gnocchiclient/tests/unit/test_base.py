@@ -0,0 +1,89 @@
+# -*- encoding: utf-8 -*-
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import unittest
+from unittest import mock
+
+from gnocchiclient.v1 import base
+
+
+def _page(items, next_url=None):
+    page = mock.Mock()
+    page.json.return_value = items
+    page.links = {"next": {"url": next_url}} if next_url else {}
+    return page
+
+
+class IterPagesTest(unittest.TestCase):
+    PAGES = {
+        "p1": _page([1, 2], "p2"),
+        "p2": _page([3, 4], "p3"),
+        "p3": _page([5]),
+    }
+
+    def test_iter_pages(self):
+        for prefetch in (True, False):
+            fetched = []
+
+            def fetch(url):
+                fetched.append(url)
+                return self.PAGES[url]
+
+            self.assertEqual([1, 2, 3, 4, 5], list(base.Manager._iter_pages(
+                fetch, "p1", prefetch=prefetch)))
+            self.assertEqual(["p1", "p2", "p3"], fetched)
+
+    def test_iter_pages_lazy(self):
+        fetched = []
+
+        def fetch(url):
+            fetched.append(url)
+            return self.PAGES[url]
+
+        it = base.Manager._iter_pages(fetch, "p1", prefetch=False)
+        self.assertEqual([], fetched)
+        self.assertEqual(1, next(it))
+        self.assertEqual(["p1"], fetched)
+
+    def test_iter_pages_limit(self):
+        fetched = []
+
+        def fetch(url):
+            fetched.append(url)
+            return self.PAGES[url]
+
+        self.assertEqual([1, 2, 3, 4], list(base.Manager._iter_pages(
+            fetch, "p1", limit=3)))
+        self.assertEqual(["p1", "p2"], fetched)
+
+
+class MapConcurrentlyTest(unittest.TestCase):
+    def test_map_concurrently(self):
+        def fn(item):
+            if item == 2:
+                raise ValueError(item)
+            return item * 10
+
+        results = base.Manager._map_concurrently(fn, [3, 1, 2, 3], 2)
+        self.assertEqual([3, 1, 2, 3], [item for item, __ in results])
+        self.assertEqual((3, 30), results[0])
+        self.assertEqual((1, 10), results[1])
+        self.assertIsInstance(results[2][1], ValueError)
+        self.assertEqual((3, 30), results[3])
+
+    def test_map_concurrently_progress(self):
+        calls = []
+        base.Manager._map_concurrently(
+            lambda item: item, iter([1, 2, 3]), 2,
+            progress=lambda done, total: calls.append((done, total)))
+        self.assertEqual([(1, 3), (2, 3), (3, 3)], sorted(calls))
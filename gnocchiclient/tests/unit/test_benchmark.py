@@ -0,0 +1,397 @@
+# -*- encoding: utf-8 -*-
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import argparse
+import asyncio
+import csv
+import datetime
+import json
+import operator
+import os
+import random
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+from unittest import mock
+
+from gnocchiclient import benchmark
+
+
+class LatencyHistogramTest(unittest.TestCase):
+    def _exact_percentile(self, latencies, percent):
+        latencies = sorted(latencies)
+        return latencies[max(1, int(round(percent * len(latencies)))) - 1]
+
+    def test_percentiles(self):
+        rand = random.Random(42)
+        latencies = [rand.lognormvariate(-4, 1) for _ in range(20000)]
+        histogram = benchmark.LatencyHistogram()
+        for latency in latencies:
+            histogram.record(latency)
+        self.assertEqual(20000, len(histogram))
+        self.assertEqual(min(latencies), histogram.min)
+        self.assertEqual(max(latencies), histogram.max)
+        self.assertAlmostEqual(sum(latencies) / 20000, histogram.mean)
+        for percent in (0.5, 0.9, 0.99, 0.999, 0.9999):
+            expected = self._exact_percentile(latencies, percent)
+            self.assertAlmostEqual(
+                expected, histogram.percentile(percent),
+                delta=expected * 0.0011)
+        self.assertLess(len(histogram.buckets), 5000)
+
+    def test_empty(self):
+        histogram = benchmark.LatencyHistogram()
+        self.assertEqual(0, len(histogram))
+        self.assertIsNone(histogram.mean)
+        self.assertIsNone(histogram.percentile(0.5))
+
+    def test_merge(self):
+        h1 = benchmark.LatencyHistogram()
+        h2 = benchmark.LatencyHistogram()
+        expected = benchmark.LatencyHistogram()
+        for i in range(1, 1000):
+            (h1 if i % 3 else h2).record(i / 1000.0)
+            expected.record(i / 1000.0)
+        h1.merge(h2)
+        self.assertEqual(expected.buckets, h1.buckets)
+        self.assertEqual(expected.count, h1.count)
+        self.assertEqual(0.001, h1.min)
+        self.assertEqual(0.999, h1.max)
+        self.assertRaises(ValueError, h1.merge,
+                          benchmark.LatencyHistogram(0.01))
+
+    def test_serialization(self):
+        histogram = benchmark.LatencyHistogram()
+        for latency in (0.0, 0.01, 0.02, 1.5):
+            histogram.record(latency)
+        copy = benchmark.LatencyHistogram.from_dict(
+            json.loads(json.dumps(histogram.to_dict())))
+        self.assertEqual(histogram.buckets, copy.buckets)
+        self.assertEqual(histogram.percentile(0.99), copy.percentile(0.99))
+        self.assertEqual(0.0, copy.min)
+
+
+class IntervalStatsTest(unittest.TestCase):
+    def test_rows(self):
+        stats = benchmark.IntervalStats(0.1)
+        stats.record(0.01)
+        stats.record()
+        time.sleep(0.25)
+        stats.record(0.02)
+        rows = stats.rows("show")
+        self.assertEqual(3, len(rows))
+        self.assertEqual(
+            {"operation": "show", "time": 0.0, "executed": 2, "failures": 1,
+             "rate": 20.0, "latency median": 0.01, "latency 95%'ile": 0.01,
+             "latency 99%'ile": 0.01, "latency max": 0.01},
+            rows[0])
+        self.assertEqual(0, rows[1]["executed"])
+        self.assertIsNone(rows[1]["latency median"])
+        self.assertEqual(0.02, rows[2]["latency max"])
+
+    def test_write(self):
+        stats = benchmark.IntervalStats()
+        stats.record(0.5)
+        rows = stats.rows("push")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "run.json")
+            benchmark.write_interval_stats(path, rows)
+            with open(path) as f:
+                self.assertEqual(rows, json.load(f))
+
+            path = os.path.join(tmpdir, "run.csv")
+            benchmark.write_interval_stats(path, rows)
+            with open(path) as f:
+                written = list(csv.DictReader(f))
+        self.assertEqual(1, len(written))
+        self.assertEqual("push", written[0]["operation"])
+        self.assertEqual("1", written[0]["executed"])
+        self.assertEqual("0.5", written[0]["latency max"])
+
+
+class BenchmarkPoolTest(unittest.TestCase):
+    def test_closed_loop(self):
+        pool = benchmark.BenchmarkPool(2)
+        futures = pool.map_job(abs, [-1, -2, -3])
+        results, runtime, stats = pool.wait_job("abs", futures)
+        self.assertEqual([1, 2, 3], results)
+        self.assertEqual(3, stats["abs executed"])
+        self.assertNotIn("abs corrected latency median", stats)
+        rows = pool.intervals.rows("abs")
+        self.assertEqual(3, sum(row["executed"] for row in rows))
+
+    def test_open_loop(self):
+        pool = benchmark.BenchmarkPool(1, rate=20)
+        futures = pool.submit_job(4, time.sleep, 0.1)
+        results, runtime, stats = pool.wait_job("sleep", futures)
+        self.assertEqual(4, stats["sleep executed"])
+        # One worker cannot keep up with the rate: jobs wait for it
+        self.assertGreater(stats["sleep corrected latency max"],
+                           stats["sleep latency max"] + 0.1)
+        self.assertEqual(20, stats["sleep target rate"])
+
+    def test_duration(self):
+        pool = benchmark.BenchmarkPool(2, rate=50, duration=0.2)
+        futures = pool.map_job(abs, [-1, -2])
+        results, runtime, stats = pool.wait_job("abs", futures)
+        self.assertEqual([1, 2] * 5, results)
+        self.assertGreaterEqual(runtime, 0.18)
+
+    def test_thread_executor(self):
+        calls = []
+        pool = benchmark.BenchmarkPool(4, executor="thread")
+        futures = pool.map_job(calls.append, [1, 2, 3])
+        results, runtime, stats = pool.wait_job("append", futures)
+        # Jobs run in this process
+        self.assertEqual([1, 2, 3], sorted(calls))
+        self.assertEqual("thread", stats["client executor"])
+        self.assertEqual(4, stats["client workers"])
+
+    def test_async_executor(self):
+        running = []
+        concurrency = []
+        closed = []
+
+        async def job(value):
+            running.append(value)
+            concurrency.append(len(running))
+            await asyncio.sleep(0.1)
+            running.remove(value)
+            return value
+
+        async def close():
+            closed.append(True)
+
+        pool = benchmark.BenchmarkPool(10, executor="async")
+        pool.add_cleanup(close)
+        futures = pool.map_job(job, range(20))
+        results, runtime, stats = pool.wait_job("sleep", futures)
+        self.assertEqual(list(range(20)), results)
+        self.assertEqual(20, stats["sleep executed"])
+        self.assertEqual(0, stats["sleep failures"])
+        self.assertEqual(10, max(concurrency))
+        self.assertLess(runtime, 1)
+        self.assertEqual([True], closed)
+
+    def test_async_executor_failure(self):
+        async def job(value):
+            raise ValueError(value)
+
+        pool = benchmark.BenchmarkPool(2, rate=50, executor="async")
+        futures = pool.map_job(job, [1, 2])
+        results, runtime, stats = pool.wait_job("fail", futures)
+        self.assertEqual([], results)
+        self.assertEqual(2, stats["fail failures"])
+
+    def test_streaming(self):
+        ids = [str(uuid.uuid4()) for _ in range(10)]
+        pool = benchmark.BenchmarkPool(
+            4, executor="thread", streaming=True,
+            result_id=operator.itemgetter("id"))
+        futures = pool.map_job(lambda key: {"id": key, "data": "x" * 10}, ids)
+        self.assertEqual([], futures)
+        results, runtime, stats = pool.wait_job("create", futures)
+        self.assertIsInstance(results, benchmark.IDSpool)
+        self.assertEqual(sorted(ids), sorted(results))
+        self.assertEqual(10, stats["create executed"])
+        size = len(json.dumps({"id": ids[0], "data": "x" * 10}))
+        self.assertEqual(10 * size, stats["create result bytes"])
+        self.assertEqual(size, stats["create mean result bytes"])
+        self.assertEqual(10, len(pool.latencies))
+        pool.close()
+        self.assertRaises(ValueError, list, results)
+
+    def test_streaming_unrecorded_results(self):
+        pool = benchmark.BenchmarkPool(
+            2, executor="thread", streaming=True,
+            result_id=operator.itemgetter("id"))
+
+        def run():
+            # The IDs are not UUIDs and cannot be spooled
+            futures = pool.map_job(lambda key: {"id": key}, range(20))
+            done.append(pool.wait_job("create", futures))
+
+        done = []
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(30)
+        self.assertEqual(1, len(done), "Jobs are not submitted anymore")
+        results, runtime, stats = done[0]
+        self.assertEqual(20, stats["create executed"])
+        self.assertEqual(20, stats["create failures"])
+        self.assertEqual([], list(results))
+
+    def test_streaming_failures(self):
+        pool = benchmark.BenchmarkPool(2, rate=100, executor="async",
+                                       streaming=True)
+
+        async def job(value):
+            if value % 2:
+                raise ValueError(value)
+            return [value]
+
+        futures = pool.map_job(job, range(4))
+        results, runtime, stats = pool.wait_job("show", futures)
+        self.assertEqual([], results)
+        self.assertEqual(2, stats["show failures"])
+        self.assertEqual(6, stats["show result bytes"])
+        self.assertEqual(2, len(pool.corrected_latencies))
+
+    def test_id_spool(self):
+        spool = benchmark.IDSpool()
+        ids = [str(uuid.uuid4()) for _ in range(100)]
+        for key in ids[:50]:
+            spool.append(key)
+        self.assertEqual(ids[:50], list(spool))
+        for key in ids[50:]:
+            spool.append(key)
+        self.assertEqual(100, len(spool))
+        self.assertEqual(ids, list(spool))
+        spool.close()
+
+    def test_unknown_executor(self):
+        self.assertRaises(ValueError, benchmark.BenchmarkPool, 2,
+                          executor="greenlet")
+
+    def test_duration_requires_rate(self):
+        self.assertRaises(ValueError, benchmark.BenchmarkPool, 2,
+                          duration=10)
+
+    def test_rate(self):
+        self.assertEqual(100.0, benchmark._rate("100/s"))
+        self.assertEqual(0.5, benchmark._rate("0.5"))
+        self.assertRaises(argparse.ArgumentTypeError, benchmark._rate, "0")
+        self.assertRaises(argparse.ArgumentTypeError, benchmark._rate,
+                          "fast")
+
+
+class MeasuresTest(unittest.TestCase):
+    def test_random_measures(self):
+        measures = benchmark._random_measures(
+            datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc),
+            datetime.datetime(2020, 1, 2, tzinfo=datetime.timezone.utc),
+            4)
+        self.assertEqual(4, len(measures))
+        self.assertEqual([21600] * 3, [
+            b["timestamp"] - a["timestamp"]
+            for a, b in zip(measures, measures[1:])])
+        self.assertRaises(ValueError, benchmark._random_measures,
+                          datetime.datetime(2020, 1, 1),
+                          datetime.datetime(2020, 1, 1, 0, 0, 3), 4)
+
+    def test_measures_batch(self):
+        client = mock.Mock()
+        client.resource.create.side_effect = [
+            {"id": "r1", "metrics": {"metric-0": "m1", "metric-1": "m2"}},
+            {"id": "r2", "metrics": {"metric-0": "m3", "metric-1": "m4"}},
+        ]
+        client.connection_stats.return_value = {
+            "requests": 6, "connections": 2, "reused": 4}
+        client.compression_stats.return_value = {
+            "requests compressed": 3, "request bytes": 3000,
+            "request compressed bytes": 1000, "compression seconds": 0.01,
+            "responses decompressed": 0}
+        app = mock.Mock(spec=["client"], client=client)
+        cmd = benchmark.CliBenchmarkMeasuresBatch(app, None)
+        parsed_args = cmd.get_parser("batch").parse_args(
+            ["-n", "3", "--resources", "2", "-m", "2", "-p", "5",
+             "--executor", "thread"])
+        cmd._pools = []
+        columns, data = cmd.take_action(parsed_args)
+        stats = dict(zip(columns, data))
+        self.assertEqual(3, stats["push executed"])
+        self.assertEqual(20, stats["measures per request"])
+        self.assertEqual(2, stats["client connections opened"])
+        self.assertEqual("66.67 %", stats["client connections reuse rate"])
+        self.assertEqual(1000, stats["client request compressed bytes"])
+        self.assertNotIn("client responses decompressed", stats)
+        payload = (
+            client.metric.batch_resources_metrics_measures.call_args[0][0])
+        self.assertEqual(["r1", "r2"], sorted(payload))
+        self.assertEqual(5, len(payload["r1"]["metric-1"]))
+        self.assertEqual(3, client.metric.batch_resources_metrics_measures
+                         .call_count)
+        client.resource.bulk_delete.assert_called_once_with(["r1", "r2"])
+
+    def test_measures_show_options(self):
+        cmd = benchmark.CliBenchmarkMeasuresShow(mock.Mock(), None)
+        options = cmd.get_parser("show")._option_string_actions
+        self.assertIn("--aggregation", options)
+        self.assertNotIn("--concurrency", options)
+        self.assertNotIn("--points-per-request", options)
+
+
+class StatsTest(unittest.TestCase):
+    STATS = {
+        "client workers": 4,
+        "show runtime": 2.5,
+        "show executed": 100,
+        "show speed": 40.0,
+        "show failures": 0,
+        "show failures rate": 0.0,
+        "show latency median": 0.0123,
+        "show target rate": 50.0,
+    }
+
+    def test_format_stats(self):
+        self.assertEqual({
+            "client workers": 4,
+            "show runtime": "2.50 seconds",
+            "show executed": 100,
+            "show speed": "40.00 show/s",
+            "show failures": 0,
+            "show failures rate": "0.00 %",
+            "show latency median": 0.0123,
+            "show target rate": "50.00 show/s",
+        }, benchmark.format_stats(self.STATS))
+
+    def _compare(self, current, *args):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            paths = []
+            for name, stats in (("baseline", self.STATS),
+                                ("current", current)):
+                paths.append(os.path.join(tmpdir, name + ".json"))
+                with open(paths[-1], "w") as f:
+                    json.dump({"stats": stats}, f)
+            cmd = benchmark.CliBenchmarkCompare(mock.Mock(), None)
+            parsed_args = cmd.get_parser("compare").parse_args(
+                paths + list(args))
+            columns, rows = cmd.take_action(parsed_args)
+        return {row[0]: row[1:] for row in rows}, cmd.regressions
+
+    def test_compare(self):
+        current = dict(self.STATS)
+        current["show speed"] = 30.0
+        current["show latency median"] = 0.0125
+        current["show target rate"] = 10.0
+        rows, regressions = self._compare(current)
+        self.assertEqual(["show speed"], regressions)
+        self.assertEqual((40.0, 30.0, "-25.00 %", "regression"),
+                         rows["show speed"])
+        self.assertEqual("ok", rows["show latency median"][3])
+        self.assertEqual("ok", rows["show failures"][3])
+        self.assertNotIn("client workers", rows)
+        self.assertNotIn("show target rate", rows)
+
+    def test_compare_thresholds(self):
+        current = dict(self.STATS)
+        current["show speed"] = 30.0
+        current["show runtime"] = 2.0
+        current["show failures"] = 1
+        rows, regressions = self._compare(
+            current, "--threshold", "30", "--stat-threshold",
+            "show failures=inf")
+        self.assertEqual([], regressions)
+        self.assertEqual("improvement", rows["show runtime"][3])
@@ -0,0 +1,210 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import datetime
+import os
+import stat
+import tempfile
+import unittest
+from unittest import mock
+
+from keystoneauth1 import access
+from keystoneauth1 import identity
+
+from gnocchiclient import auth
+from gnocchiclient import cache
+
+
+class TTLCacheTest(unittest.TestCase):
+    def test_expiry(self):
+        c = cache.TTLCache(ttl=10)
+        with mock.patch("time.time", return_value=100):
+            c.set(("endpoint", "generic"), {"name": "generic"})
+            c.set("short", 1, ttl=1)
+        with mock.patch("time.time", return_value=105):
+            self.assertEqual({"name": "generic"},
+                             c.get(("endpoint", "generic")))
+            self.assertIsNone(c.get("short"))
+        with mock.patch("time.time", return_value=110):
+            self.assertEqual("default", c.get(("endpoint", "generic"),
+                                              "default"))
+        self.assertEqual({"hits": 1, "misses": 2, "entries": 0}, c.stats())
+
+    def test_maxsize(self):
+        c = cache.TTLCache(maxsize=2)
+        c.set("a", 1)
+        c.set("b", 2)
+        c.get("a")
+        c.set("c", 3)
+        self.assertEqual(1, c.get("a"))
+        self.assertIsNone(c.get("b"))
+        self.assertEqual(3, c.get("c"))
+
+    def test_invalidate(self):
+        c = cache.TTLCache()
+        c.set("a", 1)
+        c.invalidate("a")
+        c.invalidate("b")
+        self.assertIsNone(c.get("a"))
+
+    def test_disk(self):
+        with tempfile.TemporaryDirectory() as path:
+            path = os.path.join(path, "cache")
+            c1 = cache.TTLCache(path=path)
+            c1.set(("endpoint", "generic"), {"name": "generic"})
+            c2 = cache.TTLCache(path=path)
+            self.assertEqual({"name": "generic"},
+                             c2.get(("endpoint", "generic")))
+            self.assertIsNone(c2.get(("other", "generic")))
+            c2.invalidate(("endpoint", "generic"))
+            c1.clear()
+            self.assertIsNone(c1.get(("endpoint", "generic")))
+
+            with open(c1._filename("broken"), "w") as f:
+                f.write("{")
+            self.assertIsNone(c1.get("broken"))
+
+    def test_user_cache_dir(self):
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": "/tmp/xdg"}):
+            self.assertEqual("/tmp/xdg/gnocchiclient",
+                             cache.user_cache_dir())
+
+
+class HTTPCacheTest(unittest.TestCase):
+    @staticmethod
+    def _response(status_code, headers=None):
+        return mock.Mock(status_code=status_code, headers=headers or {})
+
+    def test_conditional_get(self):
+        c = cache.HTTPCache()
+        ok = self._response(200, {"ETag": '"1"',
+                                  "Last-Modified": "Sun, 01 Jan 2017"})
+        fetch = mock.Mock(side_effect=[ok, self._response(304)])
+        self.assertIs(ok, c.get(fetch, "v1/resource_type/generic",
+                                headers={"Accept": "application/json"}))
+        self.assertIs(ok, c.get(fetch, "v1/resource_type/generic",
+                                headers={"Accept": "application/json"}))
+        fetch.assert_called_with(
+            "v1/resource_type/generic", params=None,
+            headers={"Accept": "application/json", "If-None-Match": '"1"',
+                     "If-Modified-Since": "Sun, 01 Jan 2017"})
+        self.assertEqual({"hits": 1, "misses": 1, "entries": 1}, c.stats())
+
+    def test_modified(self):
+        c = cache.HTTPCache()
+        old = self._response(200, {"ETag": '"1"'})
+        new = self._response(200)
+        fetch = mock.Mock(side_effect=[old, new, new])
+        c.get(fetch, "v1/status", params={"details": True})
+        self.assertIs(new, c.get(fetch, "v1/status",
+                                 params={"details": True}))
+        # Responses without validators are not kept
+        c.get(fetch, "v1/status", params={"details": True})
+        self.assertEqual({}, fetch.call_args[1]["headers"])
+        self.assertEqual({"hits": 0, "misses": 3, "entries": 0}, c.stats())
+
+    def test_ttls(self):
+        c = cache.HTTPCache(maxsize=1, ttl=10, ttls={"v1/resource/": 1,
+                                                     "v1/": 5})
+        self.assertEqual(1, c._ttl("v1/resource/generic/foo"))
+        self.assertEqual(5, c._ttl("v1/metric/foo"))
+        self.assertEqual(10, c._ttl("foo"))
+        fetch = mock.Mock(return_value=self._response(200, {"ETag": "a"}))
+        with mock.patch("time.time", return_value=100):
+            c.get(fetch, "v1/resource/generic/foo")
+        with mock.patch("time.time", return_value=102):
+            c.get(fetch, "v1/resource/generic/foo")
+        self.assertNotIn("If-None-Match", fetch.call_args[1]["headers"])
+        c.get(fetch, "v1/metric/foo")
+        self.assertEqual(1, c.stats()["entries"])
+
+
+class FakePassword(identity.Password):
+    """Password plugin issuing tokens without a Keystone server."""
+
+    def __init__(self, expires_in=3600, **kwargs):
+        kwargs.setdefault("auth_url", "http://keystone/v3")
+        kwargs.setdefault("username", "admin")
+        kwargs.setdefault("password", "secret")
+        kwargs.setdefault("project_name", "admin")
+        super(FakePassword, self).__init__(**kwargs)
+        self.expires_in = expires_in
+        self.authentications = 0
+
+    def get_auth_ref(self, session, **kwargs):
+        self.authentications += 1
+        expires = (datetime.datetime.now(datetime.timezone.utc) +
+                   datetime.timedelta(seconds=self.expires_in))
+        return access.create(
+            auth_token="token%d" % self.authentications,
+            body={"token": {"expires_at": expires.isoformat(),
+                            "methods": ["password"], "catalog": []}})
+
+
+class AuthCacheTest(unittest.TestCase):
+    def setUp(self):
+        super(AuthCacheTest, self).setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "auth")
+
+    def test_reuse_token(self):
+        p1 = FakePassword()
+        cache.AuthCache(self.path).authenticate(None, p1, "RegionOne")
+        p2 = FakePassword()
+        cache.AuthCache(self.path).authenticate(None, p2, "RegionOne")
+        self.assertEqual(1, p1.authentications)
+        self.assertEqual(0, p2.authentications)
+        self.assertEqual("token1", p2.get_token(None))
+
+        self.assertEqual(0o700, stat.S_IMODE(os.stat(self.path).st_mode))
+        for filename in os.listdir(self.path):
+            self.assertEqual(0o600, stat.S_IMODE(
+                os.stat(os.path.join(self.path, filename)).st_mode))
+
+    def test_key(self):
+        cache.AuthCache(self.path).authenticate(None, FakePassword(),
+                                                "RegionOne")
+        for plugin, region_name in (
+                (FakePassword(), "RegionTwo"),
+                (FakePassword(username="demo"), "RegionOne"),
+                (FakePassword(project_name="demo"), "RegionOne"),
+                (FakePassword(password="other"), "RegionOne"),
+                (FakePassword(auth_url="http://other/v3"), "RegionOne")):
+            cache.AuthCache(self.path).authenticate(None, plugin,
+                                                    region_name)
+            self.assertEqual(1, plugin.authentications)
+
+    def test_expired(self):
+        cache.AuthCache(self.path).authenticate(
+            None, FakePassword(expires_in=10))
+        # The token expires soon, a new one is issued and cached
+        p1 = FakePassword()
+        cache.AuthCache(self.path).authenticate(None, p1)
+        self.assertEqual(1, p1.authentications)
+        p2 = FakePassword()
+        cache.AuthCache(self.path).authenticate(None, p2)
+        self.assertEqual(0, p2.authentications)
+
+        # Expired tokens are not cached
+        c = cache.AuthCache(self.path)
+        expired = FakePassword(username="demo", expires_in=-10)
+        expired.auth_ref = expired.get_auth_ref(None)
+        c.save(expired)
+        self.assertFalse(c.load(FakePassword(username="demo")))
+
+    def test_no_identity(self):
+        c = cache.AuthCache(self.path)
+        c.authenticate(None, auth.GnocchiBasicPlugin("admin",
+                                                     "http://localhost"))
+        self.assertFalse(c.load(auth.GnocchiBasicPlugin("admin",
+                                                        "http://localhost")))
+        self.assertFalse(os.path.exists(self.path))
@@ -0,0 +1,527 @@
+# -*- encoding: utf-8 -*-
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import collections
+import concurrent.futures
+import contextlib
+import datetime
+import io
+import os
+import tempfile
+import time
+import unittest
+import uuid
+from unittest import mock
+
+from keystoneauth1 import access
+from keystoneauth1 import identity
+
+import ujson
+
+from gnocchiclient import auth
+from gnocchiclient import benchmark
+from gnocchiclient import exceptions
+from gnocchiclient import fake_server
+from gnocchiclient import shell
+from gnocchiclient.v1 import client
+from gnocchiclient.v1 import resource_cli
+
+
+class FakeServerTest(unittest.TestCase):
+    def setUp(self):
+        self.server = fake_server.FakeServer().start()
+        self.addCleanup(self.server.stop)
+        plugin = auth.GnocchiBasicPlugin("admin", self.server.endpoint)
+        self.client = client.Client(session_options={"auth": plugin})
+
+    def gnocchi(self, *args):
+        """Run a command of the gnocchi shell against the server.
+
+        :return: the exit code and the output of the command
+        """
+        argv = ["gnocchi", "--os-auth-type", "gnocchi-basic",
+                "--endpoint", self.server.endpoint] + list(args)
+        stdout = io.StringIO()
+        with mock.patch("sys.argv", argv), \
+                contextlib.redirect_stdout(stdout):
+            code = shell.GnocchiShell().run(argv[1:])
+        return code, stdout.getvalue()
+
+    def test_metric(self):
+        metric = self.client.metric.create(archive_policy_name="high")
+        self.assertEqual("high", metric["archive_policy"]["name"])
+        self.assertEqual(metric, self.client.metric.get(metric["id"]))
+        self.client.metric.add_measures(metric["id"], [
+            {"timestamp": "2017-01-01T12:01:00", "value": 2},
+            {"timestamp": "2017-01-01T12:00:00", "value": 1},
+        ])
+        measures = self.client.metric.get_measures(metric["id"])
+        self.assertEqual([1, 2], [value for __, __, value in measures])
+        self.assertEqual(2017, measures[0][0].year)
+        self.client.metric.delete(metric["id"])
+        self.assertRaises(exceptions.MetricNotFound,
+                          self.client.metric.get, metric["id"])
+
+    def test_measures_show_many(self):
+        metric = self.client.metric.create()
+        self.client.metric.add_measures(metric["id"], [
+            {"timestamp": "2017-01-01T12:00:00", "value": 1}])
+        code, output = self.gnocchi("measures", "show", "-f", "json",
+                                    metric["id"], metric["id"])
+        self.assertEqual(0, code)
+        self.assertEqual([metric["id"]] * 2,
+                         [m["metric"] for m in ujson.loads(output)])
+
+        # Measures of the other metrics are shown, but the command fails
+        code, output = self.gnocchi("measures", "show", "-f", "json",
+                                    metric["id"], str(uuid.uuid4()))
+        self.assertEqual(1, code)
+        self.assertEqual([metric["id"]],
+                         [m["metric"] for m in ujson.loads(output)])
+
+    def test_cli(self):
+        code, output = self.gnocchi("metric", "create", "-f", "json",
+                                    "--archive-policy-name", "medium")
+        self.assertEqual(0, code)
+        metric = ujson.loads(output)
+        self.assertEqual("medium", metric["archive_policy/name"])
+        self.assertNotIn("created_by_user_id", metric)
+
+        code, output = self.gnocchi("archive-policy", "show", "-f", "json",
+                                    "medium")
+        self.assertEqual(0, code)
+        self.assertIn({"granularity": "0:01:00", "points": 10080,
+                       "timespan": "7 days, 0:00:00"},
+                      ujson.loads(output)["definition"])
+
+        resource_id = str(uuid.uuid4())
+        code, output = self.gnocchi("resource", "create", "-f", "json",
+                                    "--attribute", "project_id:p1",
+                                    "--create-metric", "cpu:medium",
+                                    resource_id)
+        self.assertEqual(0, code)
+        for args in (("resource", "list"),
+                     ("resource", "search", "project_id=p1")):
+            with self.subTest(args=args):
+                code, output = self.gnocchi(*args + ("-f", "json"))
+                self.assertEqual(0, code)
+                resources = ujson.loads(output)
+                self.assertEqual([resource_id], [r["id"] for r in resources])
+                self.assertEqual("fake", resources[0]["creator"])
+                self.assertNotIn("created_by_user_id", resources[0])
+
+        self.client.metric.add_measures("cpu", [
+            {"timestamp": "2017-01-01T12:00:00+00:00", "value": 1},
+            {"timestamp": "2017-01-01T12:30:00+00:00", "value": 2},
+            {"timestamp": "2017-01-01T13:00:00+00:00", "value": 3},
+        ], resource_id=resource_id)
+        code, output = self.gnocchi(
+            "measures", "show", "-f", "json", "cpu", "-r", resource_id,
+            "--granularity", "3600", "--start", "2017-01-01T12:00:00+00:00",
+            "--stop", "2017-01-01T14:00:00+00:00", "--points-per-request", "1")
+        self.assertEqual(0, code)
+        self.assertEqual([1.5, 3], [m["value"] for m in ujson.loads(output)])
+
+    def test_list_pages(self):
+        self.server.api.max_limit = 2
+        ids = [self.client.metric.create()["id"]
+               for _ in range(5)]
+        self.assertEqual(ids, [m["id"] for m in self.client.metric.list()])
+
+    def test_resource(self):
+        resource_id = str(uuid.uuid4())
+        resource = self.client.resource.create("generic", {
+            "id": resource_id, "project_id": "p1",
+            "metrics": {"cpu": {"archive_policy_name": "low"}}})
+        self.assertRaises(exceptions.ResourceAlreadyExists,
+                          self.client.resource.create, "generic",
+                          {"id": resource_id})
+        self.client.resource.create("generic", {"id": str(uuid.uuid4()),
+                                                "project_id": "p2"})
+        metric = self.client.metric.get("cpu", resource_id=resource_id)
+        self.assertEqual(resource["metrics"]["cpu"], metric["id"])
+
+        found = self.client.resource.search(query={"=": {"project_id": "p1"}})
+        self.assertEqual([resource_id], [r["id"] for r in found])
+        found = self.client.resource.search(query="project_id!='p1'")
+        self.assertEqual(["p2"], [r["project_id"] for r in found])
+
+        self.client.resource.delete(resource_id)
+        self.assertRaises(exceptions.ResourceNotFound,
+                          self.client.resource.get, "generic", resource_id)
+        self.assertRaises(exceptions.MetricNotFound,
+                          self.client.metric.get, metric["id"])
+
+    def test_batch_and_aggregates(self):
+        resource_id = str(uuid.uuid4())
+        self.client.resource.create("generic", {
+            "id": resource_id, "project_id": "p1", "metrics": {}})
+        self.client.metric.batch_resources_metrics_measures(
+            {resource_id: {"cpu": [{"timestamp": 0, "value": 4}]}},
+            create_metrics=True)
+        self.assertRaises(exceptions.BadRequest,
+                          self.client.metric.batch_metrics_measures,
+                          {str(uuid.uuid4()): []})
+
+        metric = self.client.metric.get("cpu", resource_id=resource_id)
+        self.client.metric.batch_metrics_measures(
+            {metric["id"]: [{"timestamp": 60, "value": 6}]})
+        result = self.client.aggregates.fetch(
+            "(metric %s mean)" % metric["id"])
+        self.assertEqual([4, 6], [value for __, __, value
+                                  in result["measures"][metric["id"]]["mean"]])
+
+        groups = self.client.aggregates.fetch(
+            "(aggregate mean (metric cpu mean))", search="project_id='p1'",
+            groupby=["project_id"])
+        self.assertEqual([{"project_id": "p1"}],
+                         [g["group"] for g in groups])
+        self.assertEqual(
+            [4, 6], [value for __, __, value
+                     in groups[0]["measures"]["measures"]["aggregated"]])
+
+    def test_archive_policy(self):
+        self.client.archive_policy.create({
+            "name": "fake", "definition": [{"granularity": "1s",
+                                            "points": 60}]})
+        self.assertRaises(exceptions.ArchivePolicyAlreadyExists,
+                          self.client.archive_policy.create, {"name": "fake"})
+        self.assertEqual(
+            [{"granularity": "0:00:01", "points": 60, "timespan": "0:01:00"}],
+            self.client.archive_policy.get("fake")["definition"])
+        self.assertIn("fake", [ap["name"]
+                               for ap in self.client.archive_policy.list()])
+        self.client.archive_policy.delete("fake")
+        self.assertRaises(exceptions.ArchivePolicyNotFound,
+                          self.client.archive_policy.get, "fake")
+        self.assertEqual(
+            0, self.client.status.get()["storage"]["summary"]["measures"])
+
+    def test_measures_filters(self):
+        metric = self.client.metric.create(archive_policy_name="medium")
+        self.client.metric.add_measures(metric["id"], [
+            {"timestamp": "2017-01-01T12:00:00+00:00", "value": 1},
+            {"timestamp": "2017-01-01T12:00:30+00:00", "value": 2},
+            {"timestamp": "2017-01-01T12:01:00+00:00", "value": 3},
+            {"timestamp": "2017-01-01T12:02:00+00:00", "value": 4},
+        ])
+        measures = self.client.metric.get_measures(metric["id"],
+                                                   granularity=60)
+        self.assertEqual([(12, 0, 60.0, 1.5), (12, 1, 60.0, 3),
+                          (12, 2, 60.0, 4)],
+                         [(ts.hour, ts.minute, g, v)
+                          for ts, g, v in measures])
+        measures = self.client.metric.get_measures(
+            metric["id"], start="2017-01-01T12:00:30+00:00",
+            stop="2017-01-01T12:02:00+00:00")
+        self.assertEqual([2, 3], [value for __, __, value in measures])
+        self.assertRaises(exceptions.NotFound,
+                          self.client.metric.get_measures, metric["id"],
+                          granularity=1)
+
+    def test_synthetic_points_filters(self):
+        self.server.api.points = 100
+        metric = self.client.metric.create(archive_policy_name="medium")
+        measures = self.client.metric.get_measures(
+            metric["id"], start="2017-01-01T00:00:10+00:00",
+            stop="2017-01-01T00:00:20+00:00")
+        self.assertEqual(list(range(10, 20)),
+                         [value for __, __, value in measures])
+        measures = self.client.metric.get_measures(
+            metric["id"], granularity=60, start="2017-01-01T00:30:00+00:00")
+        self.assertEqual([(60.0, 30.0), (60.0, 99.0)],
+                         [(g, v) for __, g, v in measures[::69]])
+
+    def test_synthetic_points_and_latency(self):
+        self.server.latency = 0.05
+        self.server.api.points = 1000
+        metric = self.client.metric.create()
+        started_at = time.monotonic()
+        self.assertEqual(1000,
+                         len(self.client.metric.get_measures(metric["id"])))
+        self.assertGreaterEqual(time.monotonic() - started_at, 0.05)
+
+    def test_connection_pool(self):
+        plugin = auth.GnocchiBasicPlugin("admin", self.server.endpoint)
+        c = client.Client(session_options={"auth": plugin},
+                          pool_options={"pool_maxsize": 4})
+        self.assertEqual({"requests": 0, "connections": 0, "reused": 0},
+                         c.connection_stats())
+        for _ in range(5):
+            c.status.get()
+        self.assertEqual({"requests": 5, "connections": 1, "reused": 4},
+                         c.connection_stats())
+
+        self.server.latency = 0.05
+        with concurrent.futures.ThreadPoolExecutor(4) as executor:
+            list(executor.map(lambda _: c.status.get(), range(8)))
+        stats = c.connection_stats()
+        self.assertEqual(13, stats["requests"])
+        self.assertLessEqual(stats["connections"], 4)
+
+        self.assertIsNone(self.client.connection_stats())
+
+    def test_compression(self):
+        plugin = auth.GnocchiBasicPlugin("admin", self.server.endpoint)
+        c = client.Client(session_options={"auth": plugin},
+                          compression_options={"threshold": 100})
+        metric = c.metric.create()
+        measures = [{"timestamp": i * 60, "value": i} for i in range(100)]
+        c.metric.add_measures(metric["id"], measures[:1])
+        self.assertEqual(0, c.compression_stats()["requests compressed"])
+        received = self.server.bytes_received
+        c.metric.add_measures(metric["id"], measures[1:])
+        c.metric.batch_metrics_measures({metric["id"]: measures[:1] * 10})
+        stats = c.compression_stats()
+        self.assertEqual(2, stats["requests compressed"])
+        self.assertEqual(self.server.bytes_received - received,
+                         stats["request compressed bytes"])
+        self.assertLess(stats["request compressed bytes"],
+                        stats["request bytes"])
+        self.assertEqual(100, len(c.metric.get_measures(metric["id"])))
+        self.assertEqual(0, stats["responses decompressed"])
+
+        c = client.Client(session_options={"auth": plugin},
+                          compression_options={"encoding": "deflate",
+                                               "threshold": 0})
+        self.server.compress_responses = True
+        c.metric.add_measures(metric["id"], [{"timestamp": 0, "value": 4}])
+        self.assertEqual(4, c.metric.get_measures(metric["id"])[0][2])
+        stats = c.compression_stats()
+        self.assertEqual(1, stats["requests compressed"])
+        self.assertEqual(1, stats["responses decompressed"])
+        self.assertLess(stats["response compressed bytes"],
+                        stats["response bytes"])
+
+        self.assertRaises(ValueError, client.Client,
+                          session_options={"auth": plugin},
+                          compression_options={"encoding": "br"})
+
+    def test_compressed_streaming(self):
+        self.server.compress_responses = True
+        self.server.api.points = 50000
+        metric = self.client.metric.create()
+        stats = self.client.compression_stats()
+        with mock.patch("requests.Response.content",
+                        new_callable=mock.PropertyMock,
+                        side_effect=AssertionError("Body buffered")):
+            measures = self.client.metric.iter_measures(metric["id"])
+            self.assertEqual(0.0, next(measures)[2])
+            self.assertEqual(49999.0, collections.deque(measures, 1)[0][2])
+        self.assertEqual(stats, self.client.compression_stats())
+
+    def test_unsupported_content_encoding(self):
+        self.assertRaises(exceptions.ClientException,
+                          self.client.api.post, "v1/batch/metrics/measures",
+                          headers={"Content-Encoding": "br"}, data=b"{}")
+
+    def test_resource_type_cache(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        path = tmpdir.name
+        plugin = auth.GnocchiBasicPlugin("admin", self.server.endpoint)
+        c = client.Client(session_options={"auth": plugin},
+                          resource_type_cache_options={"path": path})
+        c.resource_type.create({"name": "host", "attributes": {
+            "cpus": {"type": "number", "required": False}}})
+
+        app = mock.Mock(spec=["client"], client=c)
+        cmd = resource_cli.CliResourceCreate(app, None)
+        for i in range(3):
+            parsed_args = cmd.get_parser("create").parse_args(
+                ["-t", "host", str(uuid.uuid4()), "-a", "cpus:%d" % i])
+            columns, data = cmd.take_action(parsed_args)
+            self.assertEqual(float(i), dict(zip(columns, data))["cpus"])
+        self.assertEqual(1, c.resource_type_cache.stats()["misses"])
+        self.assertEqual(2, c.resource_type_cache.stats()["hits"])
+
+        # The cached resource type cannot be changed through a copy
+        for i in range(2):
+            resource_type = c.resource_type.get("host")
+            self.assertIn("cpus", resource_type["attributes"])
+            del resource_type["attributes"]
+
+        # Shared on disk with other clients of the same endpoint
+        other = client.Client(session_options={"auth": plugin},
+                              resource_type_cache_options={"path": path})
+        self.server.api.resource_types["host"]["attributes"] = {}
+        self.assertIn("cpus", other.resource_type.get("host")["attributes"])
+
+        c.resource_type.update("host", [{
+            "op": "add", "path": "/attributes/up",
+            "value": {"type": "bool", "required": False}}])
+        other = client.Client(session_options={"auth": plugin},
+                              resource_type_cache_options={"path": path})
+        self.assertEqual(["up"],
+                         list(other.resource_type.get("host")["attributes"]))
+        self.assertEqual(["up"],
+                         list(c.resource_type.get("host")["attributes"]))
+        c.resource_type.delete("host")
+        self.assertRaises(exceptions.ResourceTypeNotFound,
+                          c.resource_type.get, "host")
+
+    def test_metric_id_cache(self):
+        plugin = auth.GnocchiBasicPlugin("admin", self.server.endpoint)
+        c = client.Client(session_options={"auth": plugin},
+                          metric_id_cache_options={"ttl": 60})
+        resource_id = str(uuid.uuid4())
+        resource = c.resource.create("generic", {
+            "id": resource_id, "metrics": {"cpu": {}, "mem": {}}})
+        cpu = resource["metrics"]["cpu"]
+
+        with mock.patch.object(c.api, "post", wraps=c.api.post) as post:
+            c.metric.add_measures("cpu", [{"timestamp": 0, "value": 1}],
+                                  resource_id=resource_id)
+            self.assertEqual("v1/metric/%s/measures" % cpu,
+                             post.call_args[0][0])
+            c.metric.batch_resources_metrics_measures(
+                {resource_id: {"cpu": [{"timestamp": 60, "value": 2}],
+                               "mem": [{"timestamp": 60, "value": 3}]}})
+            self.assertEqual(c.metric.metric_batch_url,
+                             post.call_args[0][0])
+        self.assertEqual([1, 2], [v for __, __, v in c.metric.get_measures(
+            "cpu", resource_id=resource_id)])
+
+        # The metric is replaced, its name is resolved again
+        c.metric.delete(cpu)
+        c.metric.create(name="cpu", resource_id=resource_id)
+        c.metric.add_measures("cpu", [{"timestamp": 0, "value": 4}],
+                              resource_id=resource_id)
+        c.metric.batch_resources_metrics_measures(
+            {resource_id: {"cpu": [{"timestamp": 60, "value": 5}]}})
+        self.assertEqual([4, 5], [v for __, __, v in c.metric.get_measures(
+            "cpu", resource_id=resource_id)])
+        self.assertEqual(
+            c.resource.get("generic", resource_id)["metrics"]["cpu"],
+            c.metric_id_cache.get((resource_id, "cpu")))
+
+        other_id = str(uuid.uuid4())
+        self.client.resource.create("generic", {"id": other_id,
+                                                "metrics": {"cpu": {}}})
+        self.assertIsNone(c.metric_id_cache.get((other_id, "cpu")))
+        c.resource.search(query={"=": {"id": other_id}})
+        self.assertIsNotNone(c.metric_id_cache.get((other_id, "cpu")))
+
+    def test_http_cache(self):
+        plugin = auth.GnocchiBasicPlugin("admin", self.server.endpoint)
+        c = client.Client(session_options={"auth": plugin},
+                          http_cache_options={"maxsize": 10})
+        policy = c.archive_policy.get("low")
+        sent = self.server.bytes_sent
+        self.assertEqual(policy, c.archive_policy.get("low"))
+        self.assertEqual(policy, c.archive_policy.get("low"))
+        self.assertEqual(sent, self.server.bytes_sent)
+        self.assertEqual({"hits": 2, "misses": 1, "entries": 1},
+                         c.http_cache.stats())
+
+        self.server.api.archive_policies["low"]["back_window"] = 10
+        self.assertEqual(10, c.archive_policy.get("low")["back_window"])
+        self.assertEqual(2, c.http_cache.stats()["misses"])
+
+        # Listings are cached page by page
+        self.server.api.max_limit = 2
+        ids = [c.metric.create()["id"] for _ in range(3)]
+        self.assertEqual(ids, [m["id"] for m in c.metric.list()])
+        self.assertEqual(ids, [m["id"] for m in c.metric.list()])
+        self.assertEqual(4, c.http_cache.stats()["hits"])
+
+    def test_auth_cache(self):
+        expires = (datetime.datetime.now(datetime.timezone.utc) +
+                   datetime.timedelta(hours=1))
+        token = access.create(
+            auth_token="token",
+            body={"token": {"expires_at": expires.isoformat(),
+                            "methods": ["password"], "catalog": []}})
+        argv = ["gnocchi", "--os-auth-type", "password",
+                "--os-auth-url", "http://keystone/v3",
+                "--os-username", "admin", "--os-password", "secret",
+                "--os-project-name", "admin",
+                "--os-endpoint-override", self.server.endpoint,
+                "--auth-cache", "status"]
+        with tempfile.TemporaryDirectory() as path, \
+                mock.patch.dict(os.environ, {"XDG_CACHE_HOME": path}), \
+                mock.patch("sys.argv", argv), \
+                mock.patch.object(identity.Password, "get_auth_ref",
+                                  return_value=token) as get_auth_ref:
+            for _ in range(2):
+                self.assertEqual(0, shell.GnocchiShell().run(argv[1:]))
+            self.assertEqual(1, get_auth_ref.call_count)
+            self.assertEqual(1, len(os.listdir(
+                os.path.join(path, "gnocchiclient", "auth"))))
+
+    def test_parse_filter(self):
+        self.assertEqual(
+            {"and": [{"=": {"project_id": "p1"}}, {">=": {"memory": 24}},
+                     {"like": {"name": "a%"}}]},
+            fake_server.parse_filter(
+                "project_id='p1' and memory>=24 and name like 'a%'"))
+        self.assertRaises(fake_server.HTTPError, fake_server.parse_filter,
+                          "not (a=1)")
+
+    def test_benchmark(self):
+        app = mock.Mock(spec=["client"], client=self.client)
+        cmd = benchmark.CliBenchmarkMetricCreate(app, None)
+        parsed_args = cmd.get_parser("create").parse_args(
+            ["-n", "20", "-w", "4", "--executor", "thread"])
+        cmd._pools = []
+        columns, data = cmd.take_action(parsed_args)
+        stats = dict(zip(columns, data))
+        self.assertEqual(20, stats["create executed"])
+        self.assertEqual(0, stats["create failures"])
+        self.assertEqual(20, stats["delete executed"])
+        self.assertEqual({}, self.server.api.metrics)
+        self.assertNotIn("client connections opened", stats)
+
+    def test_benchmark_executors(self):
+        app = mock.Mock(spec=["client"], client=self.client)
+        for executor in sorted(benchmark.EXECUTORS):
+            with self.subTest(executor=executor):
+                cmd = benchmark.CliBenchmarkMetricCreate(app, None)
+                parsed_args = cmd.get_parser("create").parse_args(
+                    ["-n", "10", "-w", "2", "--executor", executor])
+                cmd._pools = []
+                columns, data = cmd.take_action(parsed_args)
+                stats = dict(zip(columns, data))
+                self.assertEqual(10, stats["create executed"])
+                self.assertEqual(0, stats["create failures"])
+                self.assertEqual(0, stats["delete failures"])
+                self.assertEqual({}, self.server.api.metrics)
+
+    def test_benchmark_connections(self):
+        plugin = auth.GnocchiBasicPlugin("admin", self.server.endpoint)
+        c = client.Client(session_options={"auth": plugin},
+                          pool_options={"pool_maxsize": 4})
+        app = mock.Mock(spec=["client"], client=c)
+        cmd = benchmark.CliBenchmarkMetricCreate(app, None)
+        parsed_args = cmd.get_parser("create").parse_args(
+            ["-n", "20", "-w", "4", "--executor", "thread"])
+        cmd._pools = []
+        columns, data = cmd.take_action(parsed_args)
+        stats = dict(zip(columns, data))
+        self.assertLessEqual(stats["client connections opened"], 4)
+        self.assertEqual(40 - stats["client connections opened"],
+                         stats["client connections reused"])
+
+    def test_benchmark_streaming(self):
+        app = mock.Mock(spec=["client"], client=self.client)
+        cmd = benchmark.CliBenchmarkResourceCreate(app, None)
+        parsed_args = cmd.get_parser("create").parse_args(
+            ["-n", "20", "-m", "1", "--executor", "thread", "--streaming"])
+        cmd._pools = []
+        columns, data = cmd.take_action(parsed_args)
+        stats = dict(zip(columns, data))
+        self.assertEqual(20, stats["create executed"])
+        self.assertEqual(20, stats["delete executed"])
+        self.assertEqual(0, stats["delete failures"])
+        self.assertGreater(stats["create result bytes"], 0)
+        self.assertEqual({}, self.server.api.resources)
@@ -0,0 +1,109 @@
+# -*- encoding: utf-8 -*-
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import datetime
+import threading
+import unittest
+from unittest import mock
+
+from gnocchiclient import utils
+from gnocchiclient.v1 import metric
+from gnocchiclient.v1 import timeseries
+
+METRIC_ID = "a6e6fbd8-5f9d-4c62-8f6e-4d9d1b1b6a3c"
+START = datetime.datetime(2017, 1, 1, tzinfo=datetime.timezone.utc)
+STOP = START + datetime.timedelta(hours=6)
+
+
+class FakeMeasuresAPI:
+    """Return the points of an hourly and a minutely series like Gnocchi."""
+
+    GRANULARITIES = (3600.0, 60.0)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.windows = []
+
+    def get(self, url, params=None, **kwargs):
+        resp = mock.Mock()
+        if params is None:
+            resp.json.return_value = {"archive_policy": {"definition": [
+                {"granularity": "1:00:00", "timespan": "30 days, 0:00:00"},
+                {"granularity": "0:01:00", "timespan": "1 day, 0:00:00"},
+            ]}}
+            return resp
+        start = utils.parse_timestamp(params["start"])
+        stop = utils.parse_timestamp(params["stop"])
+        with self.lock:
+            self.windows.append((start, stop))
+        measures = []
+        for g in self.GRANULARITIES:
+            # Gnocchi rounds the start down to the granularity
+            ts = START + datetime.timedelta(
+                seconds=(start - START).total_seconds() // g * g)
+            while ts < stop:
+                measures.append([ts.isoformat(), g, ts.minute])
+                ts += datetime.timedelta(seconds=g)
+        resp.json.return_value = measures
+        return resp
+
+
+class GetMeasuresShardedTest(unittest.TestCase):
+    def setUp(self):
+        self.api = FakeMeasuresAPI()
+        self.manager = metric.MetricManager(
+            mock.Mock(api=self.api, http_cache=None, metric_id_cache=None))
+
+    def _expected(self):
+        resp = self.api.get(None, params={"start": START.isoformat(),
+                                          "stop": STOP.isoformat()})
+        del self.api.windows[:]
+        return timeseries.convert_measures(resp.json())
+
+    def test_sharded(self):
+        expected = self._expected()
+        measures = self.manager.get_measures_sharded(
+            METRIC_ID, START + datetime.timedelta(seconds=10), STOP,
+            points_per_request=50)
+        # Inner boundaries are aligned on 50 minutes since epoch: 00:20,
+        # 01:10, 02:00, 02:50, 03:40, 04:30 and 05:20
+        self.assertEqual(8, len(self.api.windows))
+        self.assertEqual(expected, measures)
+        self.assertEqual(6 + 360, len(measures))
+
+    def test_sharded_granularity(self):
+        self.manager.get_measures_sharded(
+            METRIC_ID, START, STOP, granularity=3600, points_per_request=2)
+        self.assertEqual(3, len(self.api.windows))
+
+    def test_sharded_as_timeseries(self):
+        expected = self._expected()
+        series = self.manager.get_measures_sharded(
+            METRIC_ID, START.isoformat(), STOP.isoformat(), window=3600,
+            as_timeseries=True)
+        self.assertEqual(6, len(self.api.windows))
+        self.assertEqual(timeseries.TimeSeries.from_tuples(expected), series)
+
+    def test_sharded_invalid_period(self):
+        self.assertRaises(ValueError, self.manager.get_measures_sharded,
+                          METRIC_ID, STOP, START)
+
+    def test_split_period(self):
+        windows = metric.MetricManager._split_period(
+            START + datetime.timedelta(seconds=90), STOP, 3600)
+        self.assertEqual(6, len(windows))
+        self.assertEqual(START + datetime.timedelta(seconds=90),
+                         windows[0][0])
+        self.assertEqual(START + datetime.timedelta(hours=1), windows[0][1])
+        self.assertEqual(START + datetime.timedelta(hours=5), windows[-1][0])
+        self.assertEqual(STOP, windows[-1][1])
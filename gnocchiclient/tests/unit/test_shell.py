@@ -0,0 +1,72 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import os
+import subprocess
+import sys
+import unittest
+
+from cliff import command
+
+from gnocchiclient import shell
+
+# Modules only needed by some commands, which must not be imported before a
+# command is run
+LAZY_MODULES = ("gnocchiclient.benchmark", "gnocchiclient.v1.client",
+                "gnocchiclient.v1.metric_cli", "futurist")
+
+# Seconds allowed to import gnocchiclient.shell, including its dependencies
+IMPORT_TIME_BUDGET = float(os.getenv("GNOCCHI_IMPORT_TIME_BUDGET", "1.0"))
+
+
+def _import_times(code):
+    """Return the cumulative import time of each module imported by code."""
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True,
+        universal_newlines=True).stderr
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        __, cumulative, module = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[module.strip()] = int(cumulative) / 1e6
+    return times
+
+
+class ShellTest(unittest.TestCase):
+    def test_commands(self):
+        manager = shell.GnocchiCommandManager("gnocchiclient")
+        self.assertEqual(sorted(shell.GnocchiCommandManager.SHELL_COMMANDS),
+                         sorted(name for name, __ in manager))
+        for name, entry_point in manager:
+            self.assertTrue(issubclass(entry_point.load(), command.Command),
+                            name)
+        cmd_class, name, args = manager.find_command(["measures", "add",
+                                                      "cpu"])
+        self.assertEqual("CliMeasuresAdd", cmd_class.__name__)
+        self.assertEqual(["cpu"], args)
+
+    def test_import_time(self):
+        times = _import_times("import gnocchiclient.shell")
+        for module in LAZY_MODULES:
+            self.assertNotIn(module, times)
+        self.assertLess(times["gnocchiclient.shell"], IMPORT_TIME_BUDGET)
+
+    def test_command_imports(self):
+        times = _import_times(
+            "from gnocchiclient import shell; "
+            "shell.GnocchiCommandManager('gnocchiclient').find_command("
+            "['measures', 'add'])")
+        self.assertIn("gnocchiclient.v1.metric_cli", times)
+        self.assertNotIn("gnocchiclient.benchmark", times)
+        self.assertNotIn("futurist", times)
@@ -0,0 +1,57 @@
+# -*- encoding: utf-8 -*-
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import unittest
+
+import iso8601
+
+from gnocchiclient.v1 import aggregates
+from gnocchiclient.v1 import timeseries
+
+
+MEASURES = [
+    ["2017-01-01T12:00:00+00:00", 300.0, 1.5],
+    ["2017-01-01T12:05:00.123456+00:00", 300.0, None],
+    ["2017-01-01T14:10:00+02:00", 300.0, 3.0],
+]
+
+
+class TimeSeriesTest(unittest.TestCase):
+    def test_from_measures(self):
+        ts = timeseries.TimeSeries.from_measures(MEASURES)
+        self.assertEqual(3, len(ts))
+        self.assertEqual(1483272000 * 10 ** 9, ts.timestamps[0])
+        self.assertEqual(timeseries.convert_measures(MEASURES), list(ts))
+
+    def test_getitem(self):
+        ts = timeseries.TimeSeries.from_measures(MEASURES)
+        self.assertEqual(
+            (iso8601.parse_date("2017-01-01T12:10:00Z"), 300.0, 3.0), ts[-1])
+        self.assertEqual(
+            timeseries.TimeSeries.from_measures(MEASURES[1:]), ts[1:])
+
+    def test_buffer(self):
+        ts = timeseries.TimeSeries.from_measures(MEASURES)
+        self.assertEqual(8, memoryview(ts.timestamps).itemsize)
+        self.assertEqual([1.5, 3.0], memoryview(ts.values).tolist()[::2])
+
+    def test_columns_length(self):
+        self.assertRaises(ValueError, timeseries.TimeSeries, [1], [], [])
+
+    def test_aggregates_convert_dates(self):
+        data = {"aggregated": MEASURES,
+                "metric": {"mean": MEASURES[:1]}}
+        aggregates.AggregatesManager._convert_dates(data, as_timeseries=True)
+        self.assertEqual(timeseries.TimeSeries.from_measures(MEASURES),
+                         data["aggregated"])
+        self.assertEqual(1, len(data["metric"]["mean"]))
@@ -0,0 +1,116 @@
+# -*- encoding: utf-8 -*-
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import argparse
+import json
+import unittest
+
+import iso8601
+
+from gnocchiclient import exceptions
+from gnocchiclient import utils
+
+
+class IterJsonArrayTest(unittest.TestCase):
+    MEASURES = [
+        ["2017-01-01T12:00:00+00:00", 60.0, 1.5],
+        ["2017-01-01T12:01:00+00:00", 60.0, 12345],
+        ["2017-01-01T12:02:00+00:00", 60.0, None],
+        ["2017-01-01T12:03:00+00:00", 60.0, -2e-05],
+    ]
+
+    def _chunks(self, data, size):
+        data = data.encode("utf-8")
+        return [data[i:i + size] for i in range(0, len(data), size)]
+
+    def test_iter_json_array(self):
+        data = json.dumps(self.MEASURES, indent=1)
+        for size in (1, 2, 3, 7, 64, len(data)):
+            self.assertEqual(
+                self.MEASURES,
+                list(utils.iter_json_array(self._chunks(data, size))))
+
+    def test_iter_json_array_numbers(self):
+        self.assertEqual([1234, 5.5, "é"], list(utils.iter_json_array(
+            self._chunks('[1234, 5.5, "é"]', 1))))
+
+    def test_iter_json_array_empty(self):
+        self.assertEqual([], list(utils.iter_json_array([b"[ ]"])))
+
+    def test_iter_json_array_truncated(self):
+        self.assertRaises(ValueError, list,
+                          utils.iter_json_array([b"[[1, 2], [3"]))
+
+    def test_iter_json_array_not_array(self):
+        self.assertRaises(ValueError, list,
+                          utils.iter_json_array([b'{"a": 1}']))
+
+
+class ParseTimestampsTest(unittest.TestCase):
+    def test_parse_timestamps(self):
+        timestamps = [
+            "2017-01-01T12:00:00+00:00",
+            "2017-01-01T12:00:00.123456+00:00",
+            "2017-01-01T14:00:00+02:00",
+            "2017-01-01T12:00:00Z",
+            "2017-01-01T12:00:00",
+            "20170101T120000Z",
+        ]
+        expected = [iso8601.parse_date(ts) for ts in timestamps]
+        self.assertEqual(expected, utils.parse_timestamps(timestamps))
+        self.assertEqual(expected,
+                         [utils.parse_timestamp(ts) for ts in timestamps])
+        for parsed in utils.parse_timestamps(timestamps):
+            self.assertIsNotNone(parsed.tzinfo)
+
+    def test_parse_timestamps_invalid(self):
+        self.assertRaises(iso8601.ParseError,
+                          utils.parse_timestamps, ["yesterday"])
+
+
+class RaiseBulkFailuresTest(unittest.TestCase):
+    def test_no_failure(self):
+        utils.raise_bulk_failures({}, 3, "delete metrics")
+
+    def test_single_failure(self):
+        error = exceptions.NotFound(404, "Metric a does not exist")
+        self.assertRaises(exceptions.NotFound, utils.raise_bulk_failures,
+                          {"a": error}, 3, "delete metrics")
+
+    def test_several_failures(self):
+        with self.assertRaises(exceptions.ClientException) as cm:
+            utils.raise_bulk_failures(
+                {"a": ValueError("bad a"), "b": ValueError("bad b")},
+                3, "delete metrics")
+        self.assertEqual("Failed to delete metrics: 2/3 failures\n"
+                         "- a: bad a\n- b: bad b", cm.exception.message)
+
+
+class ParseTimespanTest(unittest.TestCase):
+    def test_parse_timespan(self):
+        self.assertEqual(60.0, utils.parse_timespan("0:01:00"))
+        self.assertEqual(0.5, utils.parse_timespan("0:00:00.500000"))
+        self.assertEqual(2 * 86400 + 3600,
+                         utils.parse_timespan("2 days, 1:00:00"))
+        self.assertEqual(300.0, utils.parse_timespan(300))
+        self.assertEqual(300.0, utils.parse_timespan("300"))
+        self.assertRaises(ValueError, utils.parse_timespan, "1 week")
+
+
+class PositiveNonZeroIntTest(unittest.TestCase):
+    def test_positive_non_zero_int(self):
+        self.assertEqual(4, utils.positive_non_zero_int("4"))
+        self.assertIsNone(utils.positive_non_zero_int(None))
+        for value in ("0", "-1", "1.5", "x"):
+            self.assertRaises(argparse.ArgumentTypeError,
+                              utils.positive_non_zero_int, value)
@@ -0,0 +1,127 @@
+# -*- encoding: utf-8 -*-
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import threading
+import time
+import unittest
+from unittest import mock
+
+from gnocchiclient import exceptions
+from gnocchiclient.v1 import writer
+
+
+METRIC_ID = "6a2cd3d0-3b53-4f6b-91b2-5d1e54a0d2a4"
+RESOURCE_ID = "1f3a8f73-2b16-4f24-a2b2-6f0e9c1e2b61"
+
+
+class MeasuresWriterTest(unittest.TestCase):
+    def setUp(self):
+        super(MeasuresWriterTest, self).setUp()
+        self.client = mock.Mock()
+
+    def test_flush_coalesces_writes(self):
+        w = writer.MeasuresWriter(self.client, max_latency=60)
+        f1 = w.write(METRIC_ID, [{"timestamp": 1, "value": 1}])
+        f2 = w.write(METRIC_ID, [{"timestamp": 2, "value": 2}])
+        f3 = w.write("cpu", [{"timestamp": 1, "value": 3}],
+                     resource_id=RESOURCE_ID)
+        self.assertFalse(f1.done())
+        w.close()
+        self.client.metric.batch_metrics_measures.assert_called_once_with(
+            {METRIC_ID: [{"timestamp": 1, "value": 1},
+                         {"timestamp": 2, "value": 2}]})
+        (self.client.metric.batch_resources_metrics_measures.
+         assert_called_once_with(
+             {RESOURCE_ID: {"cpu": [{"timestamp": 1, "value": 3}]}},
+             create_metrics=False))
+        for f in (f1, f2, f3):
+            self.assertIsNone(f.result(timeout=0))
+
+    def test_flush_on_max_measures(self):
+        w = writer.MeasuresWriter(self.client, max_measures=2,
+                                  max_latency=60)
+        w.write(METRIC_ID, [{"timestamp": 1, "value": 1}])
+        f = w.write(METRIC_ID, [{"timestamp": 2, "value": 2}])
+        f.result(timeout=10)
+        self.assertEqual(1, self.client.metric.batch_metrics_measures.
+                         call_count)
+        w.close()
+
+    def test_flush_on_max_latency(self):
+        w = writer.MeasuresWriter(self.client, max_latency=0.01)
+        f = w.write(METRIC_ID, [{"timestamp": 1, "value": 1}])
+        f.result(timeout=10)
+        w.close()
+
+    def test_error(self):
+        error = exceptions.BadRequest()
+        self.client.metric.batch_metrics_measures.side_effect = error
+        with writer.MeasuresWriter(self.client, max_latency=60) as w:
+            f = w.write(METRIC_ID, [{"timestamp": 1, "value": 1}])
+        self.assertIs(error, f.exception(timeout=0))
+
+    def test_max_pending(self):
+        sending = threading.Event()
+        sent = threading.Event()
+
+        def batch(measures):
+            sending.set()
+            sent.wait(10)
+
+        self.client.metric.batch_metrics_measures.side_effect = batch
+        w = writer.MeasuresWriter(self.client, max_measures=1,
+                                  max_pending=1)
+        w.write(METRIC_ID, [{"timestamp": 1, "value": 1}])
+        self.assertTrue(sending.wait(10))
+        blocked = threading.Thread(
+            target=w.write, args=(METRIC_ID, [{"timestamp": 2, "value": 2}]))
+        blocked.start()
+        blocked.join(0.1)
+        self.assertTrue(blocked.is_alive())
+        sent.set()
+        blocked.join(10)
+        self.assertFalse(blocked.is_alive())
+        w.close()
+        self.assertEqual(2, self.client.metric.batch_metrics_measures.
+                         call_count)
+
+    def test_write_from_callback(self):
+        w = writer.MeasuresWriter(self.client, max_measures=1, max_pending=1,
+                                  max_latency=0.01)
+        written = []
+
+        def write_again(future):
+            # The second write exceeds max_pending
+            for value in range(2):
+                written.append(w.write(METRIC_ID, [{"timestamp": 2,
+                                                    "value": value}]))
+
+        w.write(METRIC_ID, [{"timestamp": 1, "value": 1}]).add_done_callback(
+            write_again)
+        for _ in range(100):
+            if len(written) == 2:
+                break
+            time.sleep(0.1)
+        self.assertEqual(2, len(written))
+        w.close()
+        for f in written:
+            self.assertIsNone(f.result(timeout=0))
+
+    def test_closed(self):
+        w = writer.MeasuresWriter(self.client)
+        w.close()
+        self.assertRaises(RuntimeError, w.write, METRIC_ID, [])
+
+    def test_metric_name_requires_resource_id(self):
+        with writer.MeasuresWriter(self.client) as w:
+            self.assertRaises(TypeError, w.write, "cpu", [])
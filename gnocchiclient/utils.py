@@ -11,12 +11,19 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import argparse
+import codecs
+import datetime
+import json
+import re
 import urllib.parse
 
 from dateutil import tz
 
 import iso8601
 
+from gnocchiclient import exceptions
+
 
 def add_query_argument(cmd, parser, *args, **kwargs):
     return parser.add_argument(
@@ -32,11 +39,67 @@ def add_query_argument(cmd, parser, *args, **kwargs):
         *args, **kwargs)
 
 
+_JSON_DECODER = json.JSONDecoder()
+_JSON_WHITESPACE = " \t\n\r"
+_JSON_DELIMITERS = _JSON_WHITESPACE + ",]"
+
+
+def iter_json_array(chunks):
+    """Decode a JSON array incrementally and yield its elements.
+
+    Only the elements that are not complete yet are kept in memory, so the
+    whole document never has to be buffered.
+
+    :param chunks: the JSON document split in chunks
+    :type chunks: iterable of bytes
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    pos = 0
+    started = False
+    for chunk in chunks:
+        buf = buf[pos:] + decoder.decode(chunk)
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in _JSON_WHITESPACE:
+                pos += 1
+            if pos == len(buf):
+                break
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError("Expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                return
+            if buf[pos] == ",":
+                pos += 1
+                continue
+            try:
+                item, end = _JSON_DECODER.raw_decode(buf, pos)
+            except ValueError:
+                # The element is not complete yet, read more data
+                break
+            if end == len(buf) or buf[end] not in _JSON_DELIMITERS:
+                # A number could be truncated, wait for the
+                # next delimiter before trusting it
+                break
+            pos = end
+            yield item
+    raise ValueError("Truncated JSON array")
+
+
 def list2cols(cols, objs):
     return cols, [tuple([o[k] for k in cols])
                   for o in objs]
 
 
+def iter2cols(cols, objs):
+    return cols, (tuple([o[k] for k in cols])
+                  for o in objs)
+
+
 def format_string_list(li):
     return ", ".join(li)
 
@@ -86,6 +149,48 @@ def format_resource_for_metric(metric):
         format_move_dict_to_root(metric, "resource")
 
 
+def raise_bulk_failures(failures, total, action):
+    """Raise the errors returned by a bulk operation.
+
+    A single error is raised as-is, several are summarized in one exception.
+
+    :param failures: the exception raised for each failed item
+    :type failures: dict
+    :param total: number of items processed
+    :type total: int
+    :param action: description of the action, e.g. "delete metrics"
+    :type action: str
+    """
+    if not failures:
+        return
+    if len(failures) == 1:
+        raise next(iter(failures.values()))
+    raise exceptions.ClientException(
+        message="Failed to %s: %d/%d failures\n%s" % (
+            action, len(failures), total,
+            "\n".join("- %s: %s" % (item, error)
+                      for item, error in failures.items())))
+
+
+def positive_non_zero_int(argument_value):
+    """Parse a command line argument that must be a positive integer.
+
+    :raises argparse.ArgumentTypeError: if the argument is not an integer
+                                        greater than 0
+    """
+    if argument_value is None:
+        return None
+    try:
+        value = int(argument_value)
+    except ValueError:
+        msg = "%s must be an integer" % argument_value
+        raise argparse.ArgumentTypeError(msg)
+    if value <= 0:
+        msg = "%s must be greater than 0" % argument_value
+        raise argparse.ArgumentTypeError(msg)
+    return value
+
+
 def dict_from_parsed_args(parsed_args, attrs):
     d = {}
     for attr in attrs:
@@ -161,6 +266,70 @@ def parse_date(s):
     return iso8601.parse_date(s, LOCAL_TIMEZONE)
 
 
+def parse_timestamp(s):
+    """Parse a timestamp returned by Gnocchi.
+
+    Gnocchi returns timestamps in the ISO 8601 layout produced by
+    datetime.isoformat(), which datetime.fromisoformat() parses much faster
+    than iso8601. Anything else falls back to iso8601, where timestamps
+    without timezone are assumed to be UTC.
+
+    :param s: The timestamp to parse.
+    :type s: str
+    """
+    try:
+        d = datetime.datetime.fromisoformat(s)
+    except ValueError:
+        return iso8601.parse_date(s)
+    if d.tzinfo is None:
+        return iso8601.parse_date(s)
+    return d
+
+
+def parse_timestamps(timestamps):
+    """Parse a list of timestamps returned by Gnocchi.
+
+    This is the bulk version of parse_timestamp().
+
+    :param timestamps: The timestamps to parse.
+    :type timestamps: iterable of str
+    """
+    return [parse_timestamp(s) for s in timestamps]
+
+
+_TIMESPAN_RE = re.compile(r"^(?:(?P<days>-?\d+) days?, )?"
+                          r"(?P<hours>\d+):(?P<minutes>\d\d):"
+                          r"(?P<seconds>\d\d(?:\.\d+)?)$")
+
+
+def parse_timespan(value):
+    """Parse a timespan returned by Gnocchi.
+
+    Archive policy definitions express granularities and timespans either as
+    a number of seconds or in the layout of str(datetime.timedelta), e.g.
+    "1 day, 0:00:00".
+
+    :param value: The timespan to parse.
+    :type value: str or float
+    :return: the number of seconds
+    :rtype: float
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    m = _TIMESPAN_RE.match(value)
+    if m is None:
+        raise ValueError("Unable to parse timespan: %s" % value)
+    return datetime.timedelta(
+        days=int(m.group("days") or 0),
+        hours=int(m.group("hours")),
+        minutes=int(m.group("minutes")),
+        seconds=float(m.group("seconds"))).total_seconds()
+
+
 def dt_to_localtz(d):
     return d.astimezone(LOCAL_TIMEZONE)
 
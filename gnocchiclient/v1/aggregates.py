@@ -13,19 +13,18 @@
 
 import datetime
 
-import iso8601
-
 import ujson
 
 from gnocchiclient import utils
 from gnocchiclient.v1 import base
+from gnocchiclient.v1 import timeseries
 
 
 class AggregatesManager(base.Manager):
     def fetch(self, operations, search=None,
               resource_type='generic', start=None, stop=None, granularity=None,
               needed_overlap=None, groupby=None, fill=None, details=False,
-              use_history=False):
+              use_history=False, as_timeseries=False):
         """Get measurements of an aggregated metrics.
 
         :param operations: operations
@@ -49,11 +48,26 @@ class AggregatesManager(base.Manager):
                             response the tag history for resources. The
                             default value is `False`.
         :type use_history: boolean
+        :param as_timeseries: return TimeSeries instead of lists of tuples
+        :type as_timeseries: boolean
 
         See Gnocchi REST API documentation for the format
         of *query dictionary*
         http://docs.openstack.org/developer/gnocchi/rest.html#aggregates
         """
+        url, data = self._fetch_request(
+            operations, search, resource_type, start, stop, granularity,
+            needed_overlap, groupby, fill, details, use_history)
+        aggregates = self._post(
+            url, headers={'Content-Type': "application/json"},
+            data=data).json()
+        return self._convert_result(aggregates, search, groupby,
+                                    as_timeseries)
+
+    @staticmethod
+    def _fetch_request(operations, search, resource_type, start, stop,
+                       granularity, needed_overlap, groupby, fill, details,
+                       use_history):
         if isinstance(start, datetime.datetime):
             start = start.isoformat()
         if isinstance(stop, datetime.datetime):
@@ -73,30 +87,31 @@ class AggregatesManager(base.Manager):
 
         params['use_history'] = use_history
 
-        aggregates = self._post("v1/aggregates?%s" % (
-            utils.dict_to_querystring(params)),
-            headers={'Content-Type': "application/json"},
-            data=ujson.dumps(data)).json()
+        return ("v1/aggregates?%s" % utils.dict_to_querystring(params),
+                ujson.dumps(data))
 
+    @classmethod
+    def _convert_result(cls, aggregates, search, groupby, as_timeseries):
         if search is not None and groupby is not None:
             for group in aggregates:
-                self._convert_dates(group["measures"]["measures"])
+                cls._convert_dates(group["measures"]["measures"],
+                                   as_timeseries)
         else:
-            self._convert_dates(aggregates["measures"])
+            cls._convert_dates(aggregates["measures"], as_timeseries)
         return aggregates
 
     @classmethod
-    def _convert_dates(cls, data):
+    def _convert_dates(cls, data, as_timeseries=False):
         # NOTE(sileht): browse to aggregates measures dict tree and convert
         # date when we found timeseries, dict can looks like
         # {"aggregated": ...}, {"metric_id": {"agg": ...}} or
         # {"resource_id": {"metric_name": {"agg": ...}}}
         for key in data:
             if isinstance(data[key], list):
-                data[key] = [(iso8601.parse_date(ts), g, value)
-                             for ts, g, value in data[key]]
+                data[key] = timeseries.convert_measures(data[key],
+                                                        as_timeseries)
             elif isinstance(data[key], dict):
-                cls._convert_dates(data[key])
+                cls._convert_dates(data[key], as_timeseries)
             else:
                 raise RuntimeError("Unexpected aggregates API output %s" %
                                    data[key])
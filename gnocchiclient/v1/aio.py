@@ -0,0 +1,727 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Asyncio client for the Gnocchi v1 API.
+
+The managers mirror the ones of gnocchiclient.v1.client.Client, but their
+methods are coroutines. Requests are sent with aiohttp, which must be
+installed (``pip install gnocchiclient[aio]``); authentication still relies on
+keystoneauth1 sessions and auth plugins.
+"""
+
+import asyncio
+import os
+import ssl
+
+import aiohttp
+
+import keystoneauth1.session
+
+import requests.utils
+
+import ujson
+
+from gnocchiclient import exceptions
+from gnocchiclient import utils
+from gnocchiclient.v1 import aggregates
+from gnocchiclient.v1 import archive_policy
+from gnocchiclient.v1 import archive_policy_rule
+from gnocchiclient.v1 import base
+from gnocchiclient.v1 import capabilities
+from gnocchiclient.v1 import metric
+from gnocchiclient.v1 import resource
+from gnocchiclient.v1 import resource_type
+from gnocchiclient.v1 import status
+from gnocchiclient.v1 import timeseries
+
+
+class Response:
+    """The subset of requests.Response used by gnocchiclient."""
+
+    def __init__(self, url, status_code, headers, content, links):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.links = links
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", "replace")
+
+    def json(self):
+        return ujson.loads(self.content)
+
+
+def ssl_context(verify=True, cert=None):
+    """Return an SSL context matching the TLS settings of a session.
+
+    :param verify: whether to verify the certificate of the server, or the
+                   path of the CA bundle to verify it with, like the verify
+                   attribute of py:class:`keystoneauth1.session.Session`
+    :type verify: bool or str
+    :param cert: path of the client certificate, or a tuple of the paths of
+                 the client certificate and of its key
+    :type cert: str or tuple
+    """
+    if verify is False:
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    else:
+        if verify is True:
+            # Use the same CA bundle as requests
+            verify = (os.environ.get("REQUESTS_CA_BUNDLE") or
+                      os.environ.get("CURL_CA_BUNDLE") or
+                      requests.utils.DEFAULT_CA_BUNDLE_PATH)
+        if os.path.isdir(verify):
+            context = ssl.create_default_context(capath=verify)
+        else:
+            context = ssl.create_default_context(cafile=verify)
+    if cert:
+        if isinstance(cert, (tuple, list)):
+            context.load_cert_chain(*cert)
+        else:
+            context.load_cert_chain(cert)
+    return context
+
+
+def user_agent(session):
+    """Return the User-Agent sent by keystoneauth1 with a session."""
+    if session.user_agent:
+        return session.user_agent
+    agent = []
+    if session.app_name and session.app_version:
+        agent.append("%s/%s" % (session.app_name, session.app_version))
+    elif session.app_name:
+        agent.append(session.app_name)
+    for additional in session.additional_user_agent:
+        agent.append("%s/%s" % additional)
+    if not agent:
+        determined = keystoneauth1.session._determine_user_agent()
+        if determined:
+            agent.append(determined)
+    agent.append(keystoneauth1.session.DEFAULT_USER_AGENT)
+    return " ".join(agent)
+
+
+class AsyncSessionClient:
+    """Send requests to Gnocchi over a pooled aiohttp connector.
+
+    The endpoint and the authentication headers are obtained from the
+    keystoneauth1 session and its auth plugin, and cached until the server
+    answers 401. The TLS settings and the User-Agent are the ones of the
+    session.
+
+    :param session: keystoneauth1 session
+    :type session: py:class:`keystoneauth1.session.Session`
+    :param connection_limit: maximum number of simultaneous connections
+    :type connection_limit: int
+    """
+
+    def __init__(self, session, service_type="metric", service_name=None,
+                 interface=None, region_name=None, endpoint_override=None,
+                 connection_limit=100):
+        self.session = session
+        self.endpoint_override = endpoint_override
+        self.endpoint_filter = dict(service_type=service_type,
+                                    service_name=service_name,
+                                    interface=interface,
+                                    region_name=region_name)
+        self.connection_limit = connection_limit
+        self._http = None
+        self._endpoint = None
+        self._auth_headers = None
+
+    async def _invalidate(self):
+        loop = asyncio.get_running_loop()
+        self._auth_headers = None
+        return await loop.run_in_executor(None, self.session.invalidate)
+
+    async def _get_auth(self):
+        # keystoneauth1 is blocking, ask it from a thread and only once
+        loop = asyncio.get_running_loop()
+        if self._endpoint is None:
+            self._endpoint = self.endpoint_override or (
+                await loop.run_in_executor(
+                    None, lambda: self.session.get_endpoint(
+                        **self.endpoint_filter)))
+        if self._auth_headers is None:
+            self._auth_headers = await loop.run_in_executor(
+                None, self.session.get_auth_headers) or {}
+        return self._endpoint, self._auth_headers
+
+    def _get_http(self):
+        if self._http is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.connection_limit,
+                ssl=ssl_context(self.session.verify, self.session.cert))
+            self._http = aiohttp.ClientSession(
+                connector=connector,
+                headers={"User-Agent": user_agent(self.session)})
+        return self._http
+
+    async def request(self, url, method, headers=None, params=None,
+                      data=None, raise_exc=True):
+        resp = await self._request(url, method, headers, params, data)
+        if resp.status_code == 401 and await self._invalidate():
+            resp = await self._request(url, method, headers, params, data)
+        if raise_exc and resp.status_code >= 400:
+            raise exceptions.from_response(resp, method)
+        return resp
+
+    async def _request(self, url, method, headers, params, data):
+        endpoint, auth_headers = await self._get_auth()
+        if not url.startswith(("http://", "https://")):
+            url = endpoint.rstrip("/") + "/" + url.lstrip("/")
+        if params:
+            url += ("&" if "?" in url else "?") + utils.dict_to_querystring(
+                params)
+        all_headers = dict(auth_headers)
+        all_headers.update(headers or {})
+        try:
+            async with self._get_http().request(
+                    method, url, headers=all_headers, data=data) as resp:
+                content = await resp.read()
+                links = dict((rel, {"url": str(link["url"])})
+                             for rel, link in resp.links.items())
+                return Response(str(resp.url), resp.status, resp.headers,
+                                content, links)
+        except aiohttp.ClientSSLError as e:
+            raise exceptions.SSLError(message=str(e), url=url, method=method)
+        except aiohttp.ClientConnectorError as e:
+            raise exceptions.ConnectionFailure(
+                message=str(e), url=url, method=method)
+        except (aiohttp.ServerTimeoutError, asyncio.TimeoutError) as e:
+            raise exceptions.ConnectionTimeout(
+                message=str(e), url=url, method=method)
+        except aiohttp.ClientError as e:
+            raise exceptions.UnknownConnectionError(
+                message=str(e), url=url, method=method)
+
+    async def get(self, url, **kwargs):
+        return await self.request(url, "GET", **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request(url, "POST", **kwargs)
+
+    async def put(self, url, **kwargs):
+        return await self.request(url, "PUT", **kwargs)
+
+    async def patch(self, url, **kwargs):
+        return await self.request(url, "PATCH", **kwargs)
+
+    async def delete(self, url, **kwargs):
+        return await self.request(url, "DELETE", **kwargs)
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+
+
+class Manager:
+    DEFAULT_HEADERS = base.Manager.DEFAULT_HEADERS
+
+    _set_default_headers = base.Manager._set_default_headers
+
+    def __init__(self, client):
+        self.client = client
+
+    async def _get(self, *args, **kwargs):
+        self._set_default_headers(kwargs)
+        return await self.client.api.get(*args, **kwargs)
+
+    async def _post(self, *args, **kwargs):
+        self._set_default_headers(kwargs)
+        return await self.client.api.post(*args, **kwargs)
+
+    async def _put(self, *args, **kwargs):
+        self._set_default_headers(kwargs)
+        return await self.client.api.put(*args, **kwargs)
+
+    async def _patch(self, *args, **kwargs):
+        self._set_default_headers(kwargs)
+        return await self.client.api.patch(*args, **kwargs)
+
+    async def _delete(self, *args, **kwargs):
+        self._set_default_headers(kwargs)
+        return await self.client.api.delete(*args, **kwargs)
+
+    async def _post_json(self, url, data, **kwargs):
+        return (await self._post(
+            url, headers={'Content-Type': "application/json"},
+            data=data, **kwargs)).json()
+
+    async def _patch_json(self, url, data):
+        return (await self._patch(
+            url, headers={'Content-Type': "application/json"},
+            data=data)).json()
+
+    @staticmethod
+    async def _iter_pages(fetch, page_url, limit=None, prefetch=True):
+        """Iterate over the items of a paginated listing.
+
+        See gnocchiclient.v1.base.Manager._iter_pages().
+        """
+        count = 0
+        task = asyncio.ensure_future(fetch(page_url))
+        try:
+            while task is not None:
+                page = await task
+                items = page.json()
+                count += len(items)
+                if limit is None or count < limit:
+                    page_url = page.links.get("next", {'url': None})['url']
+                else:
+                    page_url = None
+                task = None
+                if page_url and prefetch:
+                    task = asyncio.ensure_future(fetch(page_url))
+                for item in items:
+                    yield item
+                if page_url and not prefetch:
+                    task = asyncio.ensure_future(fetch(page_url))
+        finally:
+            if task is not None:
+                task.cancel()
+
+
+class ArchivePolicyManager(Manager):
+    url = archive_policy.ArchivePolicyManager.url
+
+    async def list(self):
+        """List archive policies."""
+        return (await self._get(self.url)).json()
+
+    async def get(self, name):
+        """Get an archive policy.
+
+        See gnocchiclient.v1.archive_policy.ArchivePolicyManager.get().
+        """
+        return (await self._get(self.url + name)).json()
+
+    async def create(self, archive_policy):
+        """Create an archive policy.
+
+        See gnocchiclient.v1.archive_policy.ArchivePolicyManager.create().
+        """
+        return await self._post_json(self.url, ujson.dumps(archive_policy))
+
+    async def update(self, name, archive_policy):
+        """Update an archive policy.
+
+        See gnocchiclient.v1.archive_policy.ArchivePolicyManager.update().
+        """
+        return await self._patch_json(self.url + '/' + name,
+                                      ujson.dumps(archive_policy))
+
+    async def delete(self, name):
+        """Delete an archive policy.
+
+        See gnocchiclient.v1.archive_policy.ArchivePolicyManager.delete().
+        """
+        await self._delete(self.url + name)
+
+
+class ArchivePolicyRuleManager(Manager):
+    url = archive_policy_rule.ArchivePolicyRuleManager.url
+
+    async def list(self):
+        """List archive policy rules."""
+        return (await self._get(self.url)).json()
+
+    async def get(self, name):
+        """Get an archive policy rule.
+
+        See
+        gnocchiclient.v1.archive_policy_rule.ArchivePolicyRuleManager.get().
+        """
+        return (await self._get(self.url + name)).json()
+
+    async def create(self, archive_policy_rule):
+        """Create an archive policy rule."""
+        return await self._post_json(self.url,
+                                     ujson.dumps(archive_policy_rule))
+
+    async def update(self, name, new_name):
+        """Update an archive policy rule.
+
+        See
+        gnocchiclient.v1.archive_policy_rule.ArchivePolicyRuleManager.update().
+        """
+        return await self._patch_json(self.url + '/' + name,
+                                      ujson.dumps({'name': new_name}))
+
+    async def delete(self, name):
+        """Delete an archive policy rule.
+
+        See
+        gnocchiclient.v1.archive_policy_rule.ArchivePolicyRuleManager.delete().
+        """
+        await self._delete(self.url + name)
+
+
+class ResourceTypeManager(Manager):
+    url = resource_type.ResourceTypeManager.url
+
+    async def list(self):
+        """List resource types."""
+        return (await self._get(self.url)).json()
+
+    async def create(self, resource_type):
+        """Create a resource type.
+
+        See gnocchiclient.v1.resource_type.ResourceTypeManager.create().
+        """
+        return await self._post_json(self.url, ujson.dumps(resource_type))
+
+    async def get(self, name):
+        """Get a resource type.
+
+        See gnocchiclient.v1.resource_type.ResourceTypeManager.get().
+        """
+        return (await self._get(
+            self.url + name,
+            headers={'Content-Type': "application/json"})).json()
+
+    async def delete(self, name):
+        """Delete a resource type.
+
+        See gnocchiclient.v1.resource_type.ResourceTypeManager.delete().
+        """
+        await self._delete(self.url + name)
+
+    async def update(self, name, operations):
+        """Update a resource type.
+
+        See gnocchiclient.v1.resource_type.ResourceTypeManager.update().
+        """
+        return (await self._patch(
+            self.url + name,
+            headers={'Content-Type': "application/json-patch+json"},
+            data=ujson.dumps(operations))).json()
+
+
+class ResourceManager(Manager):
+    url = resource.ResourceManager.url
+
+    _sync = resource.ResourceManager
+
+    async def list(self, resource_type="generic", details=False,
+                   history=False, limit=None, marker=None, sorts=None):
+        """List resources.
+
+        See gnocchiclient.v1.resource.ResourceManager.list().
+        """
+        return [r async for r in self.iter_list(
+            resource_type, details, history, limit, marker, sorts)]
+
+    def iter_list(self, resource_type="generic", details=False, history=False,
+                  limit=None, marker=None, sorts=None, prefetch=True):
+        """Iterate over resources, fetching them one page at a time.
+
+        See gnocchiclient.v1.resource.ResourceManager.iter_list().
+        """
+        page_url = self._sync._list_url(resource_type, details, history,
+                                        limit, marker, sorts)
+        return self._iter_pages(self._get, page_url, limit, prefetch)
+
+    async def get(self, resource_type, resource_id, history=False):
+        """Get a resource.
+
+        See gnocchiclient.v1.resource.ResourceManager.get().
+        """
+        return (await self._get(self._sync._get_url(
+            resource_type, resource_id, history))).json()
+
+    async def history(self, resource_type, resource_id, details=False,
+                      limit=None, marker=None, sorts=None):
+        """Get the history of a resource.
+
+        See gnocchiclient.v1.resource.ResourceManager.history().
+        """
+        return (await self._get(self._sync._history_url(
+            resource_type, resource_id, details, limit, marker,
+            sorts))).json()
+
+    async def create(self, resource_type, resource):
+        """Create a resource.
+
+        See gnocchiclient.v1.resource.ResourceManager.create().
+        """
+        return await self._post_json(self.url + resource_type,
+                                     ujson.dumps(resource))
+
+    async def update(self, resource_type, resource_id, resource):
+        """Update a resource.
+
+        See gnocchiclient.v1.resource.ResourceManager.update().
+        """
+        return await self._patch_json(
+            self.url + resource_type + "/" + resource_id,
+            ujson.dumps(resource))
+
+    async def delete(self, resource_id):
+        """Delete a resource.
+
+        See gnocchiclient.v1.resource.ResourceManager.delete().
+        """
+        await self._delete(self.url + "generic/" + resource_id)
+
+    async def batch_delete(self, query, resource_type="generic"):
+        """Delete a batch of resources based on attribute values.
+
+        See gnocchiclient.v1.resource.ResourceManager.batch_delete().
+        """
+        url, data = self._sync._batch_delete_request(query, resource_type)
+        return (await self._delete(
+            url, headers={'Content-Type': "application/json"},
+            data=data)).json()
+
+    async def search(self, resource_type="generic", query=None, details=False,
+                     history=False, limit=None, marker=None, sorts=None):
+        """Search resources.
+
+        See gnocchiclient.v1.resource.ResourceManager.search().
+        """
+        return [r async for r in self.iter_search(
+            resource_type, query, details, history, limit, marker, sorts)]
+
+    def iter_search(self, resource_type="generic", query=None, details=False,
+                    history=False, limit=None, marker=None, sorts=None,
+                    prefetch=True):
+        """Iterate over searched resources, fetching one page at a time.
+
+        See gnocchiclient.v1.resource.ResourceManager.iter_search().
+        """
+        page_url, data = self._sync._search_request(
+            resource_type, query, details, history, limit, marker, sorts)
+
+        def fetch(page_url):
+            return self._post(
+                page_url, headers={'Content-Type': "application/json"},
+                data=data)
+
+        return self._iter_pages(fetch, page_url, limit, prefetch)
+
+
+class MetricManager(Manager):
+    _sync = metric.MetricManager
+
+    async def list(self, limit=None, marker=None, sorts=None):
+        """List metrics.
+
+        See gnocchiclient.v1.metric.MetricManager.list().
+        """
+        return [m async for m in self.iter_list(limit, marker, sorts)]
+
+    def iter_list(self, limit=None, marker=None, sorts=None, prefetch=True):
+        """Iterate over metrics, fetching them one page at a time.
+
+        See gnocchiclient.v1.metric.MetricManager.iter_list().
+        """
+        return self._iter_pages(self._get,
+                                self._sync._list_url(limit, marker, sorts),
+                                limit, prefetch)
+
+    async def get(self, metric, resource_id=None):
+        """Get a metric.
+
+        See gnocchiclient.v1.metric.MetricManager.get().
+        """
+        return (await self._get(self._sync._url(metric, resource_id))).json()
+
+    async def create(self, name=None, archive_policy_name=None,
+                     resource_id=None, unit=None):
+        """Create a metric.
+
+        See gnocchiclient.v1.metric.MetricManager.create().
+        """
+        url, data = self._sync._create_request(name, archive_policy_name,
+                                               resource_id, unit)
+        metric = await self._post_json(url, data)
+        return metric if resource_id is None else metric[0]
+
+    async def delete(self, metric, resource_id=None):
+        """Delete a metric.
+
+        See gnocchiclient.v1.metric.MetricManager.delete().
+        """
+        await self._delete(self._sync._url(metric, resource_id))
+
+    async def add_measures(self, metric, measures, resource_id=None):
+        """Add measurements to a metric.
+
+        See gnocchiclient.v1.metric.MetricManager.add_measures().
+        """
+        return await self._post(
+            self._sync._url(metric, resource_id) + "/measures",
+            headers={'Content-Type': "application/json"},
+            data=ujson.dumps(measures))
+
+    async def batch_metrics_measures(self, measures):
+        """Add measurements to metrics.
+
+        See gnocchiclient.v1.metric.MetricManager.batch_metrics_measures().
+        """
+        return await self._post(
+            self._sync.metric_batch_url,
+            headers={'Content-Type': "application/json"},
+            data=ujson.dumps(measures))
+
+    async def batch_resources_metrics_measures(self, measures,
+                                               create_metrics=False):
+        """Add measurements to named metrics of resources.
+
+        See
+        gnocchiclient.v1.metric.MetricManager.batch_resources_metrics_measures().
+        """
+        return await self._post(
+            self._sync.resources_batch_url,
+            headers={'Content-Type': "application/json"},
+            data=ujson.dumps(measures),
+            params=dict(create_metrics=create_metrics))
+
+    async def get_measures(self, metric, start=None, stop=None,
+                           aggregation=None, granularity=None,
+                           resource_id=None, refresh=False, resample=None,
+                           as_timeseries=False, **kwargs):
+        """Get measurements of a metric.
+
+        See gnocchiclient.v1.metric.MetricManager.get_measures().
+        """
+        url, params = self._sync._measures_request(
+            metric, start, stop, aggregation, granularity, resource_id,
+            refresh, resample, **kwargs)
+        measures = (await self._get(url, params=params)).json()
+        return timeseries.convert_measures(measures, as_timeseries)
+
+    async def aggregation(self, metrics, query=None,
+                          start=None, stop=None, aggregation=None,
+                          reaggregation=None, granularity=None,
+                          needed_overlap=None, resource_type="generic",
+                          groupby=None, refresh=False, resample=None,
+                          fill=None, as_timeseries=False):
+        """Get measurements of an aggregated metrics.
+
+        See gnocchiclient.v1.metric.MetricManager.aggregation().
+        """
+        url, params, data = self._sync._aggregation_request(
+            metrics, query, start, stop, aggregation, reaggregation,
+            granularity, needed_overlap, resource_type, groupby, refresh,
+            resample, fill)
+        if query is None:
+            measures = (await self._get(url, params=params)).json()
+        else:
+            measures = await self._post_json(url, data)
+        return self._sync._convert_aggregation(measures, groupby,
+                                               as_timeseries)
+
+
+class AggregatesManager(Manager):
+    _sync = aggregates.AggregatesManager
+
+    async def fetch(self, operations, search=None,
+                    resource_type='generic', start=None, stop=None,
+                    granularity=None, needed_overlap=None, groupby=None,
+                    fill=None, details=False, use_history=False,
+                    as_timeseries=False):
+        """Get measurements of an aggregated metrics.
+
+        See gnocchiclient.v1.aggregates.AggregatesManager.fetch().
+        """
+        url, data = self._sync._fetch_request(
+            operations, search, resource_type, start, stop, granularity,
+            needed_overlap, groupby, fill, details, use_history)
+        return self._sync._convert_result(await self._post_json(url, data),
+                                          search, groupby, as_timeseries)
+
+
+class CapabilitiesManager(Manager):
+    cap_url = capabilities.CapabilitiesManager.cap_url
+
+    async def list(self):
+        """List capabilities."""
+        return (await self._get(self.cap_url)).json()
+
+
+class StatusManager(Manager):
+    url = status.StatusManager.url
+
+    async def get(self, details=False):
+        """Get Gnocchi status."""
+        return (await self._get(self.url + '?details=%s' % details)).json()
+
+
+class BuildManager(Manager):
+    async def get(self):
+        """Get Gnocchi build."""
+        return (await self._get("")).json().get("build", "unknown")
+
+
+class Client:
+    """Asyncio client for the Gnocchi v1 API.
+
+    The client must be closed with close(), or used as an asynchronous
+    context manager, to release its connections.
+
+    :param session: keystoneauth1 session
+    :type session: py:class:`keystoneauth1.session.Session` (optional)
+    :param adapter_options: options to pass to
+                            py:class:`AsyncSessionClient`, e.g.
+                            service_type, interface, region_name or
+                            endpoint_override
+    :type adapter_options: dict (optional)
+    :param session_options: options to pass to
+                            py:class:`keystoneauth1.session.Session`
+    :type session_options: dict (optional)
+    :param connection_limit: maximum number of simultaneous connections
+    :type connection_limit: int (optional)
+    """
+
+    def __init__(self, session=None, adapter_options=None,
+                 session_options=None, connection_limit=100):
+        """Initialize a new asyncio client for the Gnocchi v1 API."""
+        session_options = session_options or {}
+        adapter_options = adapter_options or {}
+
+        adapter_options.setdefault('service_type', "metric")
+
+        if session is None:
+            session = keystoneauth1.session.Session(**session_options)
+        else:
+            if session_options:
+                raise ValueError("session and session_options are exclusive")
+
+        self.api = AsyncSessionClient(session,
+                                      connection_limit=connection_limit,
+                                      **adapter_options)
+        self.resource = ResourceManager(self)
+        self.resource_type = ResourceTypeManager(self)
+        self.archive_policy = ArchivePolicyManager(self)
+        self.archive_policy_rule = ArchivePolicyRuleManager(self)
+        self.metric = MetricManager(self)
+        self.aggregates = AggregatesManager(self)
+        self.capabilities = CapabilitiesManager(self)
+        self.status = StatusManager(self)
+        self.build = BuildManager(self)
+
+    async def close(self):
+        """Close the connections of the client."""
+        await self.api.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
@@ -13,6 +13,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import itertools
+
+
+DEFAULT_CONCURRENCY = 10
+
 
 class Manager:
     DEFAULT_HEADERS = {
@@ -32,7 +37,10 @@ class Manager:
 
     def _get(self, *args, **kwargs):
         self._set_default_headers(kwargs)
-        return self.client.api.get(*args, **kwargs)
+        http_cache = self.client.http_cache
+        if http_cache is None or kwargs.get('stream'):
+            return self.client.api.get(*args, **kwargs)
+        return http_cache.get(self.client.api.get, *args, **kwargs)
 
     def _post(self, *args, **kwargs):
         self._set_default_headers(kwargs)
@@ -49,3 +57,86 @@ class Manager:
     def _delete(self, *args, **kwargs):
         self._set_default_headers(kwargs)
         return self.client.api.delete(*args, **kwargs)
+
+    @staticmethod
+    def _iter_pages(fetch, page_url, limit=None, prefetch=True):
+        """Iterate over the items of a paginated listing.
+
+        While the items of a page are consumed, the next page is fetched in
+        the background so that at most one page is read ahead.
+
+        :param fetch: function returning the response of a page URL
+        :type fetch: callable
+        :param page_url: URL of the first page
+        :type page_url: str
+        :param limit: stop following pages once this many items are returned
+        :type limit: int
+        :param prefetch: fetch the next page while the current one is consumed
+        :type prefetch: bool
+        """
+        # NOTE: futurist is slow to import and only needed for listings, do
+        # not make every command of the shell pay for it
+        import futurist
+
+        if prefetch:
+            executor = futurist.ThreadPoolExecutor(max_workers=1)
+        else:
+            executor = futurist.SynchronousExecutor()
+        count = 0
+        try:
+            future = executor.submit(fetch, page_url)
+            while future is not None:
+                page = future.result()
+                items = page.json()
+                count += len(items)
+                if limit is None or count < limit:
+                    page_url = page.links.get("next", {'url': None})['url']
+                else:
+                    page_url = None
+                future = None
+                if page_url and prefetch:
+                    future = executor.submit(fetch, page_url)
+                for item in items:
+                    yield item
+                if page_url and not prefetch:
+                    future = executor.submit(fetch, page_url)
+        finally:
+            executor.shutdown(wait=False)
+
+    @staticmethod
+    def _map_concurrently(fn, items, concurrency=DEFAULT_CONCURRENCY,
+                          progress=None):
+        """Call a function on each item from a pool of threads.
+
+        :param fn: function to call with each item
+        :type fn: callable
+        :param items: items to pass to the function
+        :type items: iterable
+        :param concurrency: maximum number of calls running at the same time
+        :type concurrency: int
+        :param progress: function called with the number of finished calls
+                         and the total number of calls each time one finishes
+        :type progress: callable
+        :return: each item with its result, or the exception raised, in the
+                 order of *items*, duplicated items included
+        :rtype: list of tuple
+        """
+        import futurist
+
+        items = list(items)
+        done = itertools.count(1)
+
+        def _on_done(future):
+            progress(next(done), len(items))
+
+        with futurist.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(fn, item) for item in items]
+            if progress is not None:
+                for future in futures:
+                    future.add_done_callback(_on_done)
+        results = []
+        for item, future in zip(items, futures):
+            error = future.exception()
+            results.append(
+                (item, future.result() if error is None else error))
+        return results
@@ -15,6 +15,7 @@
 
 import keystoneauth1.session
 
+from gnocchiclient import cache
 from gnocchiclient import client
 from gnocchiclient.v1 import aggregates
 from gnocchiclient.v1 import archive_policy
@@ -38,10 +39,32 @@ class Client:
     :param session_options: options to pass to
                             py:class:`keystoneauth1.session.Session`
     :type session_options: dict (optional)
+    :param pool_options: options of the HTTP connection pool of the session,
+                         see py:class:`gnocchiclient.client.PoolAdapter`
+    :type pool_options: dict (optional)
+    :param compression_options: options to compress the bodies of measures
+                                writes, see
+                                py:class:`gnocchiclient.client.BodyCompressor`
+    :type compression_options: dict (optional)
+    :param resource_type_cache_options: options of the cache of the resource
+                                        types, see
+                                        py:class:`gnocchiclient.cache.TTLCache`
+    :type resource_type_cache_options: dict (optional)
+    :param metric_id_cache_options: options of the cache of the IDs of the
+                                    metrics named on resources, see
+                                    py:class:`gnocchiclient.cache.TTLCache`
+    :type metric_id_cache_options: dict (optional)
+    :param http_cache_options: options of the cache of the GET responses,
+                               revalidated with conditional requests, see
+                               py:class:`gnocchiclient.cache.HTTPCache`
+    :type http_cache_options: dict (optional)
     """
 
     def __init__(self, session=None, adapter_options=None,
-                 session_options=None):
+                 session_options=None, pool_options=None,
+                 compression_options=None,
+                 resource_type_cache_options=None,
+                 metric_id_cache_options=None, http_cache_options=None):
         """Initialize a new client for the Gnocchi v1 API."""
         session_options = session_options or {}
         adapter_options = adapter_options or {}
@@ -54,6 +77,33 @@ class Client:
             if session_options:
                 raise ValueError("session and session_options are exclusive")
 
+        if pool_options is None:
+            self._pool_adapter = None
+        else:
+            self._pool_adapter = client.mount_pool_adapter(session,
+                                                           **pool_options)
+
+        if compression_options is None:
+            self.compressor = None
+        else:
+            self.compressor = client.BodyCompressor(**compression_options)
+
+        if resource_type_cache_options is None:
+            self.resource_type_cache = None
+        else:
+            self.resource_type_cache = cache.TTLCache(
+                **resource_type_cache_options)
+
+        if metric_id_cache_options is None:
+            self.metric_id_cache = None
+        else:
+            self.metric_id_cache = cache.TTLCache(**metric_id_cache_options)
+
+        if http_cache_options is None:
+            self.http_cache = None
+        else:
+            self.http_cache = cache.HTTPCache(**http_cache_options)
+
         self.api = client.SessionClient(session, **adapter_options)
         self.resource = resource.ResourceManager(self)
         self.resource_type = resource_type.ResourceTypeManager(self)
@@ -65,3 +115,28 @@ class Client:
         self.capabilities = capabilities.CapabilitiesManager(self)
         self.status = status.StatusManager(self)
         self.build = build.BuildManager(self)
+
+    def connection_stats(self):
+        """Return the number of requests sent and connections opened.
+
+        Connections are only counted when the client has been created with
+        pool_options, None is returned otherwise.
+
+        :rtype: dict
+        """
+        if self._pool_adapter is not None:
+            return self._pool_adapter.stats()
+
+    def compression_stats(self):
+        """Return the number of bodies compressed and decompressed.
+
+        Bodies are decompressed when the server compresses its responses,
+        and compressed when the client has been created with
+        compression_options.
+
+        :rtype: dict
+        """
+        stats = self.api.decompression_stats()
+        if self.compressor is not None:
+            stats.update(self.compressor.stats())
+        return stats
@@ -11,17 +11,22 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import datetime
 import uuid
 
 from debtcollector import removals
 
-import iso8601
-
 import ujson
 
+from gnocchiclient import exceptions
 from gnocchiclient import utils
 from gnocchiclient.v1 import base
+from gnocchiclient.v1 import timeseries
+
+
+MEASURES_CHUNK_SIZE = 64 * 1024
+DEFAULT_POINTS_PER_REQUEST = 10000
 
 
 class MetricManager(base.Manager):
@@ -42,19 +47,32 @@ class MetricManager(base.Manager):
                       ["user_id:desc-nullslast", "project_id:asc"]
         :type sorts: list of str
         """
+        return list(self.iter_list(limit, marker, sorts))
+
+    def iter_list(self, limit=None, marker=None, sorts=None, prefetch=True):
+        """Iterate over metrics, fetching them one page at a time.
+
+        :param limit: maximum number of resources to return
+        :type limit: int
+        :param marker: the last item of the previous page; we return the next
+                       results after this value.
+        :type marker: str
+        :param sorts: list of resource attributes to order by. (example
+                      ["user_id:desc-nullslast", "project_id:asc"]
+        :type sorts: list of str
+        :param prefetch: fetch the next page while the current one is consumed
+        :type prefetch: bool
+        """
+        return self._iter_pages(self._get,
+                                self._list_url(limit, marker, sorts),
+                                limit, prefetch)
+
+    @classmethod
+    def _list_url(cls, limit, marker, sorts):
         params = utils.build_pagination_options(False, False, limit, marker,
                                                 sorts)
-        metrics = []
-        page_url = "%s?%s" % (self.metric_url[:-1],
-                              utils.dict_to_querystring(params))
-        while page_url:
-            page = self._get(page_url)
-            metrics.extend(page.json())
-            if limit is None or len(metrics) < limit:
-                page_url = page.links.get("next", {'url': None})['url']
-            else:
-                break
-        return metrics
+        return "%s?%s" % (cls.metric_url[:-1],
+                          utils.dict_to_querystring(params))
 
     @staticmethod
     def _ensure_metric_is_uuid(metric, attribute="resource_id"):
@@ -64,6 +82,52 @@ class MetricManager(base.Manager):
             raise TypeError("%s is required to get a metric by name" %
                             attribute)
 
+    @classmethod
+    def _url(cls, metric, resource_id):
+        if resource_id is None:
+            cls._ensure_metric_is_uuid(metric)
+            return cls.metric_url + metric
+        return cls.resource_url % resource_id + metric
+
+    def _cached_id(self, metric, resource_id):
+        cache = self.client.metric_id_cache
+        if cache is None or resource_id is None:
+            return None
+        return cache.get((resource_id, metric))
+
+    def _remember_resource(self, resource):
+        """Cache the IDs of the metrics of a resource, by name."""
+        cache = self.client.metric_id_cache
+        if cache is None:
+            return
+        resource_ids = {resource["id"],
+                        resource.get("original_resource_id", resource["id"])}
+        for name, metric_id in resource.get("metrics", {}).items():
+            for resource_id in resource_ids:
+                cache.set((resource_id, name), metric_id)
+
+    def _iter_remembered(self, resources):
+        for resource in resources:
+            self._remember_resource(resource)
+            yield resource
+
+    def _by_id(self, fn, metric, resource_id):
+        """Call fn with the ID of a metric if it is cached, by name otherwise.
+
+        The metric name is resolved again by the server if the cached ID is
+        not found, e.g. because the metric has been replaced.
+
+        :param fn: function called with the metric and the resource ID
+        :type fn: callable
+        """
+        metric_id = self._cached_id(metric, resource_id)
+        if metric_id is not None:
+            try:
+                return fn(metric_id, None)
+            except exceptions.MetricNotFound:
+                self.client.metric_id_cache.invalidate((resource_id, metric))
+        return fn(metric, resource_id)
+
     def get(self, metric, resource_id=None):
         """Get an metric.
 
@@ -73,12 +137,12 @@ class MetricManager(base.Manager):
                             to get a metric by name)
         :type resource_id: str
         """
-        if resource_id is None:
-            self._ensure_metric_is_uuid(metric)
-            url = self.metric_url + metric
-        else:
-            url = (self.resource_url % resource_id) + metric
-        return self._get(url).json()
+        result = self._get(self._url(metric, resource_id)).json()
+        if (resource_id is not None and
+                self.client.metric_id_cache is not None):
+            self.client.metric_id_cache.set((resource_id, metric),
+                                            result["id"])
+        return result
 
     # FIXME(jd): This is what create will be after debtcollector warnings have
     # been removed. We provide it right now for the benchmark code, that can't
@@ -96,6 +160,14 @@ class MetricManager(base.Manager):
         :param unit: The unit of the metric.
         :type unit: str
         """
+        url, data = self._create_request(name, archive_policy_name,
+                                         resource_id, unit)
+        metric = self._post(url, headers={'Content-Type': "application/json"},
+                            data=data).json()
+        return metric if resource_id is None else metric[0]
+
+    @classmethod
+    def _create_request(cls, name, archive_policy_name, resource_id, unit):
         metric = {}
         if name is not None:
             metric["name"] = name
@@ -105,18 +177,13 @@ class MetricManager(base.Manager):
             metric["unit"] = unit
 
         if resource_id is None:
-            return self._post(
-                self.metric_url, headers={'Content-Type': "application/json"},
-                data=ujson.dumps(metric)).json()
+            return cls.metric_url, ujson.dumps(metric)
 
         if name is None:
             raise TypeError(
                 "Metric name is required if resource_id is set")
 
-        return self._post(
-            self.resource_url % resource_id,
-            headers={'Content-Type': "application/json"},
-            data=ujson.dumps({name: metric})).json()[0]
+        return cls.resource_url % resource_id, ujson.dumps({name: metric})
 
     # FIXME(jd): remove refetch_metric when LP#1497171 is fixed
     @removals.removed_kwarg("refetch_metric")
@@ -182,13 +249,38 @@ class MetricManager(base.Manager):
                             to get a metric by name)
         :type resource_id: str
         """
-        if resource_id is None:
-            self._ensure_metric_is_uuid(metric)
-            url = self.metric_url + metric
-        else:
-            url = self.resource_url % resource_id + metric
+        url = self._url(metric, resource_id)
+        if (resource_id is not None and
+                self.client.metric_id_cache is not None):
+            self.client.metric_id_cache.invalidate((resource_id, metric))
         self._delete(url)
 
+    def bulk_delete(self, metrics, resource_id=None,
+                    concurrency=base.DEFAULT_CONCURRENCY, progress=None):
+        """Delete several metrics concurrently.
+
+        Unlike delete(), errors do not stop the deletion of the other
+        metrics: they are returned.
+
+        :param metrics: IDs or Names of the metrics
+        :type metrics: list of str
+        :param resource_id: ID of the resource (required
+                            to delete metrics by name)
+        :type resource_id: str
+        :param concurrency: maximum number of requests sent at the same time
+        :type concurrency: int
+        :param progress: function called with the number of processed
+                         metrics and the total number of metrics
+        :type progress: callable
+        :return: the exception raised for each metric that failed
+        :rtype: collections.OrderedDict
+        """
+        results = self._map_concurrently(
+            lambda metric: self.delete(metric, resource_id=resource_id),
+            metrics, concurrency, progress)
+        return collections.OrderedDict(
+            (m, r) for m, r in results if isinstance(r, Exception))
+
     def add_measures(self, metric, measures, resource_id=None):
         """Add measurements to a metric.
 
@@ -200,14 +292,22 @@ class MetricManager(base.Manager):
         :param measures: measurements
         :type measures: list of dict(timestamp=timestamp, value=float)
         """
-        if resource_id is None:
-            self._ensure_metric_is_uuid(metric)
-            url = self.metric_url + metric + "/measures"
-        else:
-            url = self.resource_url % resource_id + metric + "/measures"
-        return self._post(
-            url, headers={'Content-Type': "application/json"},
-            data=ujson.dumps(measures))
+        return self._by_id(
+            lambda metric, resource_id: self._add_measures(
+                metric, measures, resource_id),
+            metric, resource_id)
+
+    def _add_measures(self, metric, measures, resource_id):
+        return self._post_measures(self._url(metric, resource_id) +
+                                   "/measures", measures)
+
+    def _post_measures(self, url, measures, **kwargs):
+        """Post measures, compressed if the client is set up to."""
+        headers = {'Content-Type': "application/json"}
+        data = ujson.dumps(measures)
+        if self.client.compressor is not None:
+            data = self.client.compressor.compress(data, headers)
+        return self._post(url, headers=headers, data=data, **kwargs)
 
     def batch_metrics_measures(self, measures):
         """Add measurements to metrics.
@@ -215,10 +315,18 @@ class MetricManager(base.Manager):
         :param measures: measurements
         :type dict(metric_id: list of dict(timestamp=timestamp, value=float))
         """
-        return self._post(
-            self.metric_batch_url,
-            headers={'Content-Type': "application/json"},
-            data=ujson.dumps(measures))
+        return self._post_measures(self.metric_batch_url, measures)
+
+    def _cached_ids(self, measures):
+        """Return measures of resources by metric ID if they are all cached."""
+        by_id = {}
+        for resource_id, metrics in measures.items():
+            for name, metric_measures in metrics.items():
+                metric_id = self._cached_id(name, resource_id)
+                if metric_id is None:
+                    return None
+                by_id[metric_id] = metric_measures
+        return by_id
 
     def batch_resources_metrics_measures(self, measures, create_metrics=False):
         """Add measurements to named metrics if resources.
@@ -226,16 +334,27 @@ class MetricManager(base.Manager):
         :param measures: measurements
         :type dict(resource_id: dict(metric_name:
             list of dict(timestamp=timestamp, value=float)))
+
+        When the IDs of all the metrics are cached, the measures are sent
+        with batch_metrics_measures() instead.
         """
-        return self._post(
-            self.resources_batch_url,
-            headers={'Content-Type': "application/json"},
-            data=ujson.dumps(measures),
+        by_id = None if create_metrics else self._cached_ids(measures)
+        if by_id is not None:
+            try:
+                return self.batch_metrics_measures(by_id)
+            except exceptions.BadRequest:
+                # Some metrics do not exist anymore, resolve them again
+                for resource_id, metrics in measures.items():
+                    for name in metrics:
+                        self.client.metric_id_cache.invalidate(
+                            (resource_id, name))
+        return self._post_measures(
+            self.resources_batch_url, measures,
             params=dict(create_metrics=create_metrics))
 
     def get_measures(self, metric, start=None, stop=None, aggregation=None,
                      granularity=None, resource_id=None, refresh=False,
-                     resample=None, **kwargs):
+                     resample=None, as_timeseries=False, **kwargs):
         """Get measurements of a metric.
 
         :param metric: ID or Name of the metric
@@ -255,10 +374,201 @@ class MetricManager(base.Manager):
         :type refresh: bool
         :param resample: resample measures to new granularity
         :type resample: float
+        :param as_timeseries: return a TimeSeries instead of a list of tuples
+        :type as_timeseries: bool
 
         All other arguments are arguments are dedicated to custom aggregation
         method passed as-is to the Gnocchi.
         """
+        def fetch(metric, resource_id):
+            url, params = self._measures_request(
+                metric, start, stop, aggregation, granularity, resource_id,
+                refresh, resample, **kwargs)
+            return self._get(url, params=params).json()
+
+        measures = self._by_id(fetch, metric, resource_id)
+        return timeseries.convert_measures(measures, as_timeseries)
+
+    def get_measures_many(self, metrics, start=None, stop=None,
+                          aggregation=None, granularity=None,
+                          resource_id=None, refresh=False, resample=None,
+                          as_timeseries=False,
+                          concurrency=base.DEFAULT_CONCURRENCY, **kwargs):
+        """Get measurements of several metrics concurrently.
+
+        This takes the same arguments as get_measures(), and sends the
+        requests from a pool of threads sharing the client session.
+
+        :param metrics: IDs or Names of the metrics
+        :type metrics: list of str
+        :param concurrency: maximum number of requests sent at the same time
+        :type concurrency: int
+        :return: each metric with its measures, or the exception raised
+                 while getting them, in the order of *metrics*
+        :rtype: list of tuple
+        """
+        def get_measures(metric):
+            return self.get_measures(
+                metric, start=start, stop=stop, aggregation=aggregation,
+                granularity=granularity, resource_id=resource_id,
+                refresh=refresh, resample=resample,
+                as_timeseries=as_timeseries, **kwargs)
+
+        return self._map_concurrently(get_measures, metrics, concurrency)
+
+    def get_measures_sharded(self, metric, start, stop, aggregation=None,
+                             granularity=None, resource_id=None,
+                             refresh=False, resample=None,
+                             as_timeseries=False,
+                             points_per_request=DEFAULT_POINTS_PER_REQUEST,
+                             window=None,
+                             concurrency=base.DEFAULT_CONCURRENCY, **kwargs):
+        """Get measurements of a metric over a long period.
+
+        This takes the same arguments as get_measures(), but [start, stop) is
+        split into windows fetched concurrently, so that no single request
+        returns more than *points_per_request* points of a granularity. The
+        windows are stitched back in order, without duplicated points.
+
+        :param metric: ID or Name of the metric
+        :type metric: str
+        :param start: beginning of the period
+        :type start: timestamp
+        :param stop: end of the period
+        :type stop: timestamp
+        :param points_per_request: maximum number of points of the finest
+                                   granularity returned by a request
+        :type points_per_request: int
+        :param window: size of the windows in seconds, overrides
+                       points_per_request; by default it is computed from
+                       *granularity*, or from the finest granularity of the
+                       archive policy of the metric
+        :type window: float
+        :param concurrency: maximum number of requests sent at the same time
+        :type concurrency: int
+        """
+        start = self._to_utc_datetime(start)
+        stop = self._to_utc_datetime(stop)
+        if start >= stop:
+            raise ValueError("start must be before stop")
+        if window is None:
+            if granularity is None:
+                step = self._finest_granularity(metric, resource_id)
+            else:
+                step = utils.parse_timespan(granularity)
+            window = step * points_per_request
+
+        def get_measures(bounds):
+            return self.get_measures(
+                metric, start=bounds[0], stop=bounds[1],
+                aggregation=aggregation, granularity=granularity,
+                resource_id=resource_id, refresh=refresh, resample=resample,
+                **kwargs)
+
+        results = self._map_concurrently(
+            get_measures, self._split_period(start, stop, window),
+            concurrency)
+
+        # Points of granularities coarser than the window boundaries are
+        # returned by two consecutive windows
+        by_granularity = collections.OrderedDict()
+        for __, measures in results:
+            if isinstance(measures, Exception):
+                raise measures
+            for measure in measures:
+                points = by_granularity.setdefault(measure[1], [])
+                if not points or points[-1][0] < measure[0]:
+                    points.append(measure)
+        # Gnocchi returns the coarsest granularity first
+        measures = [measure
+                    for g in sorted(by_granularity, reverse=True)
+                    for measure in by_granularity[g]]
+        if as_timeseries:
+            return timeseries.TimeSeries.from_tuples(measures)
+        return measures
+
+    @staticmethod
+    def _to_utc_datetime(timestamp):
+        if not isinstance(timestamp, datetime.datetime):
+            timestamp = utils.parse_timestamp(timestamp)
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=datetime.timezone.utc)
+        return timestamp
+
+    @staticmethod
+    def _split_period(start, stop, window):
+        # Inner boundaries are aligned on the window size, so that the
+        # windows match the aggregation periods of the server
+        width = max(int(window * 1000000), 1)
+        start_us = (start - timeseries.EPOCH) // timeseries.ONE_MICROSECOND
+        stop_us = (stop - timeseries.EPOCH) // timeseries.ONE_MICROSECOND
+        bounds = [start_us]
+        bounds.extend(range((start_us // width + 1) * width, stop_us, width))
+        bounds.append(stop_us)
+        return [(start + timeseries.ONE_MICROSECOND * (b - start_us),
+                 start + timeseries.ONE_MICROSECOND * (e - start_us))
+                for b, e in zip(bounds, bounds[1:])]
+
+    def _finest_granularity(self, metric, resource_id=None):
+        metric = self.get(metric, resource_id=resource_id)
+        archive_policy = metric.get("archive_policy")
+        if not archive_policy:
+            archive_policy = self.client.archive_policy.get(
+                metric["archive_policy_name"])
+        return min(utils.parse_timespan(d["granularity"])
+                   for d in archive_policy["definition"])
+
+    def iter_measures(self, metric, start=None, stop=None, aggregation=None,
+                      granularity=None, resource_id=None, refresh=False,
+                      resample=None, **kwargs):
+        """Iterate over measurements of a metric.
+
+        This takes the same arguments as get_measures(), but the response is
+        decoded incrementally while it is read, so memory usage does not
+        depend on the number of measures returned.
+
+        :param metric: ID or Name of the metric
+        :type metric: str
+        :param start: beginning of the period
+        :type start: timestamp
+        :param stop: end of the period
+        :type stop: timestamp
+        :param aggregation: aggregation to retrieve
+        :type aggregation: str
+        :param granularity: granularity to retrieve (in seconds)
+        :type granularity: int
+        :param resource_id: ID of the resource (required
+                            to get a metric by name)
+        :type resource_id: str
+        :param refresh: force aggregation of all known measures
+        :type refresh: bool
+        :param resample: resample measures to new granularity
+        :type resample: float
+        """
+        def fetch(metric, resource_id):
+            url, params = self._measures_request(
+                metric, start, stop, aggregation, granularity, resource_id,
+                refresh, resample, **kwargs)
+            return self._get(url, params=params, stream=True)
+
+        resp = self._by_id(fetch, metric, resource_id)
+        return self._iter_measures_response(resp)
+
+    @staticmethod
+    def _iter_measures_response(resp):
+        try:
+            measures = utils.iter_json_array(
+                resp.iter_content(chunk_size=MEASURES_CHUNK_SIZE))
+            for ts, g, value in measures:
+                yield utils.parse_timestamp(ts), g, value
+        finally:
+            resp.close()
+
+    @classmethod
+    def _measures_request(cls, metric, start=None, stop=None,
+                          aggregation=None, granularity=None,
+                          resource_id=None, refresh=False, resample=None,
+                          **kwargs):
         if isinstance(start, datetime.datetime):
             start = start.isoformat()
         if isinstance(stop, datetime.datetime):
@@ -268,20 +578,14 @@ class MetricManager(base.Manager):
                       granularity=granularity, refresh=refresh,
                       resample=resample)
         params.update(kwargs)
-        if resource_id is None:
-            self._ensure_metric_is_uuid(metric)
-            url = self.metric_url + metric + "/measures"
-        else:
-            url = self.resource_url % resource_id + metric + "/measures"
-        measures = self._get(url, params=params).json()
-        return [(iso8601.parse_date(ts), g, value)
-                for ts, g, value in measures]
+        return cls._url(metric, resource_id) + "/measures", params
 
     def aggregation(self, metrics, query=None,
                     start=None, stop=None, aggregation=None,
                     reaggregation=None, granularity=None,
                     needed_overlap=None, resource_type="generic",
-                    groupby=None, refresh=False, resample=None, fill=None):
+                    groupby=None, refresh=False, resample=None, fill=None,
+                    as_timeseries=False):
         """Get measurements of an aggregated metrics.
 
         :param metrics: IDs of metric or metric name
@@ -310,11 +614,35 @@ class MetricManager(base.Manager):
         :type resample: float
         :param fill: value to use when backfilling missing datapoints
         :type fill: float or 'null'
+        :param as_timeseries: return TimeSeries instead of lists of tuples
+        :type as_timeseries: bool
 
         See Gnocchi REST API documentation for the format
         of *query dictionary*
         http://docs.openstack.org/developer/gnocchi/rest.html#searching-for-resources
         """
+        url, params, data = self._aggregation_request(
+            metrics, query, start, stop, aggregation, reaggregation,
+            granularity, needed_overlap, resource_type, groupby, refresh,
+            resample, fill)
+        if query is None:
+            measures = self._get(url, params=params).json()
+        else:
+            measures = self._post(
+                url, headers={'Content-Type': "application/json"},
+                data=data).json()
+        return self._convert_aggregation(measures, groupby, as_timeseries)
+
+    @classmethod
+    def _aggregation_request(cls, metrics, query, start, stop, aggregation,
+                             reaggregation, granularity, needed_overlap,
+                             resource_type, groupby, refresh, resample,
+                             fill):
+        """Return the URL, parameters and body of an aggregation request.
+
+        The request is a GET with parameters if query is None, a POST with
+        the parameters in the URL otherwise.
+        """
         if isinstance(start, datetime.datetime):
             start = start.isoformat()
         if isinstance(stop, datetime.datetime):
@@ -326,33 +654,26 @@ class MetricManager(base.Manager):
                       refresh=refresh, resample=resample, fill=fill)
         if query is None:
             for metric in metrics:
-                self._ensure_metric_is_uuid(metric)
+                cls._ensure_metric_is_uuid(metric)
             params['metric'] = metrics
-            measures = self._get("v1/aggregation/metric",
-                                 params=params).json()
+            return "v1/aggregation/metric", params, None
+
+        if isinstance(query, dict):
+            data = ujson.dumps(query)
         else:
-            if isinstance(query, dict):
-                measures = self._post(
-                    "v1/aggregation/resource/%s/metric/%s?%s" % (
-                        resource_type, metrics,
-                        utils.dict_to_querystring(params)),
-                    headers={'Content-Type': "application/json"},
-                    data=ujson.dumps(query)).json()
-            else:
-                params['filter'] = query
-                measures = self._post(
-                    "v1/aggregation/resource/%s/metric/%s?%s" % (
-                        resource_type, metrics,
-                        utils.dict_to_querystring(params)),
-                    headers={'Content-Type': "application/json"}).json()
+            params['filter'] = query
+            data = None
+        return "v1/aggregation/resource/%s/metric/%s?%s" % (
+            resource_type, metrics,
+            utils.dict_to_querystring(params)), None, data
+
+    @staticmethod
+    def _convert_aggregation(measures, groupby, as_timeseries):
         if groupby is None:
-            return [(iso8601.parse_date(ts), g, value)
-                    for ts, g, value in measures]
+            return timeseries.convert_measures(measures, as_timeseries)
 
         for group in measures:
-            group["measures"] = [
-                (iso8601.parse_date(ts), g, value)
-                for ts, g, value in group["measures"]
-            ]
+            group["measures"] = timeseries.convert_measures(
+                group["measures"], as_timeseries)
 
         return measures
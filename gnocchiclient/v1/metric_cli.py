@@ -22,8 +22,10 @@ from cliff import show
 import iso8601
 
 from gnocchiclient import utils
+from gnocchiclient.v1 import base
 
 
+LOG = logging.getLogger(__name__)
 LOG_DEP = logging.getLogger('deprecated')
 
 
@@ -53,13 +55,16 @@ class CliMetricList(lister.Lister):
                             "(example: user_id:desc-nullslast")
         return parser
 
+    @staticmethod
+    def _format_metric(metric):
+        utils.format_archive_policy(metric["archive_policy"])
+        utils.format_move_dict_to_root(metric, "archive_policy")
+        return metric
+
     def take_action(self, parsed_args):
-        metrics = utils.get_client(self).metric.list(
+        metrics = utils.get_client(self).metric.iter_list(
             **utils.get_pagination_options(parsed_args))
-        for metric in metrics:
-            utils.format_archive_policy(metric["archive_policy"])
-            utils.format_move_dict_to_root(metric, "archive_policy")
-        return utils.list2cols(self.COLS, metrics)
+        return utils.iter2cols(self.COLS, map(self._format_metric, metrics))
 
 
 class CliMetricShow(CliMetricWithResourceID, show.ShowOne):
@@ -127,12 +132,21 @@ class CliMetricDelete(CliMetricWithResourceID):
         parser = super(CliMetricDelete, self).get_parser(prog_name)
         parser.add_argument("metric", nargs='+',
                             help="IDs or names of the metric")
+        parser.add_argument("--concurrency",
+                            type=utils.positive_non_zero_int,
+                            default=base.DEFAULT_CONCURRENCY,
+                            help="number of metrics to delete at the same "
+                            "time")
         return parser
 
     def take_action(self, parsed_args):
-        for metric in parsed_args.metric:
-            utils.get_client(self).metric.delete(
-                metric=metric, resource_id=parsed_args.resource_id)
+        failures = utils.get_client(self).metric.bulk_delete(
+            parsed_args.metric, resource_id=parsed_args.resource_id,
+            concurrency=parsed_args.concurrency,
+            progress=lambda done, total: LOG.info(
+                "%d/%d metrics processed", done, total))
+        utils.raise_bulk_failures(failures, len(parsed_args.metric),
+                                  "delete metrics")
 
 
 class CliMeasuresReturn(lister.Lister):
@@ -144,13 +158,17 @@ class CliMeasuresReturn(lister.Lister):
         return parser
 
     @staticmethod
-    def format_measures_with_tz(parsed_args, measures):
+    def iter_measures_with_tz(parsed_args, measures):
         if parsed_args.utc:
             def t(x):
                 return x
         else:
             t = utils.dt_to_localtz
-        return [(t(dt).isoformat(), g, v) for dt, g, v in measures]
+        return ((t(dt).isoformat(), g, v) for dt, g, v in measures)
+
+    @classmethod
+    def format_measures_with_tz(cls, parsed_args, measures):
+        return list(cls.iter_measures_with_tz(parsed_args, measures))
 
 
 class CliMeasuresShow(CliMetricWithResourceID, CliMeasuresReturn,
@@ -161,8 +179,8 @@ class CliMeasuresShow(CliMetricWithResourceID, CliMeasuresReturn,
 
     def get_parser(self, prog_name):
         parser = super(CliMeasuresShow, self).get_parser(prog_name)
-        parser.add_argument("metric",
-                            help="ID or name of the metric")
+        parser.add_argument("metric", nargs='+',
+                            help="IDs or names of the metrics")
         parser.add_argument("--aggregation",
                             help="aggregation to retrieve")
         parser.add_argument("--start",
@@ -178,11 +196,32 @@ class CliMeasuresShow(CliMetricWithResourceID, CliMeasuresReturn,
         parser.add_argument("--resample",
                             help=("granularity to resample time-series to "
                                   "(in seconds)"))
+        self._add_split_arguments(parser)
         return parser
 
+    @staticmethod
+    def _add_split_arguments(parser):
+        parser.add_argument("--concurrency",
+                            type=utils.positive_non_zero_int,
+                            default=base.DEFAULT_CONCURRENCY,
+                            help=("number of metrics to fetch at the same "
+                                  "time when several are requested"))
+        parser.add_argument("--points-per-request",
+                            type=utils.positive_non_zero_int,
+                            help=("split the period in several requests "
+                                  "returning at most this number of points "
+                                  "of the finest granularity; requires "
+                                  "--start and --stop"))
+
+    def run(self, parsed_args):
+        self.failed = False
+        result = super(CliMeasuresShow, self).run(parsed_args)
+        # Measures of the other metrics have been shown, but the command
+        # must not look successful
+        return 1 if self.failed else result
+
     def take_action(self, parsed_args):
-        measures = utils.get_client(self).metric.get_measures(
-            metric=parsed_args.metric,
+        kwargs = dict(
             resource_id=parsed_args.resource_id,
             aggregation=parsed_args.aggregation,
             start=parsed_args.start,
@@ -191,7 +230,42 @@ class CliMeasuresShow(CliMetricWithResourceID, CliMeasuresReturn,
             refresh=parsed_args.refresh,
             resample=parsed_args.resample
         )
-        return self.COLS, self.format_measures_with_tz(parsed_args, measures)
+        metric_client = utils.get_client(self).metric
+        if parsed_args.points_per_request is not None:
+            if parsed_args.start is None or parsed_args.stop is None:
+                raise ValueError("--start and --stop are required to split "
+                                 "the period")
+            if len(parsed_args.metric) != 1:
+                raise ValueError("Only one metric can be fetched when "
+                                 "splitting the period")
+            measures = metric_client.get_measures_sharded(
+                metric=parsed_args.metric[0],
+                points_per_request=parsed_args.points_per_request,
+                concurrency=parsed_args.concurrency, **kwargs)
+            return self.COLS, self.iter_measures_with_tz(parsed_args,
+                                                         measures)
+        if len(parsed_args.metric) == 1:
+            measures = metric_client.iter_measures(
+                metric=parsed_args.metric[0], **kwargs)
+            return self.COLS, self.iter_measures_with_tz(parsed_args,
+                                                         measures)
+
+        results = metric_client.get_measures_many(
+            metrics=parsed_args.metric,
+            concurrency=parsed_args.concurrency, **kwargs)
+        errors = [r for __, r in results if isinstance(r, Exception)]
+        if len(errors) == len(results):
+            raise errors[0]
+        self.failed = bool(errors)
+        rows = []
+        for metric, measures in results:
+            if isinstance(measures, Exception):
+                LOG.error("Unable to get measures of %s: %s",
+                          metric, measures)
+                continue
+            rows.extend((metric, ) + m for m in
+                        self.iter_measures_with_tz(parsed_args, measures))
+        return ('metric', ) + self.COLS, rows
 
 
 class CliMeasuresAddBase(CliMetricWithResourceID):
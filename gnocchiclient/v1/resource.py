@@ -11,6 +11,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+
 import ujson
 
 from gnocchiclient import utils
@@ -39,19 +41,41 @@ class ResourceManager(base.Manager):
                       ["user_id:desc-nullslast", "project_id:asc"]
         :type sorts: list of str
         """
+        return list(self.iter_list(resource_type, details, history,
+                                   limit, marker, sorts))
+
+    def iter_list(self, resource_type="generic", details=False, history=False,
+                  limit=None, marker=None, sorts=None, prefetch=True):
+        """Iterate over resources, fetching them one page at a time.
+
+        :param resource_type: Type of the resource
+        :type resource_type: str
+        :param details: Show all attributes of resources
+        :type details: bool
+        :param history: Show the history of resources
+        :type history: bool
+        :param limit: maximum number of resources to return
+        :type limit: int
+        :param marker: the last item of the previous page; we return the next
+                       results after this value.
+        :type marker: str
+        :param sorts: list of resource attributes to order by. (example
+                      ["user_id:desc-nullslast", "project_id:asc"]
+        :type sorts: list of str
+        :param prefetch: fetch the next page while the current one is consumed
+        :type prefetch: bool
+        """
+        page_url = self._list_url(resource_type, details, history, limit,
+                                  marker, sorts)
+        return self._iter_pages(self._get, page_url, limit, prefetch)
+
+    @classmethod
+    def _list_url(cls, resource_type, details, history, limit, marker,
+                  sorts):
         params = utils.build_pagination_options(
             details, history, limit, marker, sorts)
-        resources = []
-        page_url = "%s%s?%s" % (self.url, resource_type,
-                                utils.dict_to_querystring(params))
-        while page_url:
-            page = self._get(page_url)
-            resources.extend(page.json())
-            if limit is None or len(resources) < limit:
-                page_url = page.links.get("next", {'url': None})['url']
-            else:
-                break
-        return resources
+        return "%s%s?%s" % (cls.url, resource_type,
+                            utils.dict_to_querystring(params))
 
     def get(self, resource_type, resource_id, history=False):
         """Get a resource.
@@ -63,9 +87,16 @@ class ResourceManager(base.Manager):
         :param history: Show the history of the resource
         :type history: bool
         """
+        resource = self._get(
+            self._get_url(resource_type, resource_id, history)).json()
+        if not history:
+            self.client.metric._remember_resource(resource)
+        return resource
+
+    @classmethod
+    def _get_url(cls, resource_type, resource_id, history=False):
         history = "/history" if history else ""
-        url = self.url + "%s/%s%s" % (resource_type, resource_id, history)
-        return self._get(url).json()
+        return cls.url + "%s/%s%s" % (resource_type, resource_id, history)
 
     def history(self, resource_type, resource_id, details=False,
                 limit=None, marker=None, sorts=None):
@@ -86,11 +117,17 @@ class ResourceManager(base.Manager):
                       ["user_id:desc-nullslast", "project_id:asc"]
         :type sorts: list of str
         """
+        return self._get(self._history_url(
+            resource_type, resource_id, details, limit, marker,
+            sorts)).json()
+
+    @classmethod
+    def _history_url(cls, resource_type, resource_id, details, limit, marker,
+                     sorts):
         params = utils.build_pagination_options(details, False, limit, marker,
                                                 sorts)
-        url = "%s%s/%s/history?%s" % (self.url, resource_type, resource_id,
-                                      utils.dict_to_querystring(params))
-        return self._get(url).json()
+        return "%s%s/%s/history?%s" % (cls.url, resource_type, resource_id,
+                                       utils.dict_to_querystring(params))
 
     def create(self, resource_type, resource):
         """Create a resource.
@@ -100,10 +137,12 @@ class ResourceManager(base.Manager):
         :param resource: Attribute of the resource
         :type resource: dict
         """
-        return self._post(
+        resource = self._post(
             self.url + resource_type,
             headers={'Content-Type': "application/json"},
             data=ujson.dumps(resource)).json()
+        self.client.metric._remember_resource(resource)
+        return resource
 
     def update(self, resource_type, resource_id, resource):
         """Update a resource.
@@ -115,10 +154,12 @@ class ResourceManager(base.Manager):
         :param resource: Attribute of the resource
         :type resource: dict
         """
-        return self._patch(
+        resource = self._patch(
             self.url + resource_type + "/" + resource_id,
             headers={'Content-Type': "application/json"},
             data=ujson.dumps(resource)).json()
+        self.client.metric._remember_resource(resource)
+        return resource
 
     def delete(self, resource_id):
         """Delete a resource.
@@ -128,20 +169,44 @@ class ResourceManager(base.Manager):
         """
         self._delete(self.url + "generic/" + resource_id)
 
+    def bulk_delete(self, resource_ids, concurrency=base.DEFAULT_CONCURRENCY,
+                    progress=None):
+        """Delete several resources concurrently.
+
+        Unlike delete(), errors do not stop the deletion of the other
+        resources: they are returned.
+
+        :param resource_ids: IDs of the resources
+        :type resource_ids: list of str
+        :param concurrency: maximum number of requests sent at the same time
+        :type concurrency: int
+        :param progress: function called with the number of processed
+                         resources and the total number of resources
+        :type progress: callable
+        :return: the exception raised for each resource that failed
+        :rtype: collections.OrderedDict
+        """
+        results = self._map_concurrently(self.delete, resource_ids,
+                                         concurrency, progress)
+        return collections.OrderedDict(
+            (r, e) for r, e in results if isinstance(e, Exception))
+
     def batch_delete(self, query, resource_type="generic"):
         """Delete a batch of resources based on attribute values.
 
         :param resource_type: Type of the resource
         :type resource_type: str
         """
-        if isinstance(query, dict):
-            return self._delete(
-                self.url + resource_type + "/",
-                headers={'Content-Type': "application/json"},
-                data=ujson.dumps(query)).json()
+        url, data = self._batch_delete_request(query, resource_type)
         return self._delete(
-            self.url + resource_type + "/?filter=" + query,
-            headers={'Content-Type': "application/json"}).json()
+            url, headers={'Content-Type': "application/json"},
+            data=data).json()
+
+    @classmethod
+    def _batch_delete_request(cls, query, resource_type):
+        if isinstance(query, dict):
+            return cls.url + resource_type + "/", ujson.dumps(query)
+        return cls.url + resource_type + "/?filter=" + query, None
 
     def search(self, resource_type="generic", query=None, details=False,
                history=False, limit=None, marker=None, sorts=None):
@@ -168,27 +233,57 @@ class ResourceManager(base.Manager):
         of *query dictionary*
         http://gnocchi.osci.io/rest.html#searching-for-resources
         """
+        return list(self.iter_search(resource_type, query, details, history,
+                                     limit, marker, sorts))
+
+    def iter_search(self, resource_type="generic", query=None, details=False,
+                    history=False, limit=None, marker=None, sorts=None,
+                    prefetch=True):
+        """Iterate over searched resources, fetching one page at a time.
+
+        :param resource_type: Type of the resource
+        :type resource_type: str
+        :param query: The query dictionary
+        :type query: dict
+        :param details: Show all attributes of resources
+        :type details: bool
+        :param history: Show the history of resources
+        :type history: bool
+        :param limit: maximum number of resources to return
+        :type limit: int
+        :param marker: the last item of the previous page; we returns the next
+                       results after this value.
+        :type marker: str
+        :param sorts: list of resource attributes to order by. (example
+                      ["user_id:desc-nullslast", "project_id:asc"]
+        :type sorts: list of str
+        :param prefetch: fetch the next page while the current one is consumed
+        :type prefetch: bool
+
+        See search() for the format of *query dictionary*.
+        """
+        page_url, data = self._search_request(
+            resource_type, query, details, history, limit, marker, sorts)
+
+        def fetch(page_url):
+            return self._post(
+                page_url, headers={'Content-Type': "application/json"},
+                data=data)
+
+        resources = self._iter_pages(fetch, page_url, limit, prefetch)
+        if self.client.metric_id_cache is None or history:
+            return resources
+        return self.client.metric._iter_remembered(resources)
+
+    @staticmethod
+    def _search_request(resource_type, query, details, history, limit,
+                        marker, sorts):
         query = query or {}
         params = utils.build_pagination_options(
             details, history, limit, marker, sorts)
         url = "v1/search/resource/%s?%%s" % resource_type
-        resources = []
 
         if isinstance(query, dict):
-            page_url = url % utils.dict_to_querystring(params)
-            data = ujson.dumps(query)
-        else:
-            params['filter'] = query
-            page_url = url % utils.dict_to_querystring(params)
-            data = None
-
-        while page_url:
-            page = self._post(
-                page_url, headers={'Content-Type': "application/json"},
-                data=data)
-            resources.extend(page.json())
-            if limit is None or len(resources) < limit:
-                page_url = page.links.get("next", {'url': None})['url']
-            else:
-                break
-        return resources
+            return url % utils.dict_to_querystring(params), ujson.dumps(query)
+        params['filter'] = query
+        return url % utils.dict_to_querystring(params), None
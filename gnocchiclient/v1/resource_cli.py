@@ -11,12 +11,19 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import itertools
+import logging
+
 from cliff import command
 from cliff import lister
 from cliff import show
 
 from gnocchiclient import exceptions
 from gnocchiclient import utils
+from gnocchiclient.v1 import base
+
+
+LOG = logging.getLogger(__name__)
 
 
 class CliResourceList(lister.Lister):
@@ -49,26 +56,30 @@ class CliResourceList(lister.Lister):
         return parser
 
     def _list2cols(self, resources):
-        """Return a formatted list of resources."""
-        if not resources:
+        """Return a formatted list of resources.
+
+        Columns are computed from the first resource; the others are
+        formatted lazily so that rows can be streamed to the formatter.
+        """
+        resources = iter(resources)
+        first = next(resources, None)
+        if first is None:
             return self.COLS, []
         cols = list(self.COLS)
-        for k in resources[0]:
+        for k in first:
             if k not in cols:
                 cols.append(k)
         if 'creator' in cols:
             cols.remove('created_by_user_id')
             cols.remove('created_by_project_id')
-        return utils.list2cols(cols, resources)
+        return utils.iter2cols(cols, itertools.chain([first], resources))
 
     def take_action(self, parsed_args):
-        resources = utils.get_client(self).resource.list(
+        resources = utils.get_client(self).resource.iter_list(
             resource_type=parsed_args.resource_type,
             **utils.get_pagination_options(parsed_args))
         # Do not dump metrics because it makes the list way too long
-        for r in resources:
-            del r['metrics']
-        return self._list2cols(resources)
+        return self._list2cols(map(strip_metrics, resources))
 
 
 class CliResourceHistory(CliResourceList):
@@ -100,14 +111,17 @@ class CliResourceSearch(CliResourceList):
         return parser
 
     def take_action(self, parsed_args):
-        resources = utils.get_client(self).resource.search(
+        resources = utils.get_client(self).resource.iter_search(
             resource_type=parsed_args.resource_type,
             query=parsed_args.query,
             **utils.get_pagination_options(parsed_args))
         # Do not dump metrics because it makes the list way too long
-        for r in resources:
-            del r['metrics']
-        return self._list2cols(resources)
+        return self._list2cols(map(strip_metrics, resources))
+
+
+def strip_metrics(res):
+    del res['metrics']
+    return res
 
 
 def normalize_metrics(res):
@@ -234,16 +248,26 @@ class CliResourceUpdate(CliResourceCreate):
 
 
 class CliResourceDelete(command.Command):
-    """Delete a resource."""
+    """Delete resources."""
 
     def get_parser(self, prog_name):
         parser = super(CliResourceDelete, self).get_parser(prog_name)
-        parser.add_argument("resource_id",
-                            help="ID of the resource")
+        parser.add_argument("resource_id", nargs='+',
+                            help="IDs of the resources")
+        parser.add_argument("--concurrency",
+                            type=utils.positive_non_zero_int,
+                            default=base.DEFAULT_CONCURRENCY,
+                            help="number of resources to delete at the same "
+                            "time")
         return parser
 
     def take_action(self, parsed_args):
-        utils.get_client(self).resource.delete(parsed_args.resource_id)
+        failures = utils.get_client(self).resource.bulk_delete(
+            parsed_args.resource_id, concurrency=parsed_args.concurrency,
+            progress=lambda done, total: LOG.info(
+                "%d/%d resources processed", done, total))
+        utils.raise_bulk_failures(failures, len(parsed_args.resource_id),
+                                  "delete resources")
 
 
 class CliResourceBatchDelete(show.ShowOne):
@@ -11,6 +11,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
+
 import ujson
 
 from gnocchiclient.v1 import base
@@ -34,14 +36,40 @@ class ResourceTypeManager(base.Manager):
             headers={'Content-Type': "application/json"},
             data=ujson.dumps(resource_type)).json()
 
+    def _cache_key(self, name):
+        return (self.client.api.get_endpoint(), name)
+
     def get(self, name):
         """Get a resource type.
 
+        When the client has a resource type cache, the resource type is
+        served from it until it expires. Each call returns its own copy, that
+        the caller can change without altering the cache.
+
+        :param name: name of the resource type
+        :type name: str
+        """
+        cache = self.client.resource_type_cache
+        if cache is not None:
+            key = self._cache_key(name)
+            resource_type = cache.get(key)
+            if resource_type is not None:
+                return copy.deepcopy(resource_type)
+        resource_type = self._get(
+            self.url + name,
+            headers={'Content-Type': "application/json"}).json()
+        if cache is not None:
+            cache.set(key, copy.deepcopy(resource_type))
+        return resource_type
+
+    def invalidate(self, name):
+        """Remove a resource type from the resource type cache.
+
         :param name: name of the resource type
         :type name: str
         """
-        return self._get(self.url + name,
-                         headers={'Content-Type': "application/json"}).json()
+        if self.client.resource_type_cache is not None:
+            self.client.resource_type_cache.invalidate(self._cache_key(name))
 
     def delete(self, name):
         """Delete a resource type.
@@ -49,7 +77,10 @@ class ResourceTypeManager(base.Manager):
         :param resource_type: Resource type
         :type resource_type: dict
         """
-        self._delete(self.url + name)
+        try:
+            self._delete(self.url + name)
+        finally:
+            self.invalidate(name)
 
     def update(self, name, operations):
         """Update a resource type.
@@ -59,7 +90,10 @@ class ResourceTypeManager(base.Manager):
         :param operations: operations in RFC6902 format
         :type name: list
         """
-        return self._patch(
-            self.url + name,
-            headers={'Content-Type': "application/json-patch+json"},
-            data=ujson.dumps(operations)).json()
+        try:
+            return self._patch(
+                self.url + name,
+                headers={'Content-Type': "application/json-patch+json"},
+                data=ujson.dumps(operations)).json()
+        finally:
+            self.invalidate(name)
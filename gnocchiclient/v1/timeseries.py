@@ -0,0 +1,159 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import array
+import datetime
+import math
+
+from gnocchiclient import utils
+
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+ONE_MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+def datetime_to_ns(dt):
+    """Convert an aware datetime to nanoseconds since epoch."""
+    return (dt - EPOCH) // ONE_MICROSECOND * 1000
+
+
+def ns_to_datetime(ns):
+    """Convert nanoseconds since epoch to an UTC datetime."""
+    return EPOCH + datetime.timedelta(microseconds=ns // 1000)
+
+
+class TimeSeries:
+    """Measures stored as columns.
+
+    Timestamps are stored as int64 nanoseconds since epoch, granularities and
+    values as doubles, each in its own array.array. The columns support the
+    buffer protocol, so they can be wrapped without copy by memoryview or
+    numpy.frombuffer(). Missing values are stored as NaN.
+
+    Indexing or iterating returns the usual ``(datetime, granularity,
+    value)`` tuples; datetimes are only built on access.
+    """
+
+    def __init__(self, timestamps=(), granularities=(), values=()):
+        self.timestamps = array.array("q", timestamps)
+        self.granularities = array.array("d", granularities)
+        self.values = array.array("d", values)
+        if not (len(self.timestamps) == len(self.granularities) ==
+                len(self.values)):
+            raise ValueError("All columns must have the same length")
+
+    @classmethod
+    def from_measures(cls, measures):
+        """Build a time series from a Gnocchi measures list.
+
+        :param measures: measures as returned by the API
+        :type measures: list of [timestamp, granularity, value]
+        """
+        if not measures:
+            return cls()
+        timestamps, granularities, values = zip(*measures)
+        return cls(map(datetime_to_ns, utils.parse_timestamps(timestamps)),
+                   granularities,
+                   [math.nan if v is None else v for v in values])
+
+    @classmethod
+    def from_tuples(cls, measures):
+        """Build a time series from parsed measures.
+
+        :param measures: measures as returned by get_measures()
+        :type measures: list of (datetime, granularity, value)
+        """
+        if not measures:
+            return cls()
+        timestamps, granularities, values = zip(*measures)
+        return cls(map(datetime_to_ns, timestamps), granularities,
+                   [math.nan if v is None else v for v in values])
+
+    def append(self, timestamp, granularity, value):
+        """Append a measure.
+
+        :param timestamp: timestamp of the measure
+        :type timestamp: str, datetime or int (nanoseconds since epoch)
+        :param granularity: granularity of the measure
+        :type granularity: float
+        :param value: value of the measure
+        :type value: float or None
+        """
+        if isinstance(timestamp, str):
+            timestamp = utils.parse_timestamp(timestamp)
+        if isinstance(timestamp, datetime.datetime):
+            timestamp = datetime_to_ns(timestamp)
+        self.timestamps.append(timestamp)
+        self.granularities.append(granularity)
+        self.values.append(math.nan if value is None else value)
+
+    def _measure(self, i):
+        value = self.values[i]
+        return (ns_to_datetime(self.timestamps[i]),
+                self.granularities[i],
+                None if math.isnan(value) else value)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._measure(i)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.__class__(self.timestamps[key],
+                                  self.granularities[key],
+                                  self.values[key])
+        return self._measure(key)
+
+    def __eq__(self, other):
+        if not isinstance(other, TimeSeries):
+            return NotImplemented
+        return (self.timestamps == other.timestamps and
+                self.granularities == other.granularities and
+                # NaN != NaN, compare the raw bytes instead
+                self.values.tobytes() == other.values.tobytes())
+
+    def __repr__(self):
+        return "<%s: %d measures>" % (self.__class__.__name__, len(self))
+
+    def to_numpy(self):
+        """Return the columns as NumPy arrays without copying them.
+
+        :return: timestamps as datetime64[ns], granularities and values
+        :rtype: tuple of numpy.ndarray
+        """
+        import numpy
+
+        return (numpy.frombuffer(self.timestamps,
+                                 dtype="int64").view("datetime64[ns]"),
+                numpy.frombuffer(self.granularities, dtype="float64"),
+                numpy.frombuffer(self.values, dtype="float64"))
+
+
+def convert_measures(measures, as_timeseries=False):
+    """Convert a Gnocchi measures list to its Python representation.
+
+    :param measures: measures as returned by the API
+    :type measures: list of [timestamp, granularity, value]
+    :param as_timeseries: return a TimeSeries instead of a list of tuples
+    :type as_timeseries: bool
+    """
+    if as_timeseries:
+        return TimeSeries.from_measures(measures)
+    if not measures:
+        return []
+    timestamps, granularities, values = zip(*measures)
+    return list(zip(utils.parse_timestamps(timestamps),
+                    granularities, values))
@@ -0,0 +1,214 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+import time
+
+import futurist
+
+import ujson
+
+from gnocchiclient.v1 import metric as metric_mod
+
+
+class MeasuresWriter:
+    """Buffer measures and send them through the batch endpoints.
+
+    Measures written for a metric ID are sent with
+    MetricManager.batch_metrics_measures(), measures written for a metric
+    name of a resource with MetricManager.batch_resources_metrics_measures().
+    Buffered measures are flushed by a background thread once one of the
+    thresholds is reached, or explicitly with flush() or close().
+
+    write() blocks while max_pending measures are buffered or being sent, so
+    that a slow or unavailable server does not make the buffer grow without
+    limit.
+
+    A batch request succeeds or fails as a whole: if it fails, the futures
+    of all the writes it contains get its exception, including the writes of
+    metrics which were not the cause of the failure.
+
+    The futures are resolved once their measures are no longer pending, by
+    the thread which sent them. Their callbacks may call write(), which
+    never blocks in the background thread, as it is the one making room.
+
+    Usage::
+
+        >>> with writer.MeasuresWriter(gnocchi) as w:
+        ...     future = w.write(metric_id, [{"timestamp": ..., "value": 1}])
+
+    :param client: the Gnocchi client
+    :type client: gnocchiclient.v1.client.Client
+    :param max_measures: flush once this number of measures is buffered
+    :type max_measures: int
+    :param max_bytes: flush once the buffered measures reach this encoded size
+    :type max_bytes: int
+    :param max_latency: maximum time in seconds a measure is buffered
+    :type max_latency: float
+    :param max_pending: maximum number of measures buffered or being sent,
+                        defaults to ten times max_measures
+    :type max_pending: int
+    :param create_metrics: create unknown metrics of resources
+    :type create_metrics: bool
+    """
+
+    def __init__(self, client, max_measures=5000, max_bytes=4 * 1024 * 1024,
+                 max_latency=1.0, create_metrics=False, max_pending=None):
+        self.client = client
+        self.max_measures = max_measures
+        self.max_bytes = max_bytes
+        self.max_latency = max_latency
+        self.max_pending = (10 * max_measures if max_pending is None
+                            else max_pending)
+        self.create_metrics = create_metrics
+
+        self._cond = threading.Condition()
+        self._send_lock = threading.Lock()
+        self._closed = False
+        self._pending = 0
+        self._reset()
+        self._thread = threading.Thread(target=self._run,
+                                        name="gnocchi-measures-writer",
+                                        daemon=True)
+        self._thread.start()
+
+    def _reset(self):
+        self._metrics = {}
+        self._resources = {}
+        self._metrics_futures = []
+        self._resources_futures = []
+        self._count = 0
+        self._bytes = 0
+        self._first_write_at = None
+
+    def _is_full(self):
+        return (self._count >= self.max_measures or
+                self._bytes >= self.max_bytes)
+
+    def write(self, metric, measures, resource_id=None):
+        """Buffer measurements of a metric.
+
+        :param metric: ID or Name of the metric
+        :type metric: str
+        :param measures: measurements
+        :type measures: list of dict(timestamp=timestamp, value=float)
+        :param resource_id: ID of the resource (required
+                            to write a metric by name)
+        :type resource_id: str
+        :return: a future resolved once the measures have been sent
+        :rtype: futurist.Future
+        """
+        if resource_id is None:
+            metric_mod.MetricManager._ensure_metric_is_uuid(metric)
+        size = len(ujson.dumps(measures))
+        future = futurist.Future()
+        with self._cond:
+            # Wait for room, a write larger than max_pending is let through
+            # once nothing is pending
+            while (not self._closed and self._pending and
+                   self._pending + len(measures) > self.max_pending and
+                   threading.current_thread() is not self._thread):
+                self._cond.wait()
+            if self._closed:
+                raise RuntimeError("MeasuresWriter is closed")
+            if resource_id is None:
+                self._metrics.setdefault(metric, []).extend(measures)
+                self._metrics_futures.append(future)
+            else:
+                self._resources.setdefault(resource_id, {}).setdefault(
+                    metric, []).extend(measures)
+                self._resources_futures.append(future)
+            self._count += len(measures)
+            self._pending += len(measures)
+            self._bytes += size
+            if self._first_write_at is None:
+                self._first_write_at = time.monotonic()
+                self._cond.notify_all()
+            elif self._is_full():
+                self._cond.notify_all()
+        return future
+
+    def flush(self):
+        """Send all buffered measures and wait for the requests to finish."""
+        # Keep batches ordered when flush() races with the background thread
+        with self._send_lock:
+            with self._cond:
+                metrics = self._metrics
+                metrics_futures = self._metrics_futures
+                resources = self._resources
+                resources_futures = self._resources_futures
+                count = self._count
+                self._reset()
+            results = []
+            try:
+                if metrics:
+                    results.append((metrics_futures, self._send_batch(
+                        self.client.metric.batch_metrics_measures, metrics)))
+                if resources:
+                    results.append((resources_futures, self._send_batch(
+                        self.client.metric.batch_resources_metrics_measures,
+                        resources, create_metrics=self.create_metrics)))
+            finally:
+                with self._cond:
+                    self._pending -= count
+                    self._cond.notify_all()
+        # Resolved last, so that their callbacks can write again
+        for futures, error in results:
+            for future in futures:
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
+
+    @staticmethod
+    def _send_batch(fn, *args, **kwargs):
+        """Send a batch and return its exception, None if it succeeded."""
+        try:
+            fn(*args, **kwargs)
+        except Exception as e:  # noqa
+            return e
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if self._first_write_at is None:
+                        self._cond.wait()
+                        continue
+                    if self._is_full():
+                        break
+                    timeout = (self._first_write_at + self.max_latency -
+                               time.monotonic())
+                    if timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+                if self._closed:
+                    return
+            self.flush()
+
+    def close(self):
+        """Flush buffered measures and stop the background thread."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()